@@ -0,0 +1,365 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.12"
+# dependencies = [
+#     "rich>=13.7.0",
+#     "typer>=0.9.0",
+#     "tomli>=2.0.1",
+# ]
+# ///
+"""
+Benchmark harness for the SOFA Python feed stages
+Runs each stage against the data/resources snapshot and scaled synthetic copies
+"""
+
+import json
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from statistics import median
+from typing import Annotated, Dict, List, Optional
+
+import typer
+from rich.console import Console
+from rich.panel import Panel
+from rich.table import Table
+
+console = Console()
+app = typer.Typer(help="Benchmark the SOFA Python feed stages")
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = REPO_ROOT / "scripts"
+
+# Stage name -> script and arguments, run from the scratch working directory
+STAGES: Dict[str, List[str]] = {
+    "rss": [
+        "generate_rss.py", "--output", "v1/rss_feed.xml", "--data-dir", "data/resources",
+        "--include-xprotect", "--include-beta", "--full", "--quiet",
+    ],
+    "legacy_v1": ["build_legacy_v1_feeds.py", "macOS", "iOS", "--output-dir", "v1"],
+    "rebuild_database": ["device_manager.py", "rebuild", "--full"],
+    "essential_links": ["transform_essential_links.py"],
+}
+
+# Metrics compared against the baseline; each regresses when it grows
+METRICS = ("wall_seconds", "peak_rss_bytes", "traced_peak_bytes", "traced_allocations", "gen0_collections")
+
+# Allocation sites kept per stage, by live block count at the traced peak
+TOP_ALLOCATION_SITES = 5
+
+# Wall time changes smaller than this are treated as noise, whatever the ratio
+WALL_NOISE_SECONDS = 0.05
+
+# Runs a stage script in a fresh interpreter and reports its own measurements.
+# Wall time excludes interpreter startup; tracemalloc is only enabled for the
+# traced run, so it does not inflate the timed runs. The traced run also keeps
+# a tracemalloc snapshot from near its peak, taken by a watcher thread whenever
+# traced memory grows by a tenth, and counts the blocks live in it.
+STAGE_RUNNER = """
+import gc, json, resource, runpy, sys, threading, time, tracemalloc
+stats_path, trace, top_sites, script, *args = sys.argv[1:]
+sys.argv = [script, *args]
+sys.path.insert(0, script.rsplit("/", 1)[0])
+peak = {"bytes": 0, "snapshot": None}
+done = threading.Event()
+def watch_peak():
+    while not done.wait(0.01):
+        current = tracemalloc.get_traced_memory()[0]
+        if current > peak["bytes"] * 1.1:
+            peak["snapshot"] = tracemalloc.take_snapshot()
+            peak["bytes"] = current
+if trace == "1":
+    tracemalloc.start()
+    watcher = threading.Thread(target=watch_peak, daemon=True)
+    watcher.start()
+exit_code = 0
+start = time.perf_counter()
+try:
+    runpy.run_path(script, run_name="__main__")
+except SystemExit as e:
+    exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+wall = time.perf_counter() - start
+done.set()
+# ru_maxrss survives exec, so it can report the parent's footprint; on Linux the
+# VmHWM high-water mark starts fresh with this interpreter
+try:
+    with open("/proc/self/status") as f:
+        maxrss = next(int(line.split()[1]) * 1024 for line in f if line.startswith("VmHWM:"))
+except OSError:
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        maxrss *= 1024  # kilobytes everywhere but macOS
+stats = {
+    "exit_code": exit_code,
+    "wall_seconds": wall,
+    "peak_rss_bytes": maxrss,
+    "gen0_collections": gc.get_stats()[0]["collections"],
+}
+if trace == "1":
+    watcher.join()
+    stats["traced_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+    snapshot = (peak["snapshot"] or tracemalloc.take_snapshot()).filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, threading.__file__),
+    ])
+    sites = snapshot.statistics("lineno")
+    stats["traced_allocations"] = sum(site.count for site in sites)
+    stats["top_allocation_sites"] = {
+        f"{site.traceback[0].filename.rsplit('/', 1)[-1]}:{site.traceback[0].lineno}": site.count
+        for site in sorted(sites, key=lambda site: site.count, reverse=True)[:int(top_sites)]
+    }
+with open(stats_path, "w") as f:
+    json.dump(stats, f)
+"""
+
+
+def _shift_cve(cve_id: str, copy: int) -> str:
+    """Give a copied release its own CVE IDs, e.g. CVE-2025-24132 -> CVE-2025-1024132"""
+    prefix, _, number = cve_id.rpartition("-")
+    if not number.isdigit():
+        return f"{cve_id}-{copy}"
+    return f"{prefix}-{int(number) + copy * 1_000_000}"
+
+
+def _shift_date(date_str: Optional[str], copy: int) -> Optional[str]:
+    """Move an ISO day date back by one day per copy so copies sort apart"""
+    try:
+        return (datetime.strptime(date_str, "%Y-%m-%d") - timedelta(days=copy)).strftime("%Y-%m-%d")
+    except (TypeError, ValueError):
+        return date_str
+
+
+def scale_security_data(resources_dir: Path, factor: int) -> Dict[str, int]:
+    """Multiply the security releases and exploited CVEs in resources_dir by factor"""
+    releases_path = resources_dir / "apple_security_releases.json"
+    kev_path = resources_dir / "kev_catalog.json"
+
+    with open(releases_path) as f:
+        releases_data = json.load(f)
+    releases = releases_data.get("releases", [])
+    with open(kev_path) as f:
+        kev_data = json.load(f)
+    kev_by_cve = {v["cveID"]: v for v in kev_data.get("vulnerabilities", []) if "cveID" in v}
+
+    scaled_releases = list(releases)
+    scaled_kev = list(kev_data.get("vulnerabilities", []))
+    for copy in range(1, factor):
+        for release in releases:
+            cves = release.get("cves") or []
+            scaled = dict(release)
+            scaled["id"] = f"{release.get('id', '')}-{copy}"
+            if release.get("version"):
+                scaled["version"] = f"{release['version']}.{copy}"
+            scaled["release_date"] = _shift_date(release.get("release_date"), copy)
+            scaled["cves"] = [_shift_cve(cve, copy) for cve in cves]
+            if release.get("cve_context"):
+                scaled["cve_context"] = {
+                    _shift_cve(cve, copy): context for cve, context in release["cve_context"].items()
+                }
+            scaled_releases.append(scaled)
+            for cve in cves:
+                if cve in kev_by_cve:
+                    scaled_kev.append({**kev_by_cve[cve], "cveID": _shift_cve(cve, copy)})
+
+    releases_data["releases"] = scaled_releases
+    kev_data["vulnerabilities"] = scaled_kev
+    kev_data["count"] = len(scaled_kev)
+    with open(releases_path, "w") as f:
+        json.dump(releases_data, f)
+    with open(kev_path, "w") as f:
+        json.dump(kev_data, f)
+
+    return {
+        "releases": len(scaled_releases),
+        "cves": sum(len(r.get("cves") or []) for r in scaled_releases),
+        "kev": len(scaled_kev),
+    }
+
+
+def prepare_workdir(factor: int) -> Path:
+    """Copy the stage inputs to a scratch directory and scale them by factor"""
+    workdir = Path(tempfile.mkdtemp(prefix=f"sofa-bench-{factor}x-"))
+    shutil.copytree(REPO_ROOT / "config", workdir / "config")
+    shutil.copytree(REPO_ROOT / "v2", workdir / "v2")
+    shutil.copytree(REPO_ROOT / "data" / "models", workdir / "data" / "models")
+    shutil.copytree(
+        REPO_ROOT / "data" / "resources", workdir / "data" / "resources",
+        ignore=shutil.ignore_patterns("history"),
+    )
+    # generate_rss.py only links SOFA pages that exist under web/, which the
+    # stages read but never write, so a link to the checkout is enough
+    (workdir / "web").symlink_to(REPO_ROOT / "web", target_is_directory=True)
+    (workdir / "v1").mkdir()
+    if factor > 1:
+        scale_security_data(workdir / "data" / "resources", factor)
+    return workdir
+
+
+def run_stage(stage: str, workdir: Path, trace: bool = False) -> Dict:
+    """Run one stage in a fresh interpreter and return its measurements"""
+    script, *args = STAGES[stage]
+    stats_path = workdir / f".bench-{stage}.json"
+    result = subprocess.run(
+        [sys.executable, "-c", STAGE_RUNNER, str(stats_path), "1" if trace else "0",
+         str(TOP_ALLOCATION_SITES), str(SCRIPTS_DIR / script), *args],
+        cwd=workdir,
+        capture_output=True,
+        text=True,
+    )
+    if not stats_path.exists():
+        raise RuntimeError(f"{stage} crashed:\n{result.stderr[-2000:]}")
+    with open(stats_path) as f:
+        stats = json.load(f)
+    stats_path.unlink()
+    if stats["exit_code"] != 0:
+        raise RuntimeError(f"{stage} exited with {stats['exit_code']}:\n{(result.stdout + result.stderr)[-2000:]}")
+    return stats
+
+
+def benchmark_stage(stage: str, workdir: Path, repeat: int) -> Dict:
+    """Median wall time and worst peak RSS over repeat runs, plus one run under tracemalloc"""
+    runs = [run_stage(stage, workdir) for _ in range(repeat)]
+    traced = run_stage(stage, workdir, trace=True)
+    return {
+        "wall_seconds": round(median(r["wall_seconds"] for r in runs), 4),
+        "peak_rss_bytes": max(r["peak_rss_bytes"] for r in runs),
+        "traced_peak_bytes": traced["traced_peak_bytes"],
+        "traced_allocations": traced["traced_allocations"],
+        "gen0_collections": traced["gen0_collections"],
+        "top_allocation_sites": traced["top_allocation_sites"],
+    }
+
+
+def find_regressions(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> List[str]:
+    """Describe every metric that grew past threshold relative to the baseline"""
+    regressions = []
+    for name, metrics in results.items():
+        if name not in baseline:
+            continue
+        for metric in METRICS:
+            old = baseline[name].get(metric)
+            new = metrics.get(metric)
+            if not old or new is None or new <= old * (1 + threshold):
+                continue
+            if metric == "wall_seconds" and new - old < WALL_NOISE_SECONDS:
+                continue
+            regressions.append(f"{name} {metric}: {old} -> {new} (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def _format_bytes(value: int) -> str:
+    return f"{value / (1024 * 1024):.1f} MB"
+
+
+def _format_change(new: float, old: Optional[float]) -> str:
+    if not old:
+        return ""
+    change = (new / old - 1) * 100
+    style = "red" if change > 0 else "green"
+    return f" [{style}]({change:+.0f}%)[/{style}]"
+
+
+@app.command()
+def main(
+    stages: Annotated[Optional[List[str]], typer.Option(
+        "--stage", help=f"Stage to run (repeatable): {', '.join(STAGES)}")] = None,
+    scales: Annotated[Optional[List[int]], typer.Option(
+        "--scale", help="Data scale factor (repeatable) [default: 1, 10, 100]")] = None,
+    repeat: int = typer.Option(3, "--repeat", help="Timed runs per stage; the median wall time is recorded"),
+    baseline_file: str = typer.Option("data/benchmarks/baseline.json", "--baseline", help="Baseline JSON to compare against"),
+    save_baseline: bool = typer.Option(False, "--save-baseline", help="Write these results as the new baseline"),
+    threshold: float = typer.Option(0.25, "--threshold", help="Allowed growth per metric before failing (0.25 = 25%)"),
+    keep_workdir: bool = typer.Option(False, "--keep-workdir", help="Keep the scratch working directories for inspection"),
+):
+    """Benchmark the Python feed stages and fail on regressions against the baseline"""
+
+    console.print(Panel.fit(
+        "[bold blue]SOFA Feed Benchmarks[/bold blue]\n"
+        "[dim]Wall time, peak RSS, tracemalloc peak and allocations and gen-0 GC runs per stage and data scale[/dim]",
+        border_style="blue"
+    ))
+
+    selected = stages or list(STAGES)
+    scales = scales or [1, 10, 100]
+    unknown = [stage for stage in selected if stage not in STAGES]
+    if unknown:
+        console.print(f"❌ Unknown stage(s): {', '.join(unknown)}", style="red")
+        raise typer.Exit(1)
+
+    baseline_path = REPO_ROOT / baseline_file
+    baseline: Dict[str, Dict] = {}
+    if baseline_path.exists():
+        with open(baseline_path) as f:
+            baseline = json.load(f).get("results", {})
+
+    results: Dict[str, Dict] = {}
+    for factor in scales:
+        workdir = prepare_workdir(factor)
+        try:
+            for stage in selected:
+                name = f"{stage}@{factor}x"
+                console.print(f"  Running [cyan]{name}[/cyan]...")
+                try:
+                    results[name] = benchmark_stage(stage, workdir, repeat)
+                except RuntimeError as e:
+                    console.print(f"❌ {e}", style="red")
+                    raise typer.Exit(1) from e
+        finally:
+            if keep_workdir:
+                console.print(f"  Working directory kept: {workdir}")
+            else:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    table = Table(title="Benchmark Results")
+    table.add_column("Stage", style="cyan")
+    table.add_column("Wall", justify="right")
+    table.add_column("Peak RSS", justify="right")
+    table.add_column("Traced Peak", justify="right")
+    table.add_column("Allocations", justify="right")
+    table.add_column("Gen-0 GCs", justify="right")
+    for name, metrics in results.items():
+        old = baseline.get(name, {})
+        table.add_row(
+            name,
+            f"{metrics['wall_seconds']:.3f}s" + _format_change(metrics["wall_seconds"], old.get("wall_seconds")),
+            _format_bytes(metrics["peak_rss_bytes"]) + _format_change(metrics["peak_rss_bytes"], old.get("peak_rss_bytes")),
+            _format_bytes(metrics["traced_peak_bytes"]) + _format_change(metrics["traced_peak_bytes"], old.get("traced_peak_bytes")),
+            f"{metrics['traced_allocations']:,}" + _format_change(metrics["traced_allocations"], old.get("traced_allocations")),
+            f"{metrics['gen0_collections']:,}" + _format_change(metrics["gen0_collections"], old.get("gen0_collections")),
+        )
+    console.print(table)
+
+    if save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        merged = {**baseline, **results}
+        with open(baseline_path, "w") as f:
+            json.dump({
+                "generated_at": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "results": dict(sorted(merged.items())),
+            }, f, indent=2)
+            f.write("\n")
+        console.print(f"✅ Baseline saved: {baseline_path}")
+        return
+
+    if not baseline:
+        console.print(f"⚠️ No baseline at {baseline_path}; run with --save-baseline to record one", style="yellow")
+        return
+
+    regressions = find_regressions(results, baseline, threshold)
+    if regressions:
+        console.print(f"❌ {len(regressions)} regression(s) past {threshold:.0%}:", style="red")
+        for regression in regressions:
+            console.print(f"   - {regression}")
+        raise typer.Exit(1)
+    console.print(f"✅ No regressions past {threshold:.0%}")
+
+
+if __name__ == "__main__":
+    app()
@@ -18,6 +18,12 @@ USAGE:
     
     # Build to specific output directory
     scripts/build_legacy_v1_feeds.py iOS --output-dir legacy_feeds/
+    
+    # Build each OS feed in its own worker process
+    scripts/build_legacy_v1_feeds.py macOS iOS --jobs 2
+    
+    # Also write JSON Patch deltas from the last 5 published versions
+    scripts/build_legacy_v1_feeds.py macOS iOS --deltas 5
 
 FEATURES:
     - Uses identical function names as legacy_build-sofa-feed.py
@@ -42,15 +48,22 @@ HARD REQUIREMENTS:
 """
 
 import argparse
-import hashlib
+import io
 import json
 import os
 import sys
-import re
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
 from datetime import datetime, timezone
+from functools import cached_property
 from pathlib import Path
 from typing import Dict, List, Optional, Any
 
+from hashed_json import compute_update_hash, read_update_hash, write_hashed_json
+from feed_dates import parse_date
+from feed_deltas import archive_feed, delta_dir_for, history_dir_for, write_feed_deltas
+from release_index import IndexedRelease, build_release_index, title_major_version, title_version
+
 # OS Version ranges to include in feeds (to match live feeds)
 OS_RANGE_MACOS = ["12", "13", "14", "15", "26"]
 OS_RANGE_IOS = ["16", "17", "18", "26"]  # Including 16 to match live feed
@@ -64,6 +77,9 @@ MACOS_NAME_TRANSFORM = {
     "12": "Monterey 12"
 }
 
+# Date formats accepted by format_iso_date; anything else passes through unchanged
+LEGACY_DATE_FORMATS = ("%Y-%m-%d", "%d %b %Y", "%B %d, %Y")
+
 # packaging import is optional, will fall back to string sorting if not available
 try:
     import packaging.version
@@ -72,21 +88,112 @@ except ImportError:
     HAS_PACKAGING = False
 
 
-def main(os_types: list):
+class FeedBuildContext:
+    """Pre-fetched inputs shared by every OS type built in one run, each loaded on first use"""
+
+    def __init__(self, delta_versions: int = 0, delta_dir: Optional[Path] = None, history_dir: Optional[Path] = None,
+                 timestamp_file: Optional[Path] = None):
+        self.delta_versions = delta_versions
+        self.delta_dir = delta_dir
+        self.history_dir = history_dir
+        self.timestamp_file = timestamp_file
+
+    @cached_property
+    def gdmf_data(self) -> dict:
+        return load_gdmf_cached_data()
+
+    @cached_property
+    def security_releases(self) -> List[Dict]:
+        return load_security_releases_data()
+
+    @cached_property
+    def release_index(self) -> Dict[tuple, List[IndexedRelease]]:
+        """Security releases keyed by (os_type, major_version)"""
+        return build_release_index(self.security_releases)
+
+    @cached_property
+    def kev_data(self) -> Dict[str, bool]:
+        return load_kev_data()
+
+    @cached_property
+    def xprotect_data(self) -> Dict:
+        return load_xprotect_data()
+
+    @cached_property
+    def uma_data(self) -> Dict:
+        return load_uma_data()
+
+    @cached_property
+    def ipsw_data(self) -> Dict:
+        return load_ipsw_data()
+
+    @cached_property
+    def model_files(self) -> Dict[str, list]:
+        """Parsed model_identifier_<name>.json files keyed by lowercase macOS name"""
+        return load_model_files()
+
+    @cached_property
+    def models_info(self) -> dict:
+        """Model identifier -> marketing name across all model files"""
+        return load_and_tag_model_data(self.model_files)
+
+    def preload(self, os_types: list) -> None:
+        """Load every input the given OS types need, e.g. before handing the context to workers"""
+        inputs = ["gdmf_data", "security_releases", "release_index", "kev_data"]
+        if "macOS" in os_types:
+            inputs += ["xprotect_data", "uma_data", "ipsw_data", "model_files", "models_info"]
+        for name in inputs:
+            getattr(self, name)
+
+
+# Context inherited (fork) or unpickled (spawn) once per worker process
+_worker_context: Optional[FeedBuildContext] = None
+
+
+def _init_worker(context: FeedBuildContext) -> None:
+    global _worker_context
+    _worker_context = context
+
+
+def _build_os_type_worker(os_type: str) -> tuple:
+    """Build one OS feed in a worker, returning its result and captured output"""
+    output = io.StringIO()
+    with redirect_stdout(output):
+        result = process_os_type(os_type, _worker_context.gdmf_data, _worker_context)
+    return result, output.getvalue()
+
+
+def main(os_types: list, jobs: int = 1, delta_versions: int = 0, delta_dir: Optional[Path] = None,
+         history_dir: Optional[Path] = None, timestamp_file: Optional[Path] = None):
     """The main function to process OS version information based on the provided OS types"""
     feed_results: list = []  # instantiate end result
     
     # Load pre-fetched data instead of live fetching
-    gdmf_data = load_gdmf_cached_data()
+    context = FeedBuildContext(delta_versions, delta_dir, history_dir, timestamp_file)
+    gdmf_data = context.gdmf_data
     if not gdmf_data:
         print("Failed to load cached GDMF data.")
         return
     
-    for os_type in os_types:
-        result = process_os_type(os_type, gdmf_data)
-        feed_results.extend(result)
+    workers = min(jobs, len(os_types))
+    if workers > 1:
+        context.preload(os_types)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(context,)) as pool:
+            for result, output in pool.map(_build_os_type_worker, os_types):
+                print(output, end="")
+                feed_results.extend(result)
+    else:
+        for os_type in os_types:
+            result = process_os_type(os_type, gdmf_data, context)
+            feed_results.extend(result)
+    
+    # Record every feed's hash; LastCheck moves forward even for unchanged feeds
+    if timestamp_file is not None:
+        for os_type, hash_value, _ in feed_results:
+            write_timestamp_and_hash(os_type, hash_value, timestamp_file)
     
-    print(f"✅ Successfully built {len(os_types)} legacy v1 feed(s)")
+    unchanged = sum(1 for _, _, changed in feed_results if not changed)
+    print(f"✅ Successfully built {len(os_types)} legacy v1 feed(s) ({unchanged} unchanged)")
 
 
 def load_gdmf_cached_data() -> dict:
@@ -211,17 +318,31 @@ def load_ipsw_data() -> Dict:
         return {}
 
 
-def load_and_tag_model_data() -> dict:
-    """Load model data from individual model_identifier_*.json files"""
+def load_model_files() -> Dict[str, list]:
+    """Parse every model_identifier_*.json file, keyed by the lowercase macOS name in its filename"""
     models_dir = Path("data/models/legacy")
-    combined_models = {}
+    model_files = {}
     
-    # Load all model identifier files
     for model_file in models_dir.glob("model_identifier_*.json"):
         try:
             with open(model_file, 'r', encoding='utf-8') as f:
-                model_data = json.load(f)
-                
+                model_files[model_file.stem.removeprefix("model_identifier_")] = json.load(f)
+        except Exception as e:
+            print(f"Warning: Could not load {model_file}: {e}")
+            continue
+    
+    return model_files
+
+
+def load_and_tag_model_data(model_files: Optional[Dict[str, list]] = None) -> dict:
+    """Load model data from individual model_identifier_*.json files"""
+    if model_files is None:
+        model_files = load_model_files()
+    combined_models = {}
+    
+    # Merge all model identifier files
+    for model_file, model_data in model_files.items():
+        try:
             # Each file contains an array of model categories
             for entry in model_data:
                 if "Identifiers" in entry:
@@ -230,28 +351,30 @@ def load_and_tag_model_data() -> dict:
                         combined_models[identifier] = model_name
                         
         except Exception as e:
-            print(f"Warning: Could not load {model_file}: {e}")
+            print(f"Warning: Could not load model_identifier_{model_file}.json: {e}")
             continue
     
     print(f"📱 Loaded {len(combined_models)} model identifiers from individual files")
     return combined_models
 
 
-def process_os_type(os_type: str, gdmf_data: dict) -> list:
+def process_os_type(os_type: str, gdmf_data: dict, context: Optional[FeedBuildContext] = None) -> list:
     """Process the given OS type (macOS, iOS) and update the feed structure"""
     print(f"🔧 Processing {os_type}...")
+    if context is None:
+        context = FeedBuildContext()
     
     feed_structure: dict = {
         "OSVersions": [],
     }
     
-    # Load supporting data
-    security_releases = load_security_releases_data()
-    kev_data = load_kev_data()
+    # Supporting data, loaded once per run
+    security_releases = context.security_releases
+    kev_data = context.kev_data
     
     if os_type == "macOS":
         # Add XProtect data for macOS
-        xprotect_data = load_xprotect_data()
+        xprotect_data = context.xprotect_data
         if xprotect_data:
             feed_structure["XProtectPlistConfigData"] = {
                 "com.apple.XProtect": str(xprotect_data.get("config_version", "")),
@@ -264,38 +387,46 @@ def process_os_type(os_type: str, gdmf_data: dict) -> list:
             }
         
         # Add Models data
-        models_info = load_and_tag_model_data()
+        models_info = context.models_info
         if models_info:
             feed_structure["Models"] = models_info
         
         # Add UMA/IPSW data
-        installation_apps = build_installation_apps()
+        installation_apps = build_installation_apps(context)
         if installation_apps:
             feed_structure["InstallationApps"] = installation_apps
     
     # Process OS versions from GDMF data
-    os_versions = build_os_versions_from_gdmf(os_type, gdmf_data, security_releases, kev_data)
+    os_versions = build_os_versions_from_gdmf(os_type, gdmf_data, security_releases, kev_data, context)
     feed_structure["OSVersions"] = os_versions
     
-    # Calculate hash and finalize structure
-    hash_value = compute_hash(feed_structure)
-    feed_structure = {
-        "UpdateHash": hash_value,  # Insert hash first
-        **feed_structure,  # Unpack other content after the hash
-    }
-    
-    # Write the feed file
+    # Normalize, hash and write the feed file; UpdateHash is inserted first.
+    # An unchanged feed is left untouched so its bytes and mtime stay stable.
     data_feed_filename = f"{os_type.lower()}_data_feed.json"
-    write_data_to_json(feed_structure, data_feed_filename)
-    
-    # Show full path if output directory is specified
     output_dir = Path(os.environ.get('OUTPUT_DIR', '.'))
     output_path = output_dir / data_feed_filename
-    print(f"✅ Created: {output_path}")
-    return []
+    previous_hash = read_previous_hash(os_type, output_path, context.timestamp_file)
+    hash_value = write_data_to_json(feed_structure, data_feed_filename, previous_hash)
+    
+    changed = hash_value != previous_hash
+    if changed:
+        print(f"✅ Created: {output_path}")
+    else:
+        print(f"⏭️  Unchanged: {output_path} (UpdateHash {hash_value[:16]}...)")
+    
+    # Archive each new version and write deltas from the versions before it
+    # Both default to locations derived from the feed's directory (--output-dir)
+    if context.delta_versions > 0 and archive_feed(
+        output_path, context.history_dir, keep=max(10, context.delta_versions + 1)
+    ):
+        delta_dir = context.delta_dir or delta_dir_for(output_dir)
+        deltas = write_feed_deltas(output_path, context.delta_versions, context.history_dir, delta_dir)
+        print(f"🧩 {len(deltas)} delta(s) to {hash_value[:16]}... in {delta_dir}")
+    return [(os_type, hash_value, changed)]
 
 
-def build_os_versions_from_gdmf(os_type: str, gdmf_data: dict, security_releases: List[Dict], kev_data: Dict[str, bool]) -> List[Dict]:
+def build_os_versions_from_gdmf(os_type: str, gdmf_data: dict, security_releases: List[Dict], kev_data: Dict[str, bool],
+                                context: Optional[FeedBuildContext] = None) -> List[Dict]:
     """Build OS versions section from GDMF data"""
     os_versions = []
     
@@ -323,7 +454,8 @@ def build_os_versions_from_gdmf(os_type: str, gdmf_data: dict, security_releases
         
         # Build security releases for this version
         security_releases_for_version = fetch_security_releases(
-            os_type, major_version, security_releases, kev_data, latest_version
+            os_type, major_version, security_releases, kev_data, latest_version,
+            context.release_index if context is not None else None
         )
         
         # Enhance latest version with security info
@@ -343,7 +475,7 @@ def build_os_versions_from_gdmf(os_type: str, gdmf_data: dict, security_releases
         
         # Add supported models for macOS  
         if os_type == "macOS":
-            compatible_machines = add_compatible_machines(os_version_name)
+            compatible_machines = add_compatible_machines(os_version_name, context)
             if compatible_machines:
                 os_version_data["SupportedModels"] = compatible_machines
         
@@ -416,19 +548,15 @@ def get_latest_version_info(versions: List[Dict]) -> Optional[Dict]:
 
 
 def fetch_security_releases(os_type: str, major_version: str, security_releases: List[Dict], 
-                          kev_data: Dict[str, bool], gdmf_latest: Dict) -> List[Dict]:
+                          kev_data: Dict[str, bool], gdmf_latest: Dict,
+                          release_index: Optional[Dict[tuple, List[IndexedRelease]]] = None) -> List[Dict]:
     """Fetch security releases for the given OS type and version"""
+    if release_index is None:
+        release_index = build_release_index(security_releases, (os_type,))
     releases = []
     
-    for release in security_releases:
-        release_name = release.get("name", "")
-        if not matches_os_version(release_name, os_type, major_version):
-            continue
-        
-        # Extract version from release name
-        version_match = extract_version_from_title(release_name)
-        if not version_match:
-            continue
+    for indexed in release_index.get((os_type, major_version), []):
+        release = indexed.release
         
         # Get CVEs for this release with exploitation status
         cves = {}
@@ -441,21 +569,12 @@ def fetch_security_releases(os_type: str, major_version: str, security_releases:
                 if is_exploited:
                     actively_exploited.append(cve_id)
         
-        # Determine release type
-        release_type = "OS"
-        if "Rapid Security Response" in release_name:
-            rsr_match = re.search(r'\((\w)\)', release_name)
-            if rsr_match:
-                release_type = f"RSR_{rsr_match.group(1)}"
-            else:
-                release_type = "RSR"
-        
         security_release = {
-            "UpdateName": release_name,
+            "UpdateName": indexed.name,
             "ProductName": os_type,
-            "ProductVersion": version_match,
+            "ProductVersion": indexed.version,
             "ReleaseDate": format_iso_date(release.get("release_date", "")),
-            "ReleaseType": release_type,
+            "ReleaseType": indexed.release_type,
             "SecurityInfo": release.get("url", ""),
             "SupportedDevices": gdmf_latest.get("SupportedDevices", []),
             "CVEs": cves,
@@ -474,56 +593,12 @@ def fetch_security_releases(os_type: str, major_version: str, security_releases:
 
 def matches_os_version(title: str, os_type: str, major_version: str) -> bool:
     """Check if security release title matches OS type and major version"""
-    title_lower = title.lower()
-    
-    if os_type == "macOS":
-        # More precise matching - check for space before version to avoid matching "10.15" when looking for "15"
-        # Match patterns like "macOS Sequoia 15", "macOS Sequoia 15.1" or "macOS 15" but not "10.15"
-        if "macos" not in title_lower:
-            return False
-        
-        # Handle base releases like "macOS Sequoia 15" (no point version)
-        # and versioned releases like "macOS Sequoia 15.1"
-        # Pattern matches: "macOS Sequoia 15" or "macOS Sequoia 15.x.x"
-        version_match = re.search(r'(?:macOS\s+(?:Sequoia|Sonoma|Ventura|Monterey|Big Sur)?\s*)(\d+)(?:\.(\d+))?', title, re.IGNORECASE)
-        if version_match:
-            extracted_major = version_match.group(1)
-            return extracted_major == major_version
-        return False
-        
-    elif os_type == "iOS":
-        if not ("ios" in title_lower or "ipados" in title_lower):
-            return False
-        
-        # Extract iOS version more precisely
-        version_match = re.search(r'(?:iOS|iPadOS)\s+(\d+(?:\.\d+)*)', title, re.IGNORECASE)
-        if version_match:
-            extracted_major = version_match.group(1).split('.')[0]
-            return extracted_major == major_version
-        return False
-    
-    return False
+    return title_major_version(title, os_type) == major_version
 
 
 def extract_version_from_title(title: str) -> Optional[str]:
     """Extract version number from security release title"""
-    # First try to match versioned releases like "15.1" or "15.1.1"
-    version_match = re.search(r'(\d+\.\d+(?:\.\d+)?)', title)
-    if version_match:
-        return version_match.group(1)
-    
-    # If no point version found, check for base releases like "macOS Sequoia 15"
-    # This matches "15" at the end of the OS name
-    base_match = re.search(r'(?:macOS\s+(?:Sequoia|Sonoma|Ventura|Monterey|Big Sur)?\s*)(\d+)$', title, re.IGNORECASE)
-    if base_match:
-        return base_match.group(1) + ".0"  # Return as "15.0" for consistency
-    
-    # For iOS, similar logic
-    ios_base_match = re.search(r'(?:iOS|iPadOS)\s+(\d+)$', title, re.IGNORECASE)
-    if ios_base_match:
-        return ios_base_match.group(1) + ".0"
-    
-    return None
+    return title_version(title)
 
 
 def enhance_latest_with_security_info(latest_info: Dict, security_releases: List[Dict]) -> None:
@@ -541,7 +616,7 @@ def enhance_latest_with_security_info(latest_info: Dict, security_releases: List
             latest_info["ReleaseDate"] = security_date
 
 
-def build_installation_apps() -> Dict:
+def build_installation_apps(context: Optional[FeedBuildContext] = None) -> Dict:
     """Build UMA and IPSW data for macOS"""
     installation_apps = {
         "LatestUMA": None,
@@ -550,7 +625,7 @@ def build_installation_apps() -> Dict:
     }
     
     # Load UMA data
-    uma_data = load_uma_data()
+    uma_data = context.uma_data if context is not None else load_uma_data()
     if uma_data:
         uma_entries = []
         for product_key, product_data in uma_data.items():
@@ -578,7 +653,7 @@ def build_installation_apps() -> Dict:
                 installation_apps["AllPreviousUMA"] = uma_entries[1:] if len(uma_entries) > 1 else []
     
     # Load IPSW data
-    ipsw_data = load_ipsw_data()
+    ipsw_data = context.ipsw_data if context is not None else load_ipsw_data()
     if ipsw_data and isinstance(ipsw_data, dict) and "url" in ipsw_data:
         apple_slug = ipsw_data.get("url", "").split("/")[-1].replace(".ipsw", "")
         installation_apps["LatestMacIPSW"] = {
@@ -591,7 +666,7 @@ def build_installation_apps() -> Dict:
     return installation_apps
 
 
-def add_compatible_machines(current_macos_full_version: str) -> List[Dict]:
+def add_compatible_machines(current_macos_full_version: str, context: Optional[FeedBuildContext] = None) -> List[Dict]:
     """Add compatible machines for the given macOS version, only processed for macOS
     
     This follows the same logic as the original legacy_build-sofa-feed.py:
@@ -604,12 +679,18 @@ def add_compatible_machines(current_macos_full_version: str) -> List[Dict]:
     # Look for model_identifier file in data/models/legacy directory
     filename = Path(f"data/models/legacy/model_identifier_{current_macos_name}.json")
     
-    try:
-        with open(filename, "r", encoding="utf-8") as file:
-            data = json.load(file)
-    except FileNotFoundError:
-        print(f"File not found: {filename}")
-        return []
+    if context is not None:
+        data = context.model_files.get(current_macos_name)
+        if data is None:
+            print(f"File not found: {filename}")
+            return []
+    else:
+        try:
+            with open(filename, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            print(f"File not found: {filename}")
+            return []
     
     compatible_machines = []
     for entry in data:
@@ -632,32 +713,19 @@ def format_iso_date(date_str: str) -> str:
         return ""
     
     # Handle various date formats
-    formats = ["%Y-%m-%d", "%d %b %Y", "%B %d, %Y"]
-    for fmt in formats:
-        try:
-            return (
-                datetime.strptime(date_str, fmt).replace(microsecond=0).isoformat()
-                + "Z"
-            )
-        except ValueError:
-            pass
+    parsed = parse_date(date_str, LEGACY_DATE_FORMATS)
+    if parsed is not None:
+        return parsed.replace(microsecond=0).isoformat() + "Z"
     return date_str
 
 
 def compute_hash(data: dict) -> str:
-    """Computes SHA-256 hash of the given data, typically a dict. Returns a hexadecimal str"""
-    json_str = json.dumps(
-        data, sort_keys=True
-    ).encode()  # sorts to always produce consistent result
-    return hashlib.sha256(json_str).hexdigest()
+    """Computes the UpdateHash of the given feed data (its on-disk serialization without UpdateHash)"""
+    return compute_update_hash(data)
 
 
-def write_data_to_json(feed_structure: dict, filename: str):
-    """Writes the fully populated feed structure to JSON filename"""
-    # Get output directory from environment or use current directory
-    output_dir = Path(os.environ.get('OUTPUT_DIR', '.'))
-    output_path = output_dir / filename
-    
+def normalize_feed_structure(feed_structure: dict) -> None:
+    """Fill in Latest defaults and move Latest dates to matching security releases, in place"""
     latest_versions = {}
 
     for os_version in feed_structure["OSVersions"]:
@@ -703,11 +771,57 @@ def write_data_to_json(feed_structure: dict, filename: str):
             latest_dict["ReleaseDate"] = new_date
             print(f"Updated {product_version} ReleaseDate from {original_date} to {new_date}")
 
-    # Write the updated feed structure back to a file
-    with open(output_path, "w", encoding="utf-8") as json_file:
-        json.dump(
-            feed_structure, json_file, indent=4, ensure_ascii=False
-        )
+
+def write_data_to_json(feed_structure: dict, filename: str, previous_hash: Optional[str] = None) -> str:
+    """Writes the fully populated feed structure to JSON filename and returns its UpdateHash"""
+    # Get output directory from environment or use current directory
+    output_dir = Path(os.environ.get('OUTPUT_DIR', '.'))
+    output_path = output_dir / filename
+
+    normalize_feed_structure(feed_structure)
+    return write_hashed_json(feed_structure, output_path, keep_if_hash=previous_hash)
+
+
+def load_timestamp_data(filename: Path) -> dict:
+    """Load timestamp.json, or an empty mapping if it is missing or invalid"""
+    try:
+        with open(filename, "r", encoding="utf-8") as file:
+            timestamp_data = json.load(file)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    return timestamp_data if isinstance(timestamp_data, dict) else {}
+
+
+def read_previous_hash(os_type: str, output_path: Path, timestamp_file: Optional[Path] = None) -> Optional[str]:
+    """UpdateHash at the head of the published feed, if any; with a timestamp_file, only if it agrees"""
+    current = read_update_hash(output_path)
+    if timestamp_file is None:
+        return current
+    recorded = load_timestamp_data(timestamp_file).get(os_type, {}).get("UpdateHash")
+    return current if recorded and current == recorded else None
+
+
+def write_timestamp_and_hash(os_type: str, hash_value: str, filename: Path):
+    """Record the check time and hash value for os_type in timestamp.json
+    {
+        "macOS": {
+            "LastCheck": "timestamp",
+            "UpdateHash": "hash_value"
+        },
+        "iOS": { ...
+    Only LastCheck and UpdateHash of os_type are set; everything else is kept as it is.
+    """
+    last_check = datetime.now(timezone.utc).replace(microsecond=0).isoformat() + "Z"
+    timestamp_data = load_timestamp_data(filename)
+    entry = timestamp_data.get(os_type)
+    if not isinstance(entry, dict):
+        entry = timestamp_data[os_type] = {}
+    entry.update({"LastCheck": last_check, "UpdateHash": hash_value})
+
+    tmp_path = filename.with_name(filename.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as timestamp_file:
+        json.dump(timestamp_data, timestamp_file, indent=2)
+    os.replace(tmp_path, filename)
 
 
 def validate_feeds_against_live(output_dir: str = "."):
@@ -827,6 +941,34 @@ if __name__ == "__main__":
         default=Path("."),
         help="Output directory for feed files"
     )
+    parser.add_argument(
+        "--jobs", "-j",
+        type=int,
+        default=1,
+        help="Build each OS feed in up to N worker processes (default: 1, serial)"
+    )
+    parser.add_argument(
+        "--deltas",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Write JSON Patch deltas from the last N published versions of each feed (default: 0, off)"
+    )
+    parser.add_argument(
+        "--delta-dir",
+        type=Path,
+        help="Output directory for delta feeds (default: <output-dir>/deltas)"
+    )
+    parser.add_argument(
+        "--history-dir",
+        type=Path,
+        help=f"Archive of published feed versions (default: {history_dir_for(Path('v1'))} for --output-dir v1)"
+    )
+    parser.add_argument(
+        "--timestamp-file",
+        type=Path,
+        help="Record LastCheck and UpdateHash of each built feed in this timestamp.json (default: not written)"
+    )
     parser.add_argument(
         "--validate",
         action="store_true",
@@ -864,7 +1006,7 @@ if __name__ == "__main__":
     os.environ['OUTPUT_DIR'] = str(args.output_dir)
     
     # Build the feeds
-    main(args.osTypes)
+    main(args.osTypes, args.jobs, args.deltas, args.delta_dir, args.history_dir, args.timestamp_file)
     
     # If validate flag is also set, validate the generated feeds
     if args.validate:
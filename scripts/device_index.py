@@ -0,0 +1,368 @@
+"""
+Indexed in-memory view of the device sources for device_manager.py
+Loads every data/models/sources/*_devices.json once and indexes the devices
+"""
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+SOURCES_DIR = Path("data/models/sources")
+INDEX_CACHE_FILE = Path("data/cache/device_index.json")
+
+# Bumped whenever the cached layout changes
+INDEX_CACHE_VERSION = 3
+
+# The postings persisted in the cache; records, platforms and ids come from the sources
+CACHED_INDEXES = ("tokens", "processors", "statuses", "majors", "by_platform", "trigrams")
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# (platform, device_id, device_info)
+DeviceRecord = Tuple[str, str, Dict[str, Any]]
+
+# How much a query word matching each field counts towards a device's score
+RANK_FIELD_WEIGHTS = {"DeviceID": 3.0, "marketingName": 2.0, "processorFamily": 1.5}
+
+# Shorthand expanded before ranking
+QUERY_ABBREVIATIONS = {
+    "mbp": "macbook pro",
+    "mba": "macbook air",
+    "mm": "mac mini",
+    "ms": "mac studio",
+    "mp": "mac pro",
+    "atv": "apple tv",
+    "aw": "apple watch",
+}
+
+# Characters that can appear in an indexed trigram: token characters and the "$" pad
+_GRAM_CHARS = "$abcdefghijklmnopqrstuvwxyz0123456789"
+
+# Trigram overlap (Jaccard) below which two words are not considered alike
+FUZZY_THRESHOLD = 0.4
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric runs of text, e.g. "Mac15,4 M3" -> ["mac15", "4", "m3"]"""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def search_text(device_id: str, device_info: Dict[str, Any]) -> str:
+    """The text a device is searched by: its ID, marketing name and processor"""
+    return f"{device_id} {device_info.get('marketingName', '')} {device_info.get('processorFamily', '')}".lower()
+
+
+def trigrams(token: str) -> Set[str]:
+    """Trigrams of token padded with "$", e.g. "m3" -> {"$m3", "m3$"}"""
+    padded = f"${token}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def token_similarity(query_token: str, token: str) -> float:
+    """1.0 for the same word, less for a prefix or a near miss, 0.0 otherwise"""
+    if query_token == token:
+        return 1.0
+    if len(query_token) >= 2 and token.startswith(query_token):
+        return 0.6 + 0.3 * len(query_token) / len(token)
+    query_grams = trigrams(query_token)
+    grams = trigrams(token)
+    overlap = len(query_grams & grams) / len(query_grams | grams)
+    return 0.6 * overlap if overlap >= FUZZY_THRESHOLD else 0.0
+
+
+def query_tokens(query: str) -> List[str]:
+    """Tokens of query with abbreviations such as "mbp" spelled out, duplicates dropped"""
+    tokens: List[str] = []
+    for token in tokenize(query):
+        for expanded in tokenize(QUERY_ABBREVIATIONS.get(token, token)):
+            if expanded not in tokens:
+                tokens.append(expanded)
+    return tokens
+
+
+def source_signature(sources_dir: Path = SOURCES_DIR) -> Dict[str, List[int]]:
+    """mtime and size of every platform source, keyed by file name"""
+    signature = {}
+    for source_file in sorted(sources_dir.glob("*_devices.json")):
+        stat = source_file.stat()
+        signature[source_file.name] = [stat.st_mtime_ns, stat.st_size]
+    return signature
+
+
+def read_sources(sources_dir: Path = SOURCES_DIR) -> Tuple[Dict[str, List[int]], Dict[str, Dict[str, Any]], List[DeviceRecord]]:
+    """The signature, per-platform summary and device records of every platform source, in source order"""
+    sources = source_signature(sources_dir)
+    platforms: Dict[str, Dict[str, Any]] = {}
+    records: List[DeviceRecord] = []
+
+    for file_name in sources:
+        platform = file_name.removesuffix("_devices.json")
+        source_file = sources_dir / file_name
+        entry: Dict[str, Any] = {"file": str(source_file), "file_size": sources[file_name][1]}
+        try:
+            with open(source_file) as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            entry["error"] = str(e)
+            platforms[platform] = entry
+            continue
+
+        devices = data.get("devices", {})
+        entry["metadata"] = data.get("metadata", {})
+        entry["device_count"] = len(devices)
+        platforms[platform] = entry
+        records.extend((platform, device_id, info) for device_id, info in devices.items())
+
+    return sources, platforms, records
+
+
+class DeviceIndex:
+    """All platform sources loaded once, with inverted indexes over their devices"""
+
+    def __init__(self, sources: Dict[str, List[int]], platforms: Dict[str, Dict[str, Any]],
+                 records: List[DeviceRecord]):
+        self.sources = sources
+        self.platforms = platforms
+        self.records = records
+
+        self.ids: Dict[str, int] = {}
+        self.tokens: Dict[str, List[int]] = {}
+        self.processors: Dict[str, List[int]] = {}
+        self.statuses: Dict[str, List[int]] = {}
+        self.majors: Dict[str, List[int]] = {}
+        self.by_platform: Dict[str, List[int]] = {platform: [] for platform in platforms}
+        self.trigrams: Dict[str, List[str]] = {}
+
+        for ordinal, (platform, device_id, info) in enumerate(records):
+            self.ids.setdefault(device_id.lower(), ordinal)
+            self.by_platform[platform].append(ordinal)
+            for token in set(tokenize(search_text(device_id, info))):
+                self.tokens.setdefault(token, []).append(ordinal)
+            self.processors.setdefault(str(info.get("processorFamily", "")).lower(), []).append(ordinal)
+            self.statuses.setdefault(str(info.get("support_status", "")), []).append(ordinal)
+            for major in info.get("supportedMajor", []) or []:
+                self.majors.setdefault(str(major), []).append(ordinal)
+
+        for token in self.tokens:
+            for gram in trigrams(token):
+                self.trigrams.setdefault(gram, []).append(token)
+
+    @classmethod
+    def build(cls, sources_dir: Path = SOURCES_DIR) -> "DeviceIndex":
+        """Read every platform source and index its devices"""
+        return cls(*read_sources(sources_dir))
+
+    @classmethod
+    def load(cls, sources_dir: Path = SOURCES_DIR, cache_file: Optional[Path] = INDEX_CACHE_FILE) -> "DeviceIndex":
+        """The sources with the cached postings if they are unchanged since it was written, else a fresh index"""
+        sources, platforms, records = read_sources(sources_dir)
+        if cache_file and cache_file.exists():
+            try:
+                with open(cache_file) as f:
+                    cached = json.load(f)
+                if (cached.get("version") == INDEX_CACHE_VERSION
+                        and cached.get("sources_dir") == str(sources_dir)
+                        and cached.get("sources") == sources
+                        and cached.get("record_count") == len(records)):
+                    return cls._from_cache(sources, platforms, records, cached)
+            except (OSError, json.JSONDecodeError, KeyError, TypeError, ValueError):
+                pass
+
+        index = cls(sources, platforms, records)
+        if cache_file:
+            index.save(cache_file, sources_dir)
+        return index
+
+    @classmethod
+    def _from_cache(cls, sources: Dict[str, List[int]], platforms: Dict[str, Dict[str, Any]],
+                    records: List[DeviceRecord], cached: Dict[str, Any]) -> "DeviceIndex":
+        index = cls.__new__(cls)
+        index.sources = sources
+        index.platforms = platforms
+        index.records = records
+        index.ids = {}
+        for ordinal, (_, device_id, _) in enumerate(records):
+            index.ids.setdefault(device_id.lower(), ordinal)
+        for name in CACHED_INDEXES:
+            setattr(index, name, cached[name])
+        return index
+
+    def save(self, cache_file: Path = INDEX_CACHE_FILE, sources_dir: Path = SOURCES_DIR) -> None:
+        """Write the postings to cache_file; an unwritable cache only costs a rebuild next time"""
+        payload = {
+            "version": INDEX_CACHE_VERSION,
+            "sources_dir": str(sources_dir),
+            "sources": self.sources,
+            "record_count": len(self.records),
+            **{name: getattr(self, name) for name in CACHED_INDEXES},
+        }
+        tmp_path = cache_file.with_name(cache_file.name + ".tmp")
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump(payload, f, separators=(",", ":"))
+            os.replace(tmp_path, cache_file)
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+
+    def _records(self, ordinals: Iterable[int]) -> List[DeviceRecord]:
+        return [self.records[ordinal] for ordinal in sorted(ordinals)]
+
+    def _postings_containing(self, postings: Dict[str, List[int]], needle: str) -> Set[int]:
+        """Union of the postings of every key that contains needle; used for the few processor families"""
+        matches: Set[int] = set()
+        for key, ordinals in postings.items():
+            if needle in key:
+                matches.update(ordinals)
+        return matches
+
+    def _tokens_containing(self, needle: str) -> Set[str]:
+        """Indexed tokens that contain needle, looked up through the trigram index"""
+        if len(needle) >= 3:
+            # A token containing the needle has every trigram of it; start from the rarest
+            grams = sorted({needle[i:i + 3] for i in range(len(needle) - 2)},
+                           key=lambda gram: len(self.trigrams.get(gram, ())))
+            tokens = set(self.trigrams.get(grams[0], ()))
+            for gram in grams[1:]:
+                if not tokens:
+                    break
+                tokens.intersection_update(self.trigrams.get(gram, ()))
+        elif len(needle) == 2:
+            # The character before it, or the "$" pad, completes a trigram
+            tokens = set().union(*(self.trigrams.get(char + needle, ()) for char in _GRAM_CHARS))
+        else:
+            # A single character: the trigram keys are bounded by the alphabet, not the device count
+            tokens = set()
+            for gram, gram_tokens in self.trigrams.items():
+                if needle == gram[1]:
+                    tokens.update(gram_tokens)
+        return {token for token in tokens if needle in token}
+
+    def devices(self, platform: str = "") -> List[DeviceRecord]:
+        """Devices of one platform, or of all platforms, in source order"""
+        if platform:
+            return self._records(self.by_platform.get(platform, []))
+        return list(self.records)
+
+    def get(self, device_id: str) -> Optional[DeviceRecord]:
+        ordinal = self.ids.get(device_id.lower())
+        return self.records[ordinal] if ordinal is not None else None
+
+    def search(self, query: str, platform: str = "") -> List[DeviceRecord]:
+        """Devices whose ID, marketing name or processor contains query (case-insensitive)"""
+        query_lower = query.lower()
+        # Every alphanumeric run of the query lies inside one token of a match
+        candidates: Optional[Set[int]] = None
+        for token in sorted(set(tokenize(query_lower)), key=len, reverse=True):
+            matches = {ordinal for match in self._tokens_containing(token) for ordinal in self.tokens[match]}
+            candidates = matches if candidates is None else candidates & matches
+            if not candidates:
+                return []
+        if candidates is None:
+            candidates = set(range(len(self.records)))
+        if platform:
+            candidates &= set(self._platform_ordinals(platform))
+
+        return [
+            record for record in self._records(candidates)
+            if query_lower in search_text(record[1], record[2])
+        ]
+
+    def similar_tokens(self, query_token: str) -> Dict[str, float]:
+        """Indexed tokens resembling query_token, with their token_similarity"""
+        # A prefix or near miss shares at least one trigram with the query word
+        candidates: Set[str] = set()
+        for gram in trigrams(query_token):
+            candidates.update(self.trigrams.get(gram, ()))
+        similar = {}
+        for token in candidates:
+            similarity = token_similarity(query_token, token)
+            if similarity:
+                similar[token] = similarity
+        return similar
+
+    def rank(self, query: str, platform: str = "", limit: Optional[int] = None) -> List[Tuple[float, DeviceRecord]]:
+        """Devices matching query best first, as (score, record) pairs"""
+        words = query_tokens(query)
+        if not words:
+            return []
+
+        word_matches = [self.similar_tokens(word) for word in words]
+        candidates: Set[int] = set()
+        for matches in word_matches:
+            for token in matches:
+                candidates.update(self.tokens[token])
+        if platform:
+            candidates &= set(self._platform_ordinals(platform))
+
+        query_lower = query.lower().strip()
+        scored = []
+        for ordinal in candidates:
+            _, device_id, info = self.records[ordinal]
+            field_tokens = [(weight, self._field_tokens(field, device_id, info))
+                            for field, weight in RANK_FIELD_WEIGHTS.items()]
+            score = 0.0
+            for matches in word_matches:
+                score += max(
+                    (matches.get(token, 0.0) * weight for weight, tokens in field_tokens for token in tokens),
+                    default=0.0,
+                )
+            if query_lower in search_text(device_id, info):
+                score += max(RANK_FIELD_WEIGHTS.values())
+            # Prefer the name the query describes most completely:
+            # "mbp m3 14" puts MacBook Pro (14-inch, M3) before the M3 Max models
+            name_tokens = self._field_tokens("marketingName", device_id, info)
+            if name_tokens:
+                described = sum(1 for token in name_tokens if any(token in matches for matches in word_matches))
+                score += 0.5 * described / len(name_tokens)
+            scored.append((score, ordinal))
+
+        if not scored:
+            return []
+        # Drop devices scoring under half the best; ties keep source order
+        cutoff = max(score for score, _ in scored) / 2
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        ranked = [(round(score, 2), self.records[ordinal]) for score, ordinal in scored if score >= cutoff]
+        return ranked[:limit] if limit else ranked
+
+    @staticmethod
+    def _field_tokens(field: str, device_id: str, info: Dict[str, Any]) -> Set[str]:
+        if field == "DeviceID":
+            # The bare numbers of "Mac16,13" say nothing on their own
+            return {token for token in tokenize(device_id) if not token.isdigit()}
+        return set(tokenize(str(info.get(field, ""))))
+
+    def _platform_ordinals(self, platform: str) -> List[int]:
+        # Matches the old file-stem test: "ipad" selects ipados, "os" selects all
+        return [ordinal for name, ordinals in self.by_platform.items() if platform in f"{name}_devices"
+                for ordinal in ordinals]
+
+    def filter(self, platform: str = "", status: str = "", processor: str = "",
+               major: str = "") -> List[DeviceRecord]:
+        """Devices matching every given filter, in source order"""
+        candidates: Set[int] = set(self.by_platform.get(platform, [])) if platform else set(range(len(self.records)))
+        if status:
+            candidates &= set(self.statuses.get(status, []))
+        if processor:
+            candidates &= self._postings_containing(self.processors, processor.lower())
+        if major:
+            candidates &= set(self.majors.get(major, []))
+        return self._records(candidates)
+
+    def count_by_status(self, platform: str) -> Dict[str, int]:
+        ordinals = set(self.by_platform.get(platform, []))
+        return {status: len(ordinals.intersection(postings)) for status, postings in self.statuses.items()}
+
+    def __iter__(self) -> Iterator[DeviceRecord]:
+        return iter(self.records)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+
+def find_devices(query: str, platform: str = "", limit: Optional[int] = 20,
+                 sources_dir: Path = SOURCES_DIR) -> List[Tuple[float, DeviceRecord]]:
+    """Ranked search over the (cached) device index, e.g. find_devices("mbp m3 14")"""
+    return DeviceIndex.load(sources_dir).rank(query, platform, limit)
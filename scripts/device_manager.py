@@ -12,13 +12,19 @@ SOFA Device Manager - One Script for All Device Maintenance
 Simple flags for the 3 core maintenance scenarios
 """
 
+import csv
+import hashlib
 import json
-import typer
-from pathlib import Path
+import os
+import re
 from datetime import datetime
+from pathlib import Path
+
+import typer
+from device_index import DeviceIndex
 from rich.console import Console
+from rich.prompt import Confirm, Prompt
 from rich.table import Table
-from rich.prompt import Prompt, Confirm
 
 console = Console()
 app = typer.Typer(help="SOFA Device Manager - Simple device maintenance")
@@ -36,6 +42,7 @@ DEVICE_PATTERNS = {
             "M2": ["tahoe", "sequoia", "sonoma", "ventura"],
             "M1": ["tahoe", "sequoia", "sonoma", "ventura", "monterey"],
         },
+        "device_id": r"(Mac|MacBook|MacBookAir|MacBookPro|MacPro|Macmini|iMac|iMacPro|VirtualMac)\d+,\d+(-Rack)?|VMM-x86_64",
         "urls": {
             "MacBook Air": "https://support.apple.com/en-ca/HT201862",
             "MacBook Pro": "https://support.apple.com/en-ca/HT201300",
@@ -47,18 +54,22 @@ DEVICE_PATTERNS = {
     },
     "ios": {
         "processors": {"A18": ["18", "17", "16"], "A17": ["18", "17", "16"], "A16": ["18", "17", "16"], "A15": ["18", "17", "16"]},
+        "device_id": r"iPhone\d+,\d+",
         "url": "https://support.apple.com/en-ca/108044"
     },
     "ipados": {
         "processors": {"M4": ["18", "17", "16"], "M2": ["18", "17", "16"], "M1": ["18", "17", "16"], "A15": ["18", "17", "16"]},
+        "device_id": r"iPad\d+,\d+",
         "url": "https://support.apple.com/en-ca/108043"
     },
     "watchos": {
         "processors": {"S10": ["11", "10"], "S9": ["11", "10", "9"], "S8": ["11", "10", "9"], "S7": ["11", "10", "9"]},
+        "device_id": r"Watch\d+,\d+",
         "url": "https://support.apple.com/en-ca/108042"
     },
     "tvos": {
         "processors": {"A15": ["18", "17", "16"], "A12": ["18", "17", "16"], "A10X": ["18", "17", "16"]},
+        "device_id": r"AppleTV\d+,\d+",
         "url": "https://support.apple.com/apple-tv"
     }
 }
@@ -72,98 +83,191 @@ def _matches_filter(device_info, filter_str):
             return True
     return False
 
-def rebuild_database():
+# Platform order: macOS first, then iPads, iOS, tvOS, watchOS
+PLATFORM_ORDER = ["macos", "ipados", "ios", "tvos", "watchos"]
+
+# Source signatures, device IDs and output spans behind the current unified outputs
+REBUILD_STATE_FILE = Path("data/cache/device_rebuild_state.json")
+
+# Bumped whenever the rebuild state layout changes
+REBUILD_STATE_VERSION = 2
+
+def _write_atomic(path, text):
+    """Write text to path through a temporary sibling so readers never see a partial file"""
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def _file_signature(path):
+    """mtime and size of path; a file whose signature is unchanged is not re-read"""
+    stat = path.stat()
+    return [stat.st_mtime_ns, stat.st_size]
+
+def _platform_sources():
+    """Platform source files in hierarchical order, then any other platforms by name"""
+    sources = [(platform, SOURCES_DIR / f"{platform}_devices.json") for platform in PLATFORM_ORDER]
+    sources = [(platform, path) for platform, path in sources if path.exists()]
+    for source_file in sorted(SOURCES_DIR.glob("*_devices.json")):
+        platform = source_file.stem.replace("_devices", "")
+        if platform not in PLATFORM_ORDER:
+            sources.append((platform, source_file))
+    return sources
+
+def sync_device_counts(platforms):
+    """Set metadata.device_count to the length of the device list in each platform's source"""
+    for platform in platforms:
+        source_file = SOURCES_DIR / f"{platform}_devices.json"
+        with open(source_file) as f:
+            data = json.load(f)
+        data.setdefault("metadata", {})["device_count"] = len(data.get("devices", {}))
+        _write_atomic(source_file, json.dumps(data, indent=2))
+
+def _load_rebuild_state(output_file, ndjson_file):
+    """Previous rebuild state, or None when the outputs were changed since it was written"""
+    if not (REBUILD_STATE_FILE.exists() and output_file.exists() and ndjson_file.exists()):
+        return None
+    try:
+        with open(REBUILD_STATE_FILE) as f:
+            state = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if state.get("version") != REBUILD_STATE_VERSION:
+        return None
+    outputs = state.get("outputs", {})
+    if outputs.get("json") != _file_signature(output_file) or outputs.get("ndjson") != _file_signature(ndjson_file):
+        return None
+    return state
+
+def _json_member(key, value):
+    """key's member of the unified JSON, laid out as json.dumps(unified_db, indent=2) does"""
+    return json.dumps({key: value}, indent=2)[2:-2]
+
+def _join_segments(head, segments, separator, tail):
+    """head and the non-empty platform segments joined by separator, plus each platform's span in the result"""
+    parts = [head]
+    spans = {}
+    position = len(head)
+    for platform, segment in segments:
+        if segment:
+            position += len(separator)
+            parts.append(segment)
+        spans[platform] = [position, position + len(segment)]
+        position += len(segment)
+    return separator.join(parts) + tail, spans
+
+def rebuild_database(full=False):
     """Rebuild unified database from platform sources with hierarchical sorting"""
     console.print("🔨 Rebuilding unified database...", style="cyan")
     
-    # Platform order: macOS first, then iPads, iOS, tvOS, watchOS  
-    platform_order = ["macos", "ipados", "ios", "tvos", "watchos"]
+    output_file = OUTPUT_DIR / "all_devices_enhanced.json"
+    ndjson_file = OUTPUT_DIR / "all_devices_enhanced.ndjson"
     
-    all_devices = {}
-    platform_count = 0
+    sources = _platform_sources()
+    state = None if full else _load_rebuild_state(output_file, ndjson_file)
+    previous = state.get("platforms", {}) if state else {}
+    
+    # A source with the recorded mtime and size is unchanged; any other is read,
+    # and only parsed when its content hash differs from the recorded one. As in
+    # git's racy-clean check, a source modified no earlier than the state was
+    # written may have changed within the same timestamp, so it is re-read too.
+    trusted_before = REBUILD_STATE_FILE.stat().st_mtime_ns if state else 0
+    platforms = {}
+    changed = {}
+    reread = False
+    for platform, source_file in sources:
+        signature = _file_signature(source_file)
+        entry = previous.get(platform)
+        if entry and entry["signature"] == signature and signature[0] < trusted_before:
+            platforms[platform] = entry
+            continue
+        content = source_file.read_bytes()
+        sha256 = hashlib.sha256(content).hexdigest()
+        if entry and entry["sha256"] == sha256:
+            platforms[platform] = {**entry, "signature": signature}
+            reread = True
+            continue
+        devices = json.loads(content).get("devices", {})
+        changed[platform] = devices
+        platforms[platform] = {"signature": signature, "sha256": sha256, "devices": list(devices)}
+    
+    REBUILD_STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    if state and not changed and set(previous) == set(platforms):
+        if reread:
+            _write_atomic(REBUILD_STATE_FILE, json.dumps({**state, "platforms": platforms}, indent=2))
+        console.print("✅ Database up to date - no platform sources changed", style="green")
+        return
     
-    # Build devices in hierarchical order
-    for platform in platform_order:
-        platform_file = SOURCES_DIR / f"{platform}_devices.json"
-        if platform_file.exists():
-            with open(platform_file) as f:
-                data = json.load(f)
-                
-                devices = data.get("devices", {})
-                
-                # Update metadata device_count to match actual count
-                actual_count = len(devices)
-                if data.get("metadata", {}).get("device_count", 0) != actual_count:
-                    data["metadata"]["device_count"] = actual_count
-                    # Write back corrected metadata
-                    with open(platform_file, "w") as f_write:
-                        json.dump(data, f_write, indent=2)
-                
-                # Preserve existing order from source files - no sorting
-                # Only new devices added via add-device get placed at top of their platform file
-                for device_id, device_data in devices.items():
-                    all_devices[device_id] = device_data
-                    
-                platform_count += 1
-    
-    # Add any remaining platforms not in our order
-    for source_file in SOURCES_DIR.glob("*_devices.json"):
-        platform = source_file.stem.replace("_devices", "")
-        if platform not in platform_order:
+    device_ids = [device_id for entry in platforms.values() for device_id in entry["devices"]]
+    if len(set(device_ids)) != len(device_ids):
+        # A device ID listed by two platforms keeps its first position and last
+        # value, which platform spans cannot express: build the outputs whole
+        # and leave no state, so the next rebuild is full too
+        console.print("   ⚠️  Device IDs repeat across platforms - rebuilding in full", style="yellow")
+        all_devices = {}
+        for _, source_file in sources:
             with open(source_file) as f:
-                data = json.load(f)
-                devices = data.get("devices", {})
-                
-                # Update metadata device_count to match actual count
-                actual_count = len(devices)
-                if data.get("metadata", {}).get("device_count", 0) != actual_count:
-                    data["metadata"]["device_count"] = actual_count
-                    # Write back corrected metadata
-                    with open(source_file, "w") as f_write:
-                        json.dump(data, f_write, indent=2)
-                
-                # Preserve existing order from source files
-                for device_id, device_data in devices.items():
-                    all_devices[device_id] = device_data
-                    
-                platform_count += 1
+                all_devices.update(json.load(f).get("devices", {}))
+        REBUILD_STATE_FILE.unlink(missing_ok=True)
+    else:
+        all_devices = None
     
     # Add metadata
-    unified_db = {
-        "_metadata": {
-            "generated_at": datetime.now().isoformat(),
-            "schema_version": "1.0",
-            "total_devices": len(all_devices),
-            "platforms_loaded": platform_count,
-            "platform_order": platform_order,
-            "source": "device_manager_script"
-        }
+    metadata = {
+        "generated_at": datetime.now().isoformat(),
+        "schema_version": "1.0",
+        "total_devices": len(all_devices) if all_devices is not None else len(device_ids),
+        "platforms_loaded": len(sources),
+        "platform_order": PLATFORM_ORDER,
+        "source": "device_manager_script"
     }
     
-    # Add all devices in hierarchical order
-    unified_db.update(all_devices)
-    
-    # Write unified JSON file - use OUTPUT_DIR constant
-    output_file = OUTPUT_DIR / "all_devices_enhanced.json"
-    with open(output_file, "w") as f:
-        json.dump(unified_db, f, indent=2)
-    
-    # Write NDJSON file (one device per line)
-    ndjson_file = OUTPUT_DIR / "all_devices_enhanced.ndjson"
-    with open(ndjson_file, "w") as f:
-        # Write metadata as first line
-        f.write(json.dumps(unified_db["_metadata"]) + "\n")
+    if all_devices is not None:
+        _write_atomic(output_file, json.dumps({"_metadata": metadata, **all_devices}, indent=2))
+        lines = [json.dumps(metadata)]
+        lines.extend(json.dumps({"device_id": device_id, **device_data}) for device_id, device_data in all_devices.items())
+        _write_atomic(ndjson_file, "\n".join(lines) + "\n")
+    else:
+        # Serialize only the changed platforms; every other platform's devices are
+        # copied from their recorded spans in the current outputs. ensure_ascii keeps
+        # character offsets equal to byte offsets.
+        json_text = output_file.read_text() if len(changed) < len(platforms) else ""
+        ndjson_text = ndjson_file.read_text() if len(changed) < len(platforms) else ""
+        json_segments = []
+        ndjson_segments = []
+        for platform, entry in platforms.items():
+            if platform in changed:
+                devices = changed[platform].items()
+                json_segments.append((platform, ",\n".join(_json_member(device_id, data) for device_id, data in devices)))
+                ndjson_segments.append((platform, "\n".join(
+                    json.dumps({"device_id": device_id, **data}) for device_id, data in devices)))
+            else:
+                json_start, json_end = entry["json"]
+                ndjson_start, ndjson_end = entry["ndjson"]
+                json_segments.append((platform, json_text[json_start:json_end]))
+                ndjson_segments.append((platform, ndjson_text[ndjson_start:ndjson_end]))
+        
+        unified_json, json_spans = _join_segments("{\n" + _json_member("_metadata", metadata), json_segments, ",\n", "\n}")
+        unified_ndjson, ndjson_spans = _join_segments(json.dumps(metadata), ndjson_segments, "\n", "\n")
+        _write_atomic(output_file, unified_json)
+        _write_atomic(ndjson_file, unified_ndjson)
         
-        # Write each device as separate line
-        for device_id, device_data in all_devices.items():
-            device_record = {"device_id": device_id, **device_data}
-            f.write(json.dumps(device_record) + "\n")
+        for platform, entry in platforms.items():
+            entry["json"] = json_spans[platform]
+            entry["ndjson"] = ndjson_spans[platform]
+        _write_atomic(REBUILD_STATE_FILE, json.dumps({
+            "version": REBUILD_STATE_VERSION,
+            "platforms": platforms,
+            "outputs": {"json": _file_signature(output_file), "ndjson": _file_signature(ndjson_file)},
+        }, indent=2))
     
     json_size = f"{output_file.stat().st_size // 1024}KB"
     ndjson_size = f"{ndjson_file.stat().st_size // 1024}KB"
     
     console.print("✅ Database rebuilt successfully", style="green")
-    console.print(f"   📊 {len(all_devices)} devices from {platform_count} platforms")
+    console.print(f"   📊 {metadata['total_devices']} devices from {len(sources)} platforms")
+    if state:
+        console.print(f"   🔄 Re-read {', '.join(changed) or 'no platform'}; {len(sources) - len(changed)} platforms unchanged")
     console.print(f"   📄 JSON: {json_size} | NDJSON: {ndjson_size}")
 
 @app.command()
@@ -188,6 +292,37 @@ def add_device(
     with open(platform_file) as f:
         data = json.load(f)
     
+    new_device = _new_device_entry(platform, device_id, name, processor, os_version)
+    
+    # Check for duplicate device ID
+    devices = data.get("devices", {})
+    if device_id in devices:
+        console.print(f"❌ Device {device_id} already exists in {platform}", style="red")
+        console.print(f"   Existing: {devices[device_id].get('marketingName', 'Unknown')}")
+        console.print(f"💡 Use 'fix-device {device_id} <field> <value>' to update existing device")
+        return
+    
+    # Add to devices (at the beginning for newest-first sorting)
+    new_devices = {device_id: new_device}
+    new_devices.update(devices)
+    data["devices"] = new_devices
+    
+    # Update metadata
+    data["metadata"]["device_count"] = len(new_devices)
+    data["metadata"]["last_updated"] = "2025-09-07"
+    
+    # Write updated file
+    with open(platform_file, "w") as f:
+        json.dump(data, f, indent=2)
+    
+    console.print(f"✅ Added {device_id} to {platform_file.name}", style="green")
+    console.print(f"   {name} ({processor})")
+    
+    # Rebuild database
+    rebuild_database()
+
+def _new_device_entry(platform, device_id, name, processor, os_version=""):
+    """Source entry for a new device, with Model, URL and types derived from its name and platform"""
     # Determine URLs and types
     url_mapping = {
         "macos": {
@@ -238,32 +373,7 @@ def add_device(
     if os_version:
         new_device["systemFirstRelease"] = os_version
     
-    # Check for duplicate device ID
-    devices = data.get("devices", {})
-    if device_id in devices:
-        console.print(f"❌ Device {device_id} already exists in {platform}", style="red")
-        console.print(f"   Existing: {devices[device_id].get('marketingName', 'Unknown')}")
-        console.print(f"💡 Use 'fix-device {device_id} <field> <value>' to update existing device")
-        return
-    
-    # Add to devices (at the beginning for newest-first sorting)
-    new_devices = {device_id: new_device}
-    new_devices.update(devices)
-    data["devices"] = new_devices
-    
-    # Update metadata
-    data["metadata"]["device_count"] = len(new_devices)
-    data["metadata"]["last_updated"] = "2025-09-07"
-    
-    # Write updated file
-    with open(platform_file, "w") as f:
-        json.dump(data, f, indent=2)
-    
-    console.print(f"✅ Added {device_id} to {platform_file.name}", style="green")
-    console.print(f"   {name} ({processor})")
-    
-    # Rebuild database
-    rebuild_database()
+    return new_device
 
 @app.command()
 def add_guided():
@@ -293,12 +403,7 @@ def add_guided():
     processor = Prompt.ask("⚡ Processor Family (e.g., M4, A18 Pro, S10)")
     
     # Smart supportedMajor suggestion
-    patterns = DEVICE_PATTERNS.get(platform, {}).get("processors", {})
-    suggested_os = None
-    for proc_pattern, versions in patterns.items():
-        if proc_pattern in processor:
-            suggested_os = versions
-            break
+    suggested_os = _suggested_major(platform, processor)
     
     if suggested_os:
         console.print(f"💡 Suggested supportedMajor: {suggested_os}")
@@ -362,6 +467,211 @@ def add_guided():
     else:
         console.print("❌ Cancelled", style="red")
 
+def _suggested_major(platform, processor):
+    """supportedMajor from DEVICE_PATTERNS for the first processor pattern in processor, if any"""
+    patterns = DEVICE_PATTERNS.get(platform, {}).get("processors", {})
+    for proc_pattern, versions in patterns.items():
+        if proc_pattern in processor:
+            return versions
+    return None
+
+# Import columns accepted in place of the source field names
+IMPORT_FIELD_ALIASES = {
+    "device_id": "DeviceID",
+    "name": "marketingName",
+    "processor": "processorFamily",
+    "os_version": "systemFirstRelease",
+}
+
+def _read_import_rows(import_file):
+    """(line number, row, errors) for each device in a CSV or NDJSON file, with aliases mapped to source field names"""
+    rows = []
+    if import_file.suffix.lower() == ".csv":
+        with open(import_file, newline="") as f:
+            # Header is line 1
+            for line_number, row in enumerate(csv.DictReader(f), 2):
+                errors = []
+                # Extra cells land under None, usually from an unquoted "Mac99,1"
+                if None in row:
+                    errors.append(f"{len(row[None])} more cells than columns - quote values containing commas")
+                missing = [k for k, v in row.items() if k is not None and v is None]
+                if missing:
+                    errors.append(f"missing cells for {', '.join(missing)}")
+                cells = {k.strip(): v.strip() for k, v in row.items() if k and isinstance(v, str) and v.strip()}
+                rows.append((line_number, cells, errors))
+    else:
+        with open(import_file) as f:
+            for line_number, line in enumerate(f, 1):
+                if line.strip():
+                    row = json.loads(line)
+                    if isinstance(row, dict):
+                        rows.append((line_number, row, []))
+                    else:
+                        rows.append((line_number, {}, ["expected a JSON object per line"]))
+    
+    mapped = []
+    for line_number, row, errors in rows:
+        device = {IMPORT_FIELD_ALIASES.get(key, key): value for key, value in row.items()}
+        # Sources store majors as strings; CSV cells list them as "26;18" or "tahoe sequoia"
+        majors = device.get("supportedMajor")
+        if isinstance(majors, str):
+            device["supportedMajor"] = [v for v in re.split(r"[;,|\s]+", majors) if v]
+        elif isinstance(majors, list):
+            device["supportedMajor"] = [str(v) for v in majors]
+        elif majors is not None:
+            device["supportedMajor"] = [str(majors)]
+        mapped.append((line_number, device, errors))
+    return mapped
+
+def _prepare_import(line_number, row, default_platform, existing_ids, seen_ids, known_majors):
+    """Build the source entry for an import row; returns (platform, device, errors, warnings)"""
+    errors = []
+    warnings = []
+    platform = str(row.pop("platform", "") or default_platform).lower()
+    device_id = str(row.get("DeviceID", ""))
+    name = str(row.get("marketingName", ""))
+    processor = str(row.get("processorFamily", ""))
+    
+    if platform not in DEVICE_PATTERNS:
+        errors.append(f"unknown platform '{platform}' (expected {', '.join(DEVICE_PATTERNS)})")
+    elif device_id and not re.fullmatch(DEVICE_PATTERNS[platform]["device_id"], device_id):
+        errors.append(f"device ID '{device_id}' does not look like a {platform} identifier")
+    
+    device = _new_device_entry(platform, device_id, name, processor, str(row.get("systemFirstRelease", "")))
+    # Explicit columns win over the derived defaults (Model, URL, deviceType, BoardID, ...)
+    device.update(row)
+    
+    if not device.get("supportedMajor"):
+        suggested = _suggested_major(platform, processor)
+        if suggested:
+            device["supportedMajor"] = suggested
+        elif platform in DEVICE_PATTERNS:
+            known = ", ".join(DEVICE_PATTERNS[platform]["processors"])
+            warnings.append(f"no DEVICE_PATTERNS match for processor '{processor}' ({known})")
+    
+    errors.extend(_check_essential_fields(device))
+    if platform in known_majors:
+        unknown = [major for major in device.get("supportedMajor", []) if major not in known_majors[platform]]
+        if unknown:
+            known = ", ".join(sorted(known_majors[platform]))
+            errors.append(f"unknown supportedMajor {', '.join(unknown)} for {platform} (known: {known})")
+    if device_id in existing_ids:
+        errors.append(f"{device_id} already exists in {existing_ids[device_id]}")
+    elif device_id and device_id in seen_ids:
+        errors.append(f"{device_id} also on line {seen_ids[device_id]}")
+    seen_ids.setdefault(device_id, line_number)
+    
+    return platform, device, errors, warnings
+
+@app.command("import")
+def import_devices(
+    import_path: str = typer.Argument(help="CSV (with a header row) or NDJSON file of devices"),
+    platform: str = typer.Option("", help="Platform for rows without a platform column"),
+    dry_run: bool = typer.Option(False, help="Validate and preview without writing")
+):
+    """Import many devices at once from a CSV or NDJSON file"""
+    
+    import_file = Path(import_path)
+    console.print(f"📥 Importing devices from {import_file}", style="cyan")
+    
+    if not import_file.exists():
+        console.print(f"❌ Import file not found: {import_file}", style="red")
+        raise typer.Exit(1)
+    
+    try:
+        rows = _read_import_rows(import_file)
+    except (json.JSONDecodeError, csv.Error, UnicodeDecodeError) as e:
+        console.print(f"❌ Could not read {import_file}: {e}", style="red")
+        raise typer.Exit(1) from e
+    
+    index = DeviceIndex.load(SOURCES_DIR)
+    existing_ids = {device_id: record_platform for record_platform, device_id, _ in index}
+    # Majors the patterns suggest plus those already in each platform's sources
+    known_majors = {
+        name: {major for versions in patterns["processors"].values() for major in versions}
+        for name, patterns in DEVICE_PATTERNS.items()
+    }
+    for record_platform, _, device_info in index:
+        if record_platform in known_majors:
+            known_majors[record_platform].update(str(major) for major in device_info.get("supportedMajor", []) or [])
+    seen_ids = {}
+    prepared = {}
+    problems = []
+    
+    for line_number, row, read_errors in rows:
+        device_platform, device, errors, warnings = _prepare_import(
+            line_number, row, platform, existing_ids, seen_ids, known_majors)
+        errors = read_errors + errors
+        problems.extend((line_number, device.get("DeviceID", ""), "❌", error) for error in errors)
+        problems.extend((line_number, device.get("DeviceID", ""), "⚠️", warning) for warning in warnings)
+        if not errors:
+            if device_platform not in index.platforms:
+                problems.append((line_number, device["DeviceID"], "❌", f"no source file for {device_platform}"))
+                continue
+            prepared.setdefault(device_platform, []).append(device)
+    
+    if problems:
+        table = Table(title="Import Validation")
+        table.add_column("Line", style="dim")
+        table.add_column("Device ID", style="yellow")
+        table.add_column("", style="red")
+        table.add_column("Issue", style="red")
+        for line_number, device_id, level, message in problems:
+            table.add_row(str(line_number), device_id, level, message)
+        console.print(table)
+    
+    error_count = sum(1 for problem in problems if problem[2] == "❌")
+    if error_count:
+        console.print(f"❌ {error_count} errors in {len(rows)} rows - nothing imported", style="red")
+        raise typer.Exit(1)
+    
+    table = Table(title=f"{len(rows)} Devices to Import")
+    table.add_column("Platform", style="cyan")
+    table.add_column("Device ID", style="yellow")
+    table.add_column("Name", style="green")
+    table.add_column("Processor", style="blue")
+    table.add_column("OS Versions", style="magenta")
+    for device_platform, devices in prepared.items():
+        for device in devices:
+            table.add_row(device_platform, device["DeviceID"], device["marketingName"][:40],
+                          device["processorFamily"][:15], ", ".join(device["supportedMajor"]))
+    console.print(table)
+    
+    if dry_run:
+        console.print("🔍 DRY RUN - no files written", style="yellow")
+        return
+    
+    # Stage every platform file first, then move them all into place
+    staged = []
+    try:
+        for device_platform, devices in prepared.items():
+            platform_file = Path(index.platforms[device_platform]["file"])
+            with open(platform_file) as f:
+                data = json.load(f)
+            
+            # New devices go at the top, in import order, for newest-first sorting
+            new_devices = {device["DeviceID"]: device for device in devices}
+            new_devices.update(data.get("devices", {}))
+            data["devices"] = new_devices
+            data.setdefault("metadata", {})["device_count"] = len(new_devices)
+            data["metadata"]["last_updated"] = datetime.now().strftime("%Y-%m-%d")
+            
+            tmp_path = platform_file.with_name(platform_file.name + ".tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(data, f, indent=2)
+            staged.append((device_platform, tmp_path, platform_file))
+    except Exception:
+        for _, tmp_path, _ in staged:
+            tmp_path.unlink(missing_ok=True)
+        raise
+    
+    for device_platform, tmp_path, platform_file in staged:
+        os.replace(tmp_path, platform_file)
+        console.print(f"✅ Added {len(prepared[device_platform])} devices to {platform_file.name}", style="green")
+    
+    # Rebuild database once for the whole batch
+    rebuild_database()
+
 @app.command() 
 def drop_support(
     platform: str = typer.Argument(help="Platform: macos, ios, ipados, watchos"),
@@ -465,30 +775,28 @@ def fix_device(
 @app.command()
 def search(
     query: str = typer.Argument(help="Search term: device ID, name, or processor"),
-    platform: str = typer.Option("", help="Filter by platform: macos, ios, etc.")
+    platform: str = typer.Option("", help="Filter by platform: macos, ios, etc."),
+    fuzzy: bool = typer.Option(False, "--fuzzy", help="Rank by closest match, e.g. 'mbp m3 14'"),
+    limit: int = typer.Option(20, help="Most results to show for --fuzzy")
 ):
     """Search for devices"""
     
     console.print(f"🔍 Searching devices for: '{query}'", style="cyan")
     
+    index = DeviceIndex.load(SOURCES_DIR)
     found_devices = []
-    
-    for platform_file in SOURCES_DIR.glob("*_devices.json"):
-        if platform and platform not in platform_file.stem:
-            continue
-            
-        with open(platform_file) as f:
-            data = json.load(f)
-        
-        devices = data.get("devices", {})
-        platform_name = platform_file.stem.replace("_devices", "")
-        
-        for device_id, device_info in devices.items():
-            # Search in device_id, name, processor
-            searchable_text = f"{device_id} {device_info.get('marketingName', '')} {device_info.get('processorFamily', '')}".lower()
-            
-            if query.lower() in searchable_text:
-                found_devices.append((platform_name, device_id, device_info))
+    scores = None
+    if fuzzy:
+        ranked = index.rank(query, platform, limit)
+    else:
+        # Search in device_id, name, processor
+        found_devices = index.search(query, platform)
+        ranked = [] if found_devices else index.rank(query, platform, limit)
+        if ranked:
+            console.print("No exact matches - showing closest devices", style="yellow")
+    if ranked:
+        scores = [score for score, _ in ranked]
+        found_devices = [record for _, record in ranked]
     
     if found_devices:
         table = Table(title=f"Search Results for '{query}'")
@@ -497,15 +805,20 @@ def search(
         table.add_column("Name", style="green") 
         table.add_column("Processor", style="blue")
         table.add_column("Status", style="magenta")
+        if scores:
+            table.add_column("Score", style="dim", justify="right")
         
-        for platform_name, device_id, device_info in found_devices:  # Show all results
-            table.add_row(
+        for i, (platform_name, device_id, device_info) in enumerate(found_devices):  # Show all results
+            row = [
                 platform_name,
                 device_id,
                 device_info.get("marketingName", "")[:40],  # Truncate long names
                 device_info.get("processorFamily", "")[:15],
                 device_info.get("support_status", "")
-            )
+            ]
+            if scores:
+                row.append(f"{scores[i]:.2f}")
+            table.add_row(*row)
         
         console.print(table)
     else:
@@ -521,26 +834,17 @@ def list_platform(
     
     console.print(f"📱 Listing {platform} devices", style="cyan")
     
-    platform_file = SOURCES_DIR / f"{platform}_devices.json"
+    index = DeviceIndex.load(SOURCES_DIR)
     
-    if not platform_file.exists():
-        console.print(f"❌ Platform file not found: {platform_file}", style="red")
+    if platform not in index.platforms:
+        console.print(f"❌ Platform file not found: {SOURCES_DIR / f'{platform}_devices.json'}", style="red")
         return
     
-    with open(platform_file) as f:
-        data = json.load(f)
-    
-    devices = data.get("devices", {})
-    filtered_devices = []
-    
-    for device_id, device_info in devices.items():
-        # Apply filters
-        if status and device_info.get("support_status", "") != status:
-            continue
-        if processor and processor.lower() not in device_info.get("processorFamily", "").lower():
-            continue
-            
-        filtered_devices.append((device_id, device_info))
+    # Apply filters
+    filtered_devices = [
+        (device_id, device_info)
+        for _, device_id, device_info in index.filter(platform, status=status, processor=processor)
+    ]
     
     if filtered_devices:
         table = Table(title=f"{platform.title()} Devices")
@@ -568,31 +872,35 @@ def list_platform(
         console.print("❌ No devices found with specified filters", style="red")
 
 @app.command() 
-def validate():
+def validate(
+    fix: bool = typer.Option(False, "--fix", help="Correct metadata.device_count in sources that disagree with their devices")
+):
     """Validate device database for consistency"""
     
     console.print("🔍 Validating device database...", style="cyan")
     console.print(f"📂 Sources: {SOURCES_DIR}")
     
     issues = []
+    miscounted = []
     total_devices = 0
+    index = DeviceIndex.load(SOURCES_DIR)
     
-    for platform_file in SOURCES_DIR.glob("*_devices.json"):
-        platform = platform_file.stem.replace("_devices", "")
-        
-        with open(platform_file) as f:
-            data = json.load(f)
+    for platform, source in index.platforms.items():
+        if "error" in source:
+            issues.append(f"{platform}: unreadable source ({source['error']})")
+            continue
         
-        devices = data.get("devices", {})
-        actual_count = len(devices)
-        metadata_count = data.get("metadata", {}).get("device_count", 0)
+        actual_count = source["device_count"]
+        metadata_count = source["metadata"].get("device_count", 0)
         total_devices += actual_count
         
         # Check device count consistency
         if actual_count != metadata_count:
-            issues.append(f"{platform}: device_count mismatch (metadata: {metadata_count}, actual: {actual_count})")
+            miscounted.append(platform)
+            if not fix:
+                issues.append(f"{platform}: device_count mismatch (metadata: {metadata_count}, actual: {actual_count})")
         
-        for device_id, device_info in devices.items():
+        for _, device_id, device_info in index.devices(platform):
             # Check required fields
             required_fields = ["Model", "URL", "marketingName", "support_status", "DeviceID"]
             for field in required_fields:
@@ -608,15 +916,21 @@ def validate():
             if device_info.get("support_status") not in valid_statuses:
                 issues.append(f"{platform}:{device_id} invalid support_status")
     
+    if fix and miscounted:
+        sync_device_counts(miscounted)
+        console.print(f"🔧 Fixed device_count in {', '.join(miscounted)}", style="green")
+    
     if issues:
         console.print(f"⚠️  Found {len(issues)} validation issues:", style="yellow")
         for issue in issues[:10]:  # Show first 10 issues
             console.print(f"   • {issue}", style="red")
         if len(issues) > 10:
             console.print(f"   • ... and {len(issues) - 10} more issues")
+        if miscounted and not fix:
+            console.print("💡 Run 'validate --fix' to correct device_count mismatches", style="dim")
     else:
         console.print(f"✅ Database validation passed", style="green")
-        console.print(f"   📊 {total_devices} devices across {len(list(SOURCES_DIR.glob('*_devices.json')))} platforms")
+        console.print(f"   📊 {total_devices} devices across {len(index.platforms)} platforms")
 
 @app.command()
 def status():
@@ -639,24 +953,22 @@ def status():
         total_current = 0
         total_vintage = 0
         
-        for platform_file in SOURCES_DIR.glob("*_devices.json"):
-            try:
-                with open(platform_file) as f:
-                    data = json.load(f)
-                
-                devices = data.get("devices", {})
-                device_count = len(devices)
-                current_count = sum(1 for d in devices.values() if d.get("support_status") == "current")
-                vintage_count = sum(1 for d in devices.values() if d.get("support_status") == "vintage")
-                file_size = f"{platform_file.stat().st_size // 1024}KB"
-                platform = platform_file.stem.replace("_devices", "")
-                
-                table.add_row(platform, str(device_count), str(current_count), str(vintage_count), file_size)
-                total_devices += device_count
-                total_current += current_count
-                total_vintage += vintage_count
-            except:
-                table.add_row(platform_file.stem, "Error", "Error", "Error", "Error")
+        index = DeviceIndex.load(SOURCES_DIR)
+        for platform, source in index.platforms.items():
+            if "error" in source:
+                table.add_row(f"{platform}_devices", "Error", "Error", "Error", "Error")
+                continue
+            
+            device_count = source["device_count"]
+            status_counts = index.count_by_status(platform)
+            current_count = status_counts.get("current", 0)
+            vintage_count = status_counts.get("vintage", 0)
+            file_size = f"{source['file_size'] // 1024}KB"
+            
+            table.add_row(platform, str(device_count), str(current_count), str(vintage_count), file_size)
+            total_devices += device_count
+            total_current += current_count
+            total_vintage += vintage_count
         
         console.print(table)
         
@@ -677,12 +989,14 @@ def status():
         console.print("❌ Sources directory not found", style="red")
 
 @app.command()
-def rebuild():
+def rebuild(
+    full: bool = typer.Option(False, "--full", help="Re-read every platform source, even unchanged ones")
+):
     """Rebuild unified database from platform sources"""
     console.print("🔨 Rebuilding from sources...", style="bold cyan")
     console.print(f"📂 Sources: {SOURCES_DIR}")
     console.print(f"📁 Output: {OUTPUT_DIR}")
-    rebuild_database()
+    rebuild_database(full=full)
 
 def _check_essential_fields(device_info):
     """Check if device has essential SOFA fields"""
@@ -722,22 +1036,17 @@ def check(
     platform_issues = {}
     
     platforms_to_check = [platform] if platform else ["macos", "ios", "ipados", "watchos", "tvos", "visionos"]
+    index = DeviceIndex.load(SOURCES_DIR)
     
     for platform_name in platforms_to_check:
-        platform_file = SOURCES_DIR / f"{platform_name}_devices.json"
-        
-        if not platform_file.exists():
+        if platform_name not in index.platforms:
             if platform:  # Only warn if specific platform requested
                 console.print(f"⚠️  Platform file not found: {platform_name}", style="yellow")
             continue
-            
-        with open(platform_file) as f:
-            data = json.load(f)
         
-        devices = data.get("devices", {})
         problem_devices = {}
         
-        for device_id, device_info in devices.items():
+        for _, device_id, device_info in index.devices(platform_name):
             total_devices += 1
             
             # Check essential SOFA fields
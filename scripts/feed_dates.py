@@ -0,0 +1,60 @@
+"""
+Shared date parsing for the SOFA feed scripts
+Memoized strptime over the date formats found in SOFA data sources
+"""
+
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+# Every format seen across bulletin, security release, GDMF, XProtect and beta data
+DATE_FORMATS: Tuple[str, ...] = (
+    "%Y-%m-%d",
+    "%d %b %Y",
+    "%B %d, %Y",
+    "%Y-%m-%dT%H:%M:%SZ",
+    "%Y-%m-%dT%H:%M:%S.%fZ",
+    "%a, %d %b %Y %H:%M:%S %z",  # Already in RFC 822
+)
+
+# Day-only ISO dates, used for "days since previous release" arithmetic
+ISO_DAY_FORMATS: Tuple[str, ...] = ("%Y-%m-%d",)
+
+_SHAPE_DIGITS = re.compile(r"\d")
+_SHAPE_LETTERS = re.compile(r"[A-Za-z]")
+
+# (shape, formats) -> format that last parsed a string of that shape
+_shape_formats: Dict[Tuple[str, Tuple[str, ...]], str] = {}
+
+
+def _date_shape(date_str: str) -> str:
+    """Reduce a date string to its layout, e.g. '2025-01-27' -> '9999-99-99'"""
+    return _SHAPE_LETTERS.sub("a", _SHAPE_DIGITS.sub("9", date_str))
+
+
+@lru_cache(maxsize=4096)
+def parse_date(date_str: str, formats: Tuple[str, ...] = DATE_FORMATS) -> Optional[datetime]:
+    """Parse date_str with the first matching format, or return None"""
+    if not date_str or not isinstance(date_str, str):
+        return None
+
+    shape = (_date_shape(date_str), formats)
+    known_format = _shape_formats.get(shape)
+    if known_format is not None:
+        try:
+            return datetime.strptime(date_str, known_format)
+        except ValueError:
+            pass
+
+    for fmt in formats:
+        if fmt == known_format:
+            continue
+        try:
+            parsed = datetime.strptime(date_str, fmt)
+        except ValueError:
+            continue
+        _shape_formats[shape] = fmt
+        return parsed
+
+    return None
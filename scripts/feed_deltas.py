@@ -0,0 +1,179 @@
+"""
+Delta feeds between published SOFA feed versions
+RFC 6902 JSON Patch documents from archived feed versions to the current one
+"""
+
+import copy
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from hashed_json import HASH_KEY, read_update_hash
+
+# Archived versions are kept per feed directory, e.g. data/resources/history/v1,
+# since v1 and v2 publish feeds with the same file names
+HISTORY_ROOT = Path("data/resources/history")
+
+
+def _pointer(path: List[Any]) -> str:
+    return "".join("/" + str(part).replace("~", "~0").replace("/", "~1") for part in path)
+
+
+def _diff(old: Any, new: Any, path: List[Any], ops: List[Dict]) -> None:
+    if isinstance(old, dict) and isinstance(new, dict):
+        kept_old = [key for key in old if key in new]
+        kept_new = [key for key in new if key in old]
+        added = [key for key in new if key not in old]
+        # Added keys are appended on apply, so they must come last in new and
+        # the kept keys must keep their order; otherwise replace the object
+        if kept_old != kept_new or list(new)[len(kept_new):] != added:
+            ops.append({"op": "replace", "path": _pointer(path), "value": new})
+            return
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": _pointer(path + [key])})
+        for key in kept_new:
+            _diff(old[key], new[key], path + [key], ops)
+        for key in added:
+            ops.append({"op": "add", "path": _pointer(path + [key]), "value": new[key]})
+        return
+
+    if isinstance(old, list) and isinstance(new, list):
+        # Feeds mostly gain or lose entries at one end, e.g. a new SecurityRelease
+        # first; keep the common prefix and suffix and patch only the middle
+        prefix = 0
+        while prefix < len(old) and prefix < len(new) and old[prefix] == new[prefix]:
+            prefix += 1
+        suffix = 0
+        while (suffix < len(old) - prefix and suffix < len(new) - prefix
+               and old[-1 - suffix] == new[-1 - suffix]):
+            suffix += 1
+        old_middle = old[prefix:len(old) - suffix]
+        new_middle = new[prefix:len(new) - suffix]
+
+        paired = min(len(old_middle), len(new_middle))
+        for i in range(paired):
+            _diff(old_middle[i], new_middle[i], path + [prefix + i], ops)
+        for _ in range(len(old_middle) - paired):
+            ops.append({"op": "remove", "path": _pointer(path + [prefix + paired])})
+        for i in range(paired, len(new_middle)):
+            ops.append({"op": "add", "path": _pointer(path + [prefix + i]), "value": new_middle[i]})
+        return
+
+    if old != new or type(old) is not type(new):
+        ops.append({"op": "replace", "path": _pointer(path), "value": new})
+
+
+def json_patch(old: Any, new: Any) -> List[Dict]:
+    """RFC 6902 operations that turn old into new, preserving new's key order"""
+    ops: List[Dict] = []
+    _diff(old, new, [], ops)
+    return ops
+
+
+def apply_json_patch(document: Any, ops: List[Dict]) -> Any:
+    """Apply add/remove/replace operations from json_patch to a copy of document"""
+    document = copy.deepcopy(document)
+    for op in ops:
+        parts = [p.replace("~1", "/").replace("~0", "~") for p in op["path"].split("/")[1:]]
+        if not parts:
+            document = copy.deepcopy(op["value"])
+            continue
+        parent = document
+        for part in parts[:-1]:
+            parent = parent[int(part)] if isinstance(parent, list) else parent[part]
+        last = parts[-1]
+        if isinstance(parent, list):
+            index = len(parent) if last == "-" else int(last)
+            if op["op"] == "add":
+                parent.insert(index, copy.deepcopy(op["value"]))
+            elif op["op"] == "remove":
+                del parent[index]
+            else:
+                parent[index] = copy.deepcopy(op["value"])
+        else:
+            if op["op"] == "remove":
+                del parent[last]
+            else:
+                parent[last] = copy.deepcopy(op["value"])
+    return document
+
+
+def history_dir_for(feed_dir: Path) -> Path:
+    """Where archived versions of the feeds written to feed_dir are kept"""
+    return HISTORY_ROOT / feed_dir.resolve().name
+
+
+def delta_dir_for(feed_dir: Path) -> Path:
+    """Where deltas for the feeds written to feed_dir are published, next to the feeds"""
+    return feed_dir / "deltas"
+
+
+def history_versions(feed_name: str, history_dir: Path) -> List[Path]:
+    """Archived versions of a feed (e.g. "macos_data_feed"), oldest first"""
+    return sorted(history_dir.glob(f"{feed_name}_*.json"))
+
+
+def archive_feed(feed_path: Path, history_dir: Optional[Path] = None, keep: int = 10) -> Optional[Path]:
+    """Copy a published feed into the history unless it is already the newest version there, keeping the last keep"""
+    feed_name = feed_path.stem
+    history_dir = history_dir or history_dir_for(feed_path.parent)
+    versions = history_versions(feed_name, history_dir)
+    new_hash = read_update_hash(feed_path)
+    if new_hash is None or (versions and read_update_hash(versions[-1]) == new_hash):
+        return None
+
+    history_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S_%f")
+    archived = history_dir / f"{feed_name}_{stamp}.json"
+    archived.write_bytes(feed_path.read_bytes())
+
+    for stale in (versions + [archived])[:-keep]:
+        stale.unlink(missing_ok=True)
+    return archived
+
+
+def write_feed_deltas(feed_path: Path, previous_versions: int, history_dir: Optional[Path] = None,
+                      delta_dir: Optional[Path] = None) -> List[Path]:
+    """Write patches from the last previous_versions archived versions to the feed at feed_path"""
+    feed_name = feed_path.stem
+    history_dir = history_dir or history_dir_for(feed_path.parent)
+    delta_dir = delta_dir or delta_dir_for(feed_path.parent)
+    with open(feed_path, "r", encoding="utf-8") as f:
+        new_feed = json.load(f)
+    new_hash = new_feed.get(HASH_KEY)
+
+    delta_dir.mkdir(parents=True, exist_ok=True)
+    deltas: Dict[str, str] = {}
+    written = []
+    older = [v for v in history_versions(feed_name, history_dir) if read_update_hash(v) != new_hash]
+    for version in older[-previous_versions:] if previous_versions > 0 else []:
+        with open(version, "r", encoding="utf-8") as f:
+            old_feed = json.load(f)
+        old_hash = old_feed.get(HASH_KEY)
+        if not old_hash or old_hash in deltas:
+            continue
+        delta_path = delta_dir / f"{old_hash}..{new_hash}.json"
+        with open(delta_path, "w", encoding="utf-8") as f:
+            json.dump(json_patch(old_feed, new_feed), f, ensure_ascii=False, separators=(",", ":"))
+        deltas[old_hash] = delta_path.name
+        written.append(delta_path)
+
+    # Replace the index and drop deltas that no longer lead to the current version
+    index_path = delta_dir / f"{feed_name.removesuffix('_data_feed')}_index.json"
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            previous_index = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        previous_index = {}
+    for name in previous_index.get("deltas", {}).values():
+        if name not in deltas.values():
+            (delta_dir / name).unlink(missing_ok=True)
+
+    tmp_path = index_path.with_name(index_path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({HASH_KEY: new_hash, "deltas": deltas}, f, indent=2)
+    os.replace(tmp_path, index_path)
+    return written
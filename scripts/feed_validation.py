@@ -0,0 +1,221 @@
+"""
+In-process validation of SOFA pipeline outputs
+Parses each output once, counts its entries and checks it against its JSON schema
+"""
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+SCHEMA_DIR = Path("v2")
+
+# Violations kept per file; the total is still counted
+MAX_VIOLATIONS = 20
+
+_TYPE_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    "object": lambda value: isinstance(value, dict),
+    "array": lambda value: isinstance(value, list),
+    "string": lambda value: isinstance(value, str),
+    "integer": lambda value: (isinstance(value, int) and not isinstance(value, bool))
+    or (isinstance(value, float) and value.is_integer()),
+    "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    "boolean": lambda value: isinstance(value, bool),
+    "null": lambda value: value is None,
+}
+
+_FORMAT_RANGES = {
+    "uint": (0, 2 ** 64 - 1),
+    "uint8": (0, 2 ** 8 - 1),
+    "uint16": (0, 2 ** 16 - 1),
+    "uint32": (0, 2 ** 32 - 1),
+    "uint64": (0, 2 ** 64 - 1),
+    "int8": (-2 ** 7, 2 ** 7 - 1),
+    "int16": (-2 ** 15, 2 ** 15 - 1),
+    "int32": (-2 ** 31, 2 ** 31 - 1),
+    "int64": (-2 ** 63, 2 ** 63 - 1),
+}
+
+
+class _Validator:
+    def __init__(self, root: Dict):
+        self.root = root
+        self.violations: List[str] = []
+        self.total = 0
+
+    def fail(self, path: str, message: str) -> None:
+        self.total += 1
+        if len(self.violations) < MAX_VIOLATIONS:
+            self.violations.append(f"{path}: {message}")
+
+    def resolve(self, ref: str) -> Dict:
+        if not ref.startswith("#/"):
+            raise ValueError(f"Unsupported $ref {ref}")
+        node = self.root
+        for part in ref[2:].split("/"):
+            node = node[part.replace("~1", "/").replace("~0", "~")]
+        return node
+
+    def is_valid(self, value: Any, schema: Any) -> bool:
+        probe = _Validator(self.root)
+        probe.check(value, schema, "")
+        return probe.total == 0
+
+    def check(self, value: Any, schema: Any, path: str) -> None:
+        if schema is True or schema == {}:
+            return
+        if schema is False:
+            self.fail(path, "not allowed")
+            return
+
+        if "$ref" in schema:
+            self.check(value, self.resolve(schema["$ref"]), path)
+
+        if "anyOf" in schema and not any(self.is_valid(value, option) for option in schema["anyOf"]):
+            self.fail(path, "matches none of the allowed shapes")
+
+        expected = schema.get("type")
+        if expected is not None:
+            types = expected if isinstance(expected, list) else [expected]
+            if not any(_TYPE_CHECKS[name](value) for name in types):
+                self.fail(path, f"expected {' or '.join(types)}, got {type(value).__name__}")
+                return
+
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            if "minimum" in schema and value < schema["minimum"]:
+                self.fail(path, f"{value} is below the minimum {schema['minimum']}")
+            value_range = _FORMAT_RANGES.get(schema.get("format", ""))
+            if value_range and not value_range[0] <= value <= value_range[1]:
+                self.fail(path, f"{value} is out of range for {schema['format']}")
+
+        if isinstance(value, dict):
+            for key in schema.get("required", []):
+                if key not in value:
+                    self.fail(path, f"missing required property {key}")
+            properties = schema.get("properties", {})
+            additional = schema.get("additionalProperties", True)
+            for key, item in value.items():
+                if key in properties:
+                    self.check(item, properties[key], f"{path}.{key}")
+                elif additional is False:
+                    self.fail(path, f"unexpected property {key}")
+                elif isinstance(additional, dict):
+                    self.check(item, additional, f"{path}.{key}")
+
+        if isinstance(value, list) and "items" in schema:
+            for i, item in enumerate(value):
+                self.check(item, schema["items"], f"{path}[{i}]")
+
+
+def schema_violations(instance: Any, schema: Dict) -> List[str]:
+    """Violations of schema by instance as "<path>: <message>", at most MAX_VIOLATIONS"""
+    validator = _Validator(schema)
+    validator.check(instance, schema, "$")
+    return validator.violations
+
+
+class FileCheck:
+    """An output file to validate, with how to count its entries"""
+
+    __slots__ = ("path", "description", "count", "schema_path")
+
+    def __init__(self, path: Path, description: str = "",
+                 count: Optional[Callable[[Any], int]] = None, schema_path: Optional[Path] = None):
+        self.path = Path(path)
+        self.description = description
+        self.count = count
+        self.schema_path = schema_path
+
+
+class ValidationReport:
+    """Outcome of validating one file"""
+
+    __slots__ = ("check", "exists", "size", "count", "violations", "violation_count",
+                 "parse_seconds", "error")
+
+    def __init__(self, check: FileCheck):
+        self.check = check
+        self.exists = False
+        self.size = 0
+        self.count: Optional[int] = None
+        self.violations: List[str] = []
+        self.violation_count = 0
+        self.parse_seconds = 0.0
+        self.error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.exists and self.error is None and self.violation_count == 0
+
+
+def schema_for(feed_path: Path, schema_dir: Path = SCHEMA_DIR) -> Optional[Path]:
+    """v2/<feed>.schema.json for a v2 feed, if one is published"""
+    if feed_path.parent.resolve() != schema_dir.resolve():
+        return None
+    schema_path = schema_dir / f"{feed_path.stem}.schema.json"
+    return schema_path if schema_path.exists() else None
+
+
+def _validate_json(check: FileCheck, report: ValidationReport) -> None:
+    start = time.perf_counter()
+    with open(check.path, "rb") as f:
+        data = json.load(f)
+    report.parse_seconds = time.perf_counter() - start
+
+    if check.count:
+        try:
+            report.count = check.count(data)
+        except (AttributeError, KeyError, TypeError):
+            report.count = None
+    if check.schema_path:
+        with open(check.schema_path, "rb") as f:
+            schema = json.load(f)
+        validator = _Validator(schema)
+        validator.check(data, schema, "$")
+        report.violations = validator.violations
+        report.violation_count = validator.total
+
+
+def _validate_ndjson(check: FileCheck, report: ValidationReport) -> None:
+    start = time.perf_counter()
+    count = 0
+    with open(check.path, "rb") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                json.loads(line)
+            except ValueError as e:
+                report.violation_count += 1
+                if len(report.violations) < MAX_VIOLATIONS:
+                    report.violations.append(f"line {line_number}: {e}")
+                continue
+            count += 1
+    report.count = count
+    report.parse_seconds = time.perf_counter() - start
+
+
+def validate_file(check: FileCheck) -> ValidationReport:
+    """Parse check.path once, count its entries and check it against its schema"""
+    report = ValidationReport(check)
+    try:
+        report.size = check.path.stat().st_size
+    except OSError:
+        return report
+    report.exists = True
+
+    try:
+        if check.path.suffix == ".ndjson":
+            _validate_ndjson(check, report)
+        else:
+            _validate_json(check, report)
+    except (OSError, ValueError) as e:
+        report.error = str(e)
+    return report
+
+
+def validate_files(checks: List[FileCheck], max_workers: Optional[int] = None) -> List[ValidationReport]:
+    """Validate files concurrently; reports come back in the order of checks"""
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(validate_file, checks))
@@ -14,17 +14,24 @@ Generates RSS feed from Apple security releases data, XProtect updates, and beta
 
 import json
 import hashlib
+import time
+import tomllib
+from abc import ABC, abstractmethod
+from contextlib import ExitStack
 from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
 from pathlib import Path
-from typing import Dict, List, Set, Optional
-from xml.etree.ElementTree import Element, SubElement, tostring
-from xml.dom import minidom
+from typing import Dict, List, Set, Optional, Tuple
+from urllib.parse import quote
+from xml.etree.ElementTree import Element, SubElement
 import typer
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn
 from rich.table import Table
 from rich.panel import Panel
 
+from feed_dates import DATE_FORMATS, ISO_DAY_FORMATS, parse_date
+
 console = Console()
 app = typer.Typer(help="Modern RSS feed generator for SOFA")
 
@@ -32,6 +39,19 @@ app = typer.Typer(help="Modern RSS feed generator for SOFA")
 import os
 SOFA_FQDN = os.getenv("SOFA_FQDN", os.getenv("SOFA_BASE_URL", "https://sofa.macadmins.io"))
 
+# Bump whenever item rendering changes so stale cached fragments are discarded
+RSS_ITEM_CACHE_VERSION = 3
+
+# v2 feed per platform and the key holding its major versions, used to map releases to SOFA pages
+SOFA_PAGE_SOURCES = {
+    "macOS": ("macos_data_feed.json", "OSVersions", "OSVersion"),
+    "iOS": ("ios_data_feed.json", "OSVersions", "OSVersion"),
+    "Safari": ("safari_data_feed.json", "AppVersions", "AppVersion"),
+    "tvOS": ("tvos_data_feed.json", "OSVersions", "OSVersion"),
+    "watchOS": ("watchos_data_feed.json", "OSVersions", "OSVersion"),
+    "visionOS": ("visionos_data_feed.json", "OSVersions", "OSVersion"),
+}
+
 
 def load_json_file(filepath: Path) -> Optional[Dict]:
     """Load and parse JSON file with Rich output"""
@@ -47,13 +67,150 @@ def load_json_file(filepath: Path) -> Optional[Dict]:
         return None
 
 
-def load_security_releases(data_dir: str = "data/resources") -> List[Dict]:
+class SofaPageResolver:
+    """Map a release to its SOFA web page via a (platform, major) lookup table of existing web/ pages"""
+
+    def __init__(self, web_dir: Optional[str] = "web"):
+        self.web_dir = Path(web_dir) if web_dir else None
+        self.pages: Dict[Tuple[str, str], str] = {}  # (platform, major) -> page path
+        self.codenames: Dict[str, str] = {}  # macOS codename -> page path
+        self.latest: Dict[str, str] = {}  # platform -> newest page path
+        self.index_pages: Dict[str, str] = {}  # platform -> index page path
+        self._latest_major: Dict[str, int] = {}
+
+        if self.web_dir is not None:
+            for platform in SOFA_PAGE_SOURCES:
+                if (self.web_dir / platform.lower() / "index.md").exists():
+                    self.index_pages[platform] = f"{platform.lower()}/"
+
+    def page_exists(self, path: str) -> bool:
+        """Whether web/ has the markdown page for path; always true without a web_dir"""
+        return self.web_dir is None or (self.web_dir / f"{path}.md").exists()
+
+    def add(self, platform: str, major: str = "", codename: str = "") -> None:
+        """Register the page for one platform major version, if the web tree has it"""
+        if platform == "macOS":
+            if not codename:
+                return
+            path = f"macos/{codename.lower().replace(' ', '')}"
+        else:
+            if not major:
+                return
+            path = f"{platform.lower()}/{platform.lower()}{major}"
+        if not self.page_exists(path):
+            return
+
+        if platform == "macOS":
+            self.codenames[codename.lower()] = path
+        if major:
+            self.pages[(platform, major)] = path
+        rank = int(major) if major.isdigit() else -1
+        if platform not in self.latest or rank > self._latest_major[platform]:
+            self.latest[platform] = path
+            self._latest_major[platform] = rank
+
+    @classmethod
+    def load(cls, feeds_dir: str = "v2", config_file: str = "config/os_priority.toml",
+             web_dir: Optional[str] = "web") -> "SofaPageResolver":
+        """Build the table from v2 feeds, or os_priority.toml when no feed is available"""
+        resolver = cls(web_dir)
+
+        for platform, (filename, list_key, name_key) in SOFA_PAGE_SOURCES.items():
+            feed_path = Path(feeds_dir) / filename
+            if not feed_path.exists():
+                continue
+            feed = load_json_file(feed_path) or {}
+            for entry in feed.get(list_key, []):
+                # "Tahoe 26", "26", "tvOS 26", "Safari 26"
+                words = str(entry.get(name_key, "")).split()
+                if not words or not words[-1].isdigit():
+                    continue
+                codename = words[0] if platform == "macOS" and len(words) > 1 else ""
+                resolver.add(platform, words[-1], codename)
+
+        config_path = Path(config_file)
+        if config_path.exists():
+            with open(config_path, "rb") as f:
+                versions = tomllib.load(f).get("versions", {})
+            for platform in SOFA_PAGE_SOURCES:
+                if platform in resolver.latest:
+                    continue
+                for value in versions.get(platform, []):
+                    value = str(value)
+                    if value.isdigit():
+                        resolver.add(platform, value)
+                    elif platform == "macOS":
+                        resolver.add(platform, codename=value)
+
+        return resolver
+
+    def fingerprint(self) -> str:
+        """Stable digest of the table, so cached items re-render when links change"""
+        table = json.dumps(
+            [sorted(f"{p}|{m}|{v}" for (p, m), v in self.pages.items()), self.codenames, self.latest,
+             self.index_pages],
+            sort_keys=True,
+        )
+        return hashlib.sha256(table.encode()).hexdigest()
+
+    def resolve(self, product_name: str, version: str, release_type: str) -> str:
+        """Full SOFA URL for the page covering this release"""
+        product_lower = product_name.lower()
+
+        if "macos" in product_lower or "mac os" in product_lower:
+            platform = "macOS"
+            for codename, path in self.codenames.items():
+                if codename in product_lower:
+                    return f"{SOFA_FQDN}/{path}"
+        elif "ios" in product_lower or "ipad" in product_lower:
+            platform = "iOS"
+        elif "safari" in product_lower:
+            platform = "Safari"
+        elif "tvos" in product_lower:
+            platform = "tvOS"
+        elif "watchos" in product_lower:
+            platform = "watchOS"
+        elif "visionos" in product_lower:
+            platform = "visionOS"
+        elif "xcode" in product_lower or release_type == "beta":
+            return f"{SOFA_FQDN}/beta-releases"
+        elif "xprotect" in product_lower or release_type.startswith("xprotect"):
+            # XProtect is tracked on the newest macOS page
+            return f"{SOFA_FQDN}/{self.latest['macOS']}" if "macOS" in self.latest else f"{SOFA_FQDN}/"
+        else:
+            return f"{SOFA_FQDN}/"
+
+        major = version.strip().split(".")[0]
+        # Majors without their own page go to the platform index, not the newest major
+        path = self.pages.get((platform, major)) or self.index_pages.get(platform)
+        return f"{SOFA_FQDN}/{path}" if path else f"{SOFA_FQDN}/"
+
+
+class RSSContext:
+    """Inputs for one RSS run: KEV, bulletin and security release data plus SOFA page links"""
+
+    def __init__(self, data_dir: str = "data/resources", feeds_dir: str = "v2", web_dir: str = "web"):
+        self.data_dir = data_dir
+        self.timings: Dict[str, float] = {}
+
+        start = time.perf_counter()
+        self.bulletin_data = load_json_file(Path(data_dir) / "bulletin_data.json")
+        self.releases_data = load_json_file(Path(data_dir) / "apple_security_releases.json")
+        self.kev_catalog = load_kev_catalog(data_dir)
+        self.page_links = SofaPageResolver.load(feeds_dir, web_dir=web_dir)
+        self.page_links_fingerprint = self.page_links.fingerprint()
+        self.timings["load"] = time.perf_counter() - start
+
+
+def load_security_releases(data_dir: str = "data/resources", context: Optional[RSSContext] = None) -> List[Dict]:
     """Load Apple security releases data from multiple sources"""
     releases = []
     
     # First, load from bulletin_data.json which has better dates
-    bulletin_file = Path(data_dir) / "bulletin_data.json"
-    bulletin_data = load_json_file(bulletin_file)
+    if context is not None:
+        bulletin_data = context.bulletin_data
+    else:
+        bulletin_data = load_json_file(Path(data_dir) / "bulletin_data.json")
     
     if bulletin_data and "recent_releases" in bulletin_data:
         # Convert bulletin format to our format
@@ -69,8 +226,10 @@ def load_security_releases(data_dir: str = "data/resources") -> List[Dict]:
             })
     
     # Then load from apple_security_releases.json for comprehensive list
-    releases_file = Path(data_dir) / "apple_security_releases.json"
-    releases_data = load_json_file(releases_file)
+    if context is not None:
+        releases_data = context.releases_data
+    else:
+        releases_data = load_json_file(Path(data_dir) / "apple_security_releases.json")
     
     if releases_data:
         # Handle the structure with "releases" key
@@ -231,10 +390,13 @@ def load_beta_releases(data_dir: str = "data/resources") -> List[Dict]:
     return releases
 
 
-def extract_cves(release: Dict, data_dir: str = "data/resources") -> Dict[str, bool]:
+def extract_cves(
+    release: Dict, data_dir: str = "data/resources", kev_catalog: Optional[Set[str]] = None
+) -> Dict[str, bool]:
     """Extract CVEs from a release and identify exploited ones"""
     cves = {}
-    kev_catalog = load_kev_catalog(data_dir)
+    if kev_catalog is None:
+        kev_catalog = load_kev_catalog(data_dir)
 
     # Handle various CVE data formats
     if "cves" in release:
@@ -265,22 +427,10 @@ def format_release_date(date_str: str) -> str:
         return None
 
     # Try parsing different date formats
-    formats = [
-        "%Y-%m-%d",
-        "%d %b %Y",
-        "%B %d, %Y",
-        "%Y-%m-%dT%H:%M:%SZ",
-        "%Y-%m-%dT%H:%M:%S.%fZ",
-        "%a, %d %b %Y %H:%M:%S %z",  # Already in RFC 822
-    ]
-
-    for fmt in formats:
-        try:
-            dt = datetime.strptime(date_str, fmt)
-            # Return RFC 822 format for RSS
-            return dt.strftime("%a, %d %b %Y %H:%M:%S +0000")
-        except (ValueError, TypeError):
-            continue
+    dt = parse_date(date_str, DATE_FORMATS)
+    if dt is not None:
+        # Return RFC 822 format for RSS
+        return dt.strftime("%a, %d %b %Y %H:%M:%S +0000")
 
     # If already in correct format, return as-is
     if isinstance(date_str, str) and date_str.startswith(
@@ -292,52 +442,168 @@ def format_release_date(date_str: str) -> str:
     return None
 
 
-def create_feed_item(
-    release: Dict, seen_items: Set[str], previous_releases: Dict[str, datetime] = None, data_dir: str = "data/resources"
-) -> Optional[Element]:
-    """Create an RSS item element for a release"""
-    # Create unique identifier
-    product_name = (release.get("name") or "").strip()
-    version = (release.get("version") or "").strip()
-    date = (release.get("date") or "").strip()
-    release_type = release.get("type", "os")  # os, xprotect, beta
+# Only machine-style dates order releases; anything else sorts last
+SORTABLE_DATE_FORMATS = ("%Y-%m-%d", "%Y-%m-%dT%H:%M:%SZ", "%Y-%m-%dT%H:%M:%S.%fZ")
 
-    if not product_name or not version:
-        return None
 
-    # Filter to only include relevant platforms
-    relevant_platforms = [
-        "macOS", "iOS", "iPadOS", "visionOS", "tvOS", "watchOS", "Safari", "Xcode",
-        "XProtect", "beta"  # Include XProtect and beta releases
-    ]
-    
-    # Check if product name contains any relevant platform
-    is_relevant = False
-    product_lower = product_name.lower()
-    
-    # Special handling for beta releases
+def get_sortable_date(release: Dict) -> datetime:
+    """Sort key for a release, newest-first ordering uses reverse=True"""
+    return parse_date(release.get("date") or "", SORTABLE_DATE_FORMATS) or datetime.min
+
+
+# Product name substrings that make a release relevant, mapped to the feed platform
+# they belong to; checked in order, so "iOS 18 and iPadOS 18" lands in iOS
+PRODUCT_PLATFORMS: Tuple[Tuple[str, str], ...] = (
+    ("macos", "macOS"),
+    ("mac os", "macOS"),
+    ("ios", "iOS"),
+    ("ipad", "iOS"),
+    ("safari", "Safari"),
+    ("tvos", "tvOS"),
+    ("watchos", "watchOS"),
+    ("visionos", "visionOS"),
+    ("xcode", "Xcode"),
+)
+
+# Platforms that get their own sharded feed; only OS platforms are split per major version
+OS_FEED_PLATFORMS = ["macOS", "iOS", "Safari", "tvOS", "watchOS", "visionOS"]
+FEED_PLATFORMS = OS_FEED_PLATFORMS + ["XProtect", "beta"]
+
+# Product name (lowercased) -> platform from PRODUCT_PLATFORMS, filled on first lookup
+_product_platforms: Dict[str, Optional[str]] = {}
+
+
+def product_platform(product_lower: str) -> Optional[str]:
+    """Platform for a lowercased product name, or None if it is not a SOFA platform"""
+    try:
+        return _product_platforms[product_lower]
+    except KeyError:
+        pass
+    platform = next(
+        (name for needle, name in PRODUCT_PLATFORMS if needle in product_lower), None
+    )
+    _product_platforms[product_lower] = platform
+    return platform
+
+
+def release_platform(release: Dict) -> Optional[str]:
+    """Classify a release as beta, XProtect or a PRODUCT_PLATFORMS platform"""
+    product_lower = (release.get("name") or "").strip().lower()
+    release_type = release.get("type", "os")
+
     if release_type == "beta" or "beta" in product_lower:
-        is_relevant = True
-    # Special handling for XProtect
-    elif release_type.startswith("xprotect") or "xprotect" in product_lower:
-        is_relevant = True
+        return "beta"
+    if release_type.startswith("xprotect") or "xprotect" in product_lower:
+        return "XProtect"
+    return product_platform(product_lower)
+
+
+def _normalize_key_part(value: str) -> str:
+    return " ".join(value.split()).casefold()
+
+
+class ReleaseItem:
+    """A release accepted for the feed, with the fields used to deduplicate it"""
+
+    __slots__ = ("release", "platform", "version", "build", "type", "url", "key")
+
+    def __init__(self, release: Dict, platform: str, version: str, build: str, release_type: str):
+        self.release = release
+        self.platform = platform
+        self.version = version
+        self.build = build
+        self.type = release_type
+        self.url = (release.get("url") or "").strip().rstrip("/")
+
+        if platform == "beta":
+            # iOS and iPadOS betas share a build but are separate items
+            key_product = f"beta {release.get('platform') or release['name'].split()[0]}"
+        else:
+            # The product prefix of the GUID, so "iOS 14.7" and "iPadOS 14.7"
+            # listed on one bulletin stay separate items
+            key_product = release["name"].split()[0]
+        # Separate advisories can share a version and date ("Safari 15.3" and
+        # "Safari 15.3 (v. ...)"); only listings of the same bulletin are merged
+        self.key: Tuple[str, str, str, str, str] = (
+            _normalize_key_part(key_product),
+            _normalize_key_part(version),
+            _normalize_key_part(build),
+            release_type,
+            self.url.casefold(),
+        )
+
+    @classmethod
+    def from_release(cls, release: Dict) -> Optional["ReleaseItem"]:
+        """Build the item for a release, or None if it does not belong in the feed"""
+        product_name = (release.get("name") or "").strip()
+        version = (release.get("version") or "").strip()
+        if not product_name or not version:
+            return None
+
+        platform = release_platform(release)
+        if platform is None:
+            return None
+
+        release_type = release.get("type", "os")
+        if release_type == "os" and "supplemental" in product_name.lower():
+            release_type = "os supplemental"
+        build = (release.get("build") or release.get("date") or "").strip()
+        return cls(release, platform, version, build, release_type)
+
+
+class ReleaseItemIndex:
+    """Releases already added to a feed, keyed on ReleaseItem.key"""
+
+    __slots__ = ("items",)
+
+    def __init__(self):
+        self.items: Dict[Tuple[str, str, str, str, str], ReleaseItem] = {}
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def claim(self, release: Dict) -> Optional[ReleaseItem]:
+        """Add a release to the index, or return None if it is irrelevant or a duplicate"""
+        item = ReleaseItem.from_release(release)
+        if item is None:
+            return None
+        key = item.key
+        if key in self.items:
+            return None
+        self.items[key] = item
+        return item
+
+
+def feed_item_guid(release: Dict) -> str:
+    """Build the type-specific RSS GUID for a release"""
+    product_name = (release.get("name") or "").strip()
+    version = (release.get("version") or "").strip()
+    release_type = release.get("type", "os")
+
+    if release_type.startswith("xprotect"):
+        return f"XProtect_{release_type.replace('xprotect_', '')}_{version}"
+    elif release_type == "beta":
+        return f"Beta_{product_name.replace(' ', '_')}_{version}"
     else:
-        # Check for platform names in product name
-        for platform in relevant_platforms:
-            if platform.lower() in product_lower:
-                is_relevant = True
-                break
-    
-    if not is_relevant:
-        return None
+        # OS update GUID
+        product_type = product_name.split()[0] if product_name else "Unknown"
+        return f"{product_type}_OS_{version}"
 
-    # Generate unique ID for deduplication
-    item_id = f"{product_name}_{version}_{date}"
-    item_hash = hashlib.md5(item_id.encode()).hexdigest()
 
-    if item_hash in seen_items:
-        return None
-    seen_items.add(item_hash)
+def feed_item_major(release: Dict) -> Optional[str]:
+    """Major version of an OS release ("26" for "26.0.1"), or None if it has none"""
+    major = (release.get("version") or "").strip().split(".")[0]
+    return major if major.isdigit() else None
+
+
+def render_feed_item(
+    release: Dict, context: RSSContext, previous_releases: Optional[Dict[str, datetime]] = None
+) -> Optional[Element]:
+    """Render the RSS item element for a release accepted by ReleaseItemIndex.claim"""
+    product_name = (release.get("name") or "").strip()
+    version = (release.get("version") or "").strip()
+    date = (release.get("date") or "").strip()
+    release_type = release.get("type", "os")  # os, xprotect, beta
 
     # Create item element
     item = Element("item")
@@ -368,38 +634,8 @@ def create_feed_item(
         # Only use SOFA URLs when no Apple URL available
         link.text = SOFA_FQDN
 
-    # Helper function for SOFA page mapping (for descriptions only)
-    def get_sofa_page_link(product_name: str, version: str, release_type: str) -> str:
-        """Generate SOFA page links for description text"""
-        product_lower = product_name.lower()
-        
-        if "macos" in product_lower or "mac os" in product_lower:
-            if "sequoia" in product_lower or "15." in version:
-                return f"{SOFA_FQDN}/macos/sequoia"
-            elif "sonoma" in product_lower or "14." in version:
-                return f"{SOFA_FQDN}/macos/sonoma"
-            elif "ventura" in product_lower or "13." in version:
-                return f"{SOFA_FQDN}/macos/ventura"
-            else:
-                return f"{SOFA_FQDN}/macos/sequoia"
-        elif "ios" in product_lower and "ipad" not in product_lower:
-            return f"{SOFA_FQDN}/ios/ios18" if "18." in version else f"{SOFA_FQDN}/ios/ios17"
-        elif "ipados" in product_lower or "ipad" in product_lower:
-            return f"{SOFA_FQDN}/ios/ios18" if "18." in version else f"{SOFA_FQDN}/ios/ios17"
-        elif "safari" in product_lower:
-            return f"{SOFA_FQDN}/safari/safari18"
-        elif "tvos" in product_lower:
-            return f"{SOFA_FQDN}/tvos/tvos18" if "18." in version else f"{SOFA_FQDN}/tvos/tvos17"
-        elif "watchos" in product_lower:
-            return f"{SOFA_FQDN}/watchos/watchos11"
-        elif "visionos" in product_lower:
-            return f"{SOFA_FQDN}/visionos/visionos2"
-        elif "xcode" in product_lower or release_type == "beta":
-            return f"{SOFA_FQDN}/beta-releases"
-        elif "xprotect" in product_lower or release_type.startswith("xprotect"):
-            return f"{SOFA_FQDN}/macos/sequoia"
-        else:
-            return f"{SOFA_FQDN}/"
+    # SOFA page links (for descriptions only)
+    get_sofa_page_link = context.page_links.resolve
 
     # Description - varies by type
     description = SubElement(item, "description")
@@ -407,9 +643,10 @@ def create_feed_item(
 
     if release_type.startswith("xprotect"):
         # Enhanced XProtect update description
+        xprotect_link = get_sofa_page_link(product_name, version, release_type)
         desc_parts.append(release.get("description", f"{product_name} updated"))
         desc_parts.append("Malware protection and security definitions updated")
-        desc_parts.append(f'Track all XProtect components on SOFA: <a href=f"{SOFA_FQDN}/macos/sequoia">{SOFA_FQDN}/macos/sequoia</a>')
+        desc_parts.append(f'Track all XProtect components on SOFA: <a href=f"{xprotect_link}">{xprotect_link}</a>')
 
     elif release_type == "beta":
         # Rich beta release description
@@ -437,7 +674,7 @@ def create_feed_item(
     else:
         # Security release description with CVE info
         # Extract and count CVEs
-        cves = extract_cves(release, data_dir)
+        cves = extract_cves(release, context.data_dir, context.kev_catalog)
         unique_cve_count = len(cves)
         exploited_count = sum(1 for is_exploited in cves.values() if is_exploited)
 
@@ -450,16 +687,13 @@ def create_feed_item(
 
         # Calculate days since previous release for same OS
         if previous_releases and date:
-            try:
-                current_date = datetime.strptime(date, "%Y-%m-%d")
-                os_type = product_name.split()[0]  # Get OS type (macOS, iOS, etc.)
-
-                if os_type in previous_releases:
-                    days_diff = (current_date - previous_releases[os_type]).days
-                    if days_diff > 0:
-                        desc_parts.append(f"Days to Prev. Release: {days_diff}")
-            except (ValueError, KeyError):
-                pass
+            current_date = parse_date(date, ISO_DAY_FORMATS)
+            os_type = product_name.split()[0]  # Get OS type (macOS, iOS, etc.)
+
+            if current_date is not None and os_type in previous_releases:
+                days_diff = (current_date - previous_releases[os_type]).days
+                if days_diff > 0:
+                    desc_parts.append(f"Days to Prev. Release: {days_diff}")
         
         # Add Apple security bulletin link if available
         apple_security_url = release.get("url", "")
@@ -476,15 +710,7 @@ def create_feed_item(
     # GUID - make unique based on type
     guid = SubElement(item, "guid")
     guid.set("isPermaLink", "false")
-
-    if release_type.startswith("xprotect"):
-        guid.text = f"XProtect_{release_type.replace('xprotect_', '')}_{version}"
-    elif release_type == "beta":
-        guid.text = f"Beta_{product_name.replace(' ', '_')}_{version}"
-    else:
-        # OS update GUID
-        product_type = product_name.split()[0] if product_name else "Unknown"
-        guid.text = f"{product_type}_OS_{version}"
+    guid.text = feed_item_guid(release)
 
     # Publication date - skip items without valid dates
     formatted_date = format_release_date(date)
@@ -499,38 +725,117 @@ def create_feed_item(
     return item
 
 
-def write_data_to_rss(all_releases: List[Dict], output_file: Path, data_dir: str = "data/resources") -> None:
-    """Write RSS feed from combined releases data (matching legacy function name)"""
-    # Create root RSS element
-    rss = Element("rss")
-    rss.set("version", "2.0")
+class RSSItemCache:
+    """Rendered item fragments (rss, atom, json) from earlier runs, keyed by GUID plus input hash"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries: Dict[str, Dict[str, str]] = {}
+        self.used: Dict[str, Dict[str, str]] = {}
+        self.hits = 0
+        self.misses = 0
+
+        if path.exists():
+            data = load_json_file(path)
+            if data and data.get("version") == RSS_ITEM_CACHE_VERSION:
+                self.entries = data.get("items", {})
+
+    @staticmethod
+    def key_for(release: Dict, previous_releases: Dict[str, datetime], context: RSSContext) -> str:
+        """Content address for everything the rendered item depends on"""
+        product_name = (release.get("name") or "").strip()
+        os_type = product_name.split()[0] if product_name else ""
+        previous = previous_releases.get(os_type)
+        cve_ids = release.get("cves") or {}
+        payload = {
+            "release": release,
+            "previous": previous.isoformat() if previous else None,
+            "kev": sorted(cve_id for cve_id in cve_ids if cve_id in context.kev_catalog),
+            "fqdn": SOFA_FQDN,
+            "pages": context.page_links_fingerprint,
+        }
+        digest = hashlib.sha256(
+            json.dumps(payload, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        return f"{feed_item_guid(release)}:{digest}"
+
+    def get(self, key: str, formats: List[str]) -> Optional[Dict[str, str]]:
+        """Cached fragments for key, or None unless every requested format is present"""
+        fragments = self.entries.get(key)
+        if fragments is None or any(fmt not in fragments for fmt in formats):
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.used[key] = fragments
+        return fragments
+
+    def put(self, key: str, fragments: Dict[str, str]) -> None:
+        self.used[key] = fragments
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"version": RSS_ITEM_CACHE_VERSION, "items": self.used}, f)
+
+
+def _escape_xml(text: str) -> str:
+    """Escape text and attribute values the same way minidom's writer does"""
+    return (
+        text.replace("&", "&amp;")
+        .replace("<", "&lt;")
+        .replace('"', "&quot;")
+        .replace(">", "&gt;")
+    )
 
-    # Create channel
-    channel = SubElement(rss, "channel")
 
-    # Channel metadata
-    title = SubElement(channel, "title")
-    title.text = "SOFA - RSS Update Feed"
+def render_element(element: Element, indent: str = "") -> str:
+    """Pretty-print an element with the layout minidom.toprettyxml(indent="  ") produces"""
+    parts: List[str] = []
+    _render_element(element, indent, parts)
+    return "".join(parts)
 
-    link = SubElement(channel, "link")
+
+def _render_element(element: Element, indent: str, parts: List[str]) -> None:
+    parts.append(f"{indent}<{element.tag}")
+    for name, value in element.attrib.items():
+        parts.append(f' {name}="{_escape_xml(value)}"')
+
+    children = list(element)
+    if children:
+        parts.append(">\n")
+        for child in children:
+            _render_element(child, indent + "  ", parts)
+        parts.append(f"{indent}</{element.tag}>\n")
+    elif element.text:
+        parts.append(f">{_escape_xml(element.text)}</{element.tag}>\n")
+    else:
+        parts.append("/>\n")
+
+
+def build_channel_metadata(scope: str = "") -> List[Element]:
+    """Build the channel-level elements that precede the feed items"""
+    title = Element("title")
+    title.text = f"SOFA - {scope} RSS Update Feed" if scope else "SOFA - RSS Update Feed"
+
+    link = Element("link")
     link.text = SOFA_FQDN
 
-    description = SubElement(channel, "description")
+    description = Element("description")
     description.text = "Simple Organized Feed for Apple Software Updates - Security releases and updates"
 
-    language = SubElement(channel, "language")
+    language = Element("language")
     language.text = "en-us"
 
     # Generator
-    generator = SubElement(channel, "generator")
+    generator = Element("generator")
     generator.text = "SOFA RSS Generator 2.0"
 
     # Build date
-    last_build = SubElement(channel, "lastBuildDate")
+    last_build = Element("lastBuildDate")
     last_build.text = datetime.now().strftime("%a, %d %b %Y %H:%M:%S +0000")
 
     # Logo/image
-    image = SubElement(channel, "image")
+    image = Element("image")
     image_url = SubElement(image, "url")
     image_url.text = f"{SOFA_FQDN}/images/custom_logo.png"
     image_title = SubElement(image, "title")
@@ -538,63 +843,279 @@ def write_data_to_rss(all_releases: List[Dict], output_file: Path, data_dir: str
     image_link = SubElement(image, "link")
     image_link.text = SOFA_FQDN
 
-    # Sort releases by date (newest first), handling different date formats
-    def get_sortable_date(release):
-        date_str = release.get("date", "")
-        if not date_str:
-            return datetime.min
-
-        # Try parsing common formats
-        for fmt in ["%Y-%m-%d", "%Y-%m-%dT%H:%M:%SZ", "%Y-%m-%dT%H:%M:%S.%fZ"]:
-            try:
-                return datetime.strptime(date_str, fmt)
-            except ValueError:
-                continue
-        return datetime.min
+    return [title, link, description, language, generator, last_build, image]
+
+
+def _item_fields(item: Element) -> Dict[str, str]:
+    """Pull the format-neutral fields out of a rendered RSS <item>"""
+    fields = {child.tag: child.text or "" for child in item}
+    published = parsedate_to_datetime(fields["pubDate"]) if fields.get("pubDate") else None
+    fields["updated"] = published.strftime("%Y-%m-%dT%H:%M:%SZ") if published else ""
+    return fields
 
+
+class FeedStreamWriter(ABC):
+    """Stream one feed document to a temporary sibling item by item and move it into place"""
+
+    format = ""
+    suffix = ""
+
+    def __init__(self, output_file: Path, scope: str = ""):
+        self.output_file = output_file
+        self.scope = scope
+        self.tmp_file = output_file.with_name(output_file.name + ".tmp")
+        self.items_written = 0
+        self._handle = None
+
+    @staticmethod
+    @abstractmethod
+    def render(item: Element) -> str:
+        """Serialize one rendered RSS <item> as this format's entry fragment"""
+
+    @abstractmethod
+    def header(self) -> str:
+        """Everything written before the first item"""
+
+    @abstractmethod
+    def footer(self) -> str:
+        """Everything written after the last item"""
+
+    def __enter__(self) -> "FeedStreamWriter":
+        self.output_file.parent.mkdir(parents=True, exist_ok=True)
+        self._handle = open(self.tmp_file, "w", encoding="utf-8", newline="\n")
+        self._handle.write(self.header())
+        return self
+
+    def write_item(self, fragment: str) -> None:
+        self._handle.write(fragment)
+        self.items_written += 1
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self._handle.write(self.footer())
+        self._handle.close()
+        if exc_type is None:
+            os.replace(self.tmp_file, self.output_file)
+        else:
+            self.tmp_file.unlink(missing_ok=True)
+
+
+class RSSStreamWriter(FeedStreamWriter):
+    """RSS 2.0, laid out exactly as the original minidom-based writer produced it"""
+
+    format = "rss"
+    suffix = ".xml"
+
+    @staticmethod
+    def render(item: Element) -> str:
+        return render_element(item, "    ")
+
+    def header(self) -> str:
+        parts = ['<?xml version="1.0" encoding="UTF-8"?>\n', '<rss version="2.0">\n', "  <channel>\n"]
+        parts.extend(render_element(element, "    ") for element in build_channel_metadata(self.scope))
+        return "".join(parts)
+
+    def footer(self) -> str:
+        return "  </channel>\n</rss>\n"
+
+
+class AtomStreamWriter(FeedStreamWriter):
+    """Atom 1.0 (RFC 4287)"""
+
+    format = "atom"
+    suffix = ".atom"
+
+    @staticmethod
+    def render(item: Element) -> str:
+        fields = _item_fields(item)
+        return (
+            "  <entry>\n"
+            f"    <title>{_escape_xml(fields.get('title', ''))}</title>\n"
+            f"    <link href=\"{_escape_xml(fields.get('link', ''))}\"/>\n"
+            f"    <id>urn:sofa:{_escape_xml(quote(fields.get('guid', '')))}</id>\n"
+            f"    <updated>{fields['updated']}</updated>\n"
+            f"    <summary type=\"html\">{_escape_xml(fields.get('description', ''))}</summary>\n"
+            "  </entry>\n"
+        )
+
+    def header(self) -> str:
+        title = f"SOFA - {self.scope} Update Feed" if self.scope else "SOFA - Update Feed"
+        updated = datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ")
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<feed xmlns="http://www.w3.org/2005/Atom" xml:lang="en-us">\n'
+            f"  <title>{_escape_xml(title)}</title>\n"
+            "  <subtitle>Simple Organized Feed for Apple Software Updates - Security releases and updates</subtitle>\n"
+            f"  <id>{_escape_xml(SOFA_FQDN)}/</id>\n"
+            f"  <link href=\"{_escape_xml(SOFA_FQDN)}\"/>\n"
+            f"  <updated>{updated}</updated>\n"
+            "  <author>\n    <name>SOFA</name>\n  </author>\n"
+            "  <generator>SOFA RSS Generator 2.0</generator>\n"
+            f"  <logo>{_escape_xml(SOFA_FQDN)}/images/custom_logo.png</logo>\n"
+        )
+
+    def footer(self) -> str:
+        return "</feed>\n"
+
+
+class JSONFeedStreamWriter(FeedStreamWriter):
+    """JSON Feed 1.1 (https://jsonfeed.org/version/1.1)"""
+
+    format = "json"
+    suffix = ".json"
+
+    @staticmethod
+    def render(item: Element) -> str:
+        fields = _item_fields(item)
+        entry = {
+            "id": fields.get("guid", ""),
+            "url": fields.get("link", ""),
+            "title": fields.get("title", ""),
+            "content_html": fields.get("description", ""),
+            "date_published": fields["updated"],
+        }
+        return json.dumps(entry, ensure_ascii=False)
+
+    def header(self) -> str:
+        title = f"SOFA - {self.scope} Update Feed" if self.scope else "SOFA - Update Feed"
+        feed = {
+            "version": "https://jsonfeed.org/version/1.1",
+            "title": title,
+            "home_page_url": SOFA_FQDN,
+            "description": "Simple Organized Feed for Apple Software Updates - Security releases and updates",
+            "icon": f"{SOFA_FQDN}/images/custom_logo.png",
+            "authors": [{"name": "SOFA"}],
+            "language": "en-us",
+        }
+        # Leave the object open so items can be streamed into its "items" array
+        return json.dumps(feed, ensure_ascii=False, indent=2)[:-2] + ',\n  "items": [\n'
+
+    def write_item(self, fragment: str) -> None:
+        self._handle.write(("    " if self.items_written == 0 else ",\n    ") + fragment)
+        self.items_written += 1
+
+    def footer(self) -> str:
+        return ("\n" if self.items_written else "") + "  ]\n}\n"
+
+
+# Output formats by name; rss is always written, atom and json via --atom-output/--json-output
+FEED_WRITERS = {
+    writer.format: writer for writer in (RSSStreamWriter, AtomStreamWriter, JSONFeedStreamWriter)
+}
+
+
+def write_data_to_rss(
+    all_releases: List[Dict], output_file: Path, data_dir: str = "data/resources",
+    context: Optional[RSSContext] = None, item_cache: Optional[RSSItemCache] = None,
+    shard_dir: Optional[Path] = None, shard_by_major: bool = False,
+    extra_outputs: Optional[Dict[str, Path]] = None
+) -> None:
+    """Write RSS feed from combined releases data (matching legacy function name)"""
+    if context is None:
+        context = RSSContext(data_dir)
+
+    outputs = {"rss": output_file, **(extra_outputs or {})}
+    formats = list(outputs)
+
+    # Sort releases by date (newest first); the key is computed once per release
     sorted_releases = sorted(all_releases, key=get_sortable_date, reverse=True)
 
-    # Track seen items for deduplication
-    seen_items: Set[str] = set()
+    # Index of added items for deduplication
+    item_index = ReleaseItemIndex()
 
     # Track previous release dates by OS type for calculating days
     previous_releases: Dict[str, datetime] = {}
 
-    # Add items to feed
+    # Stream items to the feed
     items_added = 0
-    for release in sorted_releases:
-        item = create_feed_item(release, seen_items, previous_releases, data_dir)
-        if item is not None:
-            channel.append(item)
+    render_start = time.perf_counter()
+    shard_writers: Dict[str, List[FeedStreamWriter]] = {}
+    shard_items: Dict[str, int] = {}
+
+    def write_shard(name: str, scope: str, fragments: Dict[str, str]) -> None:
+        if name not in shard_writers:
+            shard_writers[name] = [
+                stack.enter_context(
+                    FEED_WRITERS[fmt](shard_dir / f"{name}{FEED_WRITERS[fmt].suffix}", scope)
+                )
+                for fmt in formats
+            ]
+            shard_items[name] = 0
+        for shard_writer in shard_writers[name]:
+            shard_writer.write_item(fragments[shard_writer.format])
+        shard_items[name] += 1
+
+    with ExitStack() as stack:
+        writers = [stack.enter_context(FEED_WRITERS[fmt](path)) for fmt, path in outputs.items()]
+
+        for release in sorted_releases:
+            feed_item = item_index.claim(release)
+            if feed_item is None:
+                continue
+
+            fragments = None
+            cache_key = None
+            if item_cache is not None:
+                cache_key = item_cache.key_for(release, previous_releases, context)
+                fragments = item_cache.get(cache_key, formats)
+
+            if fragments is None:
+                item = render_feed_item(release, context, previous_releases)
+                if item is None:
+                    continue
+                fragments = {fmt: FEED_WRITERS[fmt].render(item) for fmt in formats}
+                if item_cache is not None:
+                    item_cache.put(cache_key, fragments)
+
+            for writer in writers:
+                writer.write_item(fragments[writer.format])
             items_added += 1
 
+            if shard_dir is not None:
+                platform = feed_item.platform if feed_item.platform in FEED_PLATFORMS else None
+                if platform is not None:
+                    write_shard(platform.lower(), platform, fragments)
+                    major = feed_item_major(release)
+                    if shard_by_major and platform in OS_FEED_PLATFORMS and major:
+                        write_shard(f"{platform.lower()}_{major}", f"{platform} {major}", fragments)
+
             # Update previous release tracking for OS updates
             if release.get("type", "os") == "os":
                 name = release.get("name", "")
                 date_str = release.get("date", "")
-                if name and date_str:
-                    try:
-                        os_type = name.split()[0]
-                        release_date = datetime.strptime(date_str, "%Y-%m-%d")
-                        if (
-                            os_type not in previous_releases
-                            or release_date < previous_releases[os_type]
-                        ):
-                            previous_releases[os_type] = release_date
-                    except (ValueError, KeyError):
-                        pass
-
-    # Pretty print XML
-    xml_str = tostring(rss, encoding="unicode")
-    dom = minidom.parseString(xml_str)
-    pretty_xml = dom.toprettyxml(indent="  ", encoding="UTF-8")
-
-    # Write to file
-    output_file.parent.mkdir(parents=True, exist_ok=True)
-    with open(output_file, "wb") as f:
-        f.write(pretty_xml)
+                release_date = parse_date(date_str, ISO_DAY_FORMATS)
+                if name and release_date is not None:
+                    os_type = name.split()[0]
+                    if (
+                        os_type not in previous_releases
+                        or release_date < previous_releases[os_type]
+                    ):
+                        previous_releases[os_type] = release_date
+
+        context.timings["render"] = time.perf_counter() - render_start
+        context.timings["items"] = len(sorted_releases)
+        write_start = time.perf_counter()
+
+    # Remove shards left over from earlier runs, e.g. a major that dropped out of the data
+    stale_shards: List[Path] = []
+    if shard_dir is not None:
+        written = {writer.output_file for writers in shard_writers.values() for writer in writers}
+        suffixes = {writer.suffix for writer in FEED_WRITERS.values()}
+        stale_shards = [
+            path for path in shard_dir.glob("*")
+            if path.suffix in suffixes and path.is_file() and path not in written
+        ]
+        for path in stale_shards:
+            path.unlink()
+
+    if item_cache is not None:
+        item_cache.save()
+    context.timings["write"] = time.perf_counter() - write_start
 
     print(f"✅ RSS feed generated: {output_file}")
+    for fmt, path in outputs.items():
+        if fmt != "rss":
+            print(f"✅ {fmt.upper()} feed generated: {path}")
     print(f"   - Total items: {items_added}")
     print(
         f"   - Security updates: {sum(1 for r in sorted_releases if r.get('type', 'os') == 'os')}"
@@ -606,6 +1127,15 @@ def write_data_to_rss(all_releases: List[Dict], output_file: Path, data_dir: str
         f"   - Beta releases: {sum(1 for r in sorted_releases if r.get('type') == 'beta')}"
     )
     print(f"   - Duplicates removed: {len(sorted_releases) - items_added}")
+    if item_cache is not None:
+        print(f"   - Cached items reused: {item_cache.hits}, rendered: {item_cache.misses}")
+    if shard_items:
+        suffixes = "/".join(FEED_WRITERS[fmt].suffix for fmt in formats)
+        print(f"   - Sharded feeds: {len(shard_items)} ({suffixes}) in {shard_dir}")
+        for name, count in sorted(shard_items.items()):
+            print(f"     • {name}: {count} items")
+    if stale_shards:
+        print(f"   - Stale shards removed: {', '.join(path.name for path in sorted(stale_shards))}")
 
 
 def calculate_days_between_releases(releases: List[Dict]) -> None:
@@ -635,22 +1165,47 @@ def calculate_days_between_releases(releases: List[Dict]) -> None:
             current_date = sorted_releases[i].get("date", "")
             prev_date = sorted_releases[i + 1].get("date", "")
 
-            if current_date and prev_date:
-                try:
-                    current = datetime.strptime(current_date, "%Y-%m-%d")
-                    previous = datetime.strptime(prev_date, "%Y-%m-%d")
-                    days_diff = (current - previous).days
-                    sorted_releases[i]["days_since_previous"] = days_diff
-                except ValueError:
-                    pass
+            current = parse_date(current_date, ISO_DAY_FORMATS)
+            previous = parse_date(prev_date, ISO_DAY_FORMATS)
+            if current is not None and previous is not None:
+                days_diff = (current - previous).days
+                sorted_releases[i]["days_since_previous"] = days_diff
+
+
+def print_timing_report(context: RSSContext) -> None:
+    """Show where the RSS run spent its time, including per-item render cost"""
+    timings = context.timings
+    items = int(timings.get("items", 0))
+
+    table = Table(title="RSS Timing Report")
+    table.add_column("Phase", style="cyan")
+    table.add_column("Duration", style="yellow")
+
+    table.add_row("Load inputs (KEV, bulletin, releases)", f"{timings.get('load', 0.0) * 1000:.1f} ms")
+    table.add_row("Render + stream items", f"{timings.get('render', 0.0) * 1000:.1f} ms")
+    table.add_row("Finalize output", f"{timings.get('write', 0.0) * 1000:.1f} ms")
+    if items:
+        per_item_us = timings.get("render", 0.0) / items * 1_000_000
+        table.add_row(f"Per item ({items} releases)", f"{per_item_us:.1f} µs")
+
+    console.print(table)
 
 
 def main(
     output: str = typer.Option("v1/rss_feed.xml", "--output", help="Output RSS file path"),
     data_dir: str = typer.Option("data/resources", "--data-dir", help="Data directory containing JSON files"),
+    feeds_dir: str = typer.Option("v2", "--feeds-dir", help="v2 feeds directory used to map releases to SOFA pages"),
+    web_dir: str = typer.Option("web", "--web-dir", help="SOFA web tree; only pages that exist there are linked"),
     verbose: bool = typer.Option(True, "--verbose/--quiet", help="Enable verbose output"),
     include_xprotect: bool = typer.Option(True, "--include-xprotect/--no-xprotect", help="Include XProtect updates in feed"),
-    include_beta: bool = typer.Option(False, "--include-beta/--no-beta", help="Include beta releases in feed")
+    include_beta: bool = typer.Option(False, "--include-beta/--no-beta", help="Include beta releases in feed"),
+    timing: bool = typer.Option(False, "--timing", help="Show a per-phase and per-item timing report"),
+    incremental: bool = typer.Option(False, "--incremental/--full", help="Reuse cached <item> fragments and only render new or changed releases"),
+    cache_file: str = typer.Option("data/cache/rss_items.json", "--cache-file", help="Rendered item cache used by --incremental"),
+    shard_dir: Optional[str] = typer.Option(None, "--shard-dir", help="Also write per-platform feeds (macos.xml, ios.xml, ...) to this directory"),
+    shard_by_major: bool = typer.Option(False, "--shard-by-major", help="With --shard-dir, also write per-major-version feeds (macos_26.xml, ...)"),
+    atom_output: Optional[str] = typer.Option(None, "--atom-output", help="Also write an Atom 1.0 feed to this path"),
+    json_output: Optional[str] = typer.Option(None, "--json-output", help="Also write a JSON Feed 1.1 document to this path")
 ):
     """Generate optimized RSS feed for Apple security releases, XProtect, and beta updates"""
     
@@ -661,6 +1216,7 @@ def main(
     ))
 
     all_releases = []
+    context = RSSContext(data_dir, feeds_dir, web_dir)
     
     with Progress(
         SpinnerColumn(),
@@ -670,7 +1226,7 @@ def main(
         
         # Load security releases
         task1 = progress.add_task("Loading Apple security releases...", total=1)
-        releases = load_security_releases(data_dir)
+        releases = load_security_releases(data_dir, context)
         if releases:
             all_releases.extend(releases)
             progress.advance(task1)
@@ -724,7 +1280,16 @@ def main(
     output_path = Path(output)
     
     with console.status(f"[bold green]Generating RSS feed..."):
-        write_data_to_rss(all_releases, output_path, data_dir)
+        item_cache = RSSItemCache(Path(cache_file)) if incremental else None
+        extra_outputs = {}
+        if atom_output:
+            extra_outputs["atom"] = Path(atom_output)
+        if json_output:
+            extra_outputs["json"] = Path(json_output)
+        write_data_to_rss(
+            all_releases, output_path, data_dir, context, item_cache,
+            Path(shard_dir) if shard_dir else None, shard_by_major, extra_outputs
+        )
 
     # Generate summary table
     table = Table(title="RSS Generation Results")
@@ -756,6 +1321,10 @@ def main(
             console.print(f"⚠️ Error reading output: {e}", style="yellow")
     
     console.print(table)
+
+    if timing:
+        print_timing_report(context)
+
     console.print(f"✅ [bold green]RSS feed generated:[/bold green] {output_path}")
 
 if __name__ == "__main__":
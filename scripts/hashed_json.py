@@ -0,0 +1,101 @@
+"""
+Hashed JSON feeds for SOFA
+Produces a feed's UpdateHash and its bytes on disk from one serialization pass;
+the hash covers that exact layout, including key order, so reordering the same
+content changes it
+"""
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Union
+
+HASH_KEY = "UpdateHash"
+
+_HASH_PLACEHOLDER = "0" * 64
+
+# Leading hash member written by write_hashed_json
+_LEADING_HASH = re.compile(r'\A\{\s*"(\w+)":\s*"([0-9a-f]{64})"')
+
+
+def _encode(body: Dict) -> Iterator[str]:
+    # The on-disk layout, keys in insertion order (not sorted)
+    return json.JSONEncoder(indent=4, ensure_ascii=False).iterencode(body)
+
+
+def _body(data: Dict, hash_key: str) -> Dict:
+    return {key: value for key, value in data.items() if key != hash_key}
+
+
+def compute_update_hash(data: Dict, hash_key: str = HASH_KEY) -> str:
+    """SHA-256 of data without its hash_key member, serialized as write_hashed_json lays it out"""
+    hasher = hashlib.sha256()
+    for chunk in _encode(_body(data, hash_key)):
+        hasher.update(chunk.encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def read_update_hash(path: Union[str, Path], hash_key: str = HASH_KEY) -> Optional[str]:
+    """The hash_key value of a feed on disk, or None if it is missing or unreadable"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            match = _LEADING_HASH.match(f.read(128))
+            if match and match.group(1) == hash_key:
+                return match.group(2)
+            f.seek(0)
+            value = json.load(f).get(hash_key)
+    except (OSError, ValueError, AttributeError):
+        return None
+    return value if isinstance(value, str) else None
+
+
+def write_hashed_json(data: Dict, path: Union[str, Path], hash_key: str = HASH_KEY,
+                      keep_if_hash: Optional[str] = None) -> str:
+    """Write data to path atomically with its hash as the first member and return the hash"""
+    body = _body(data, hash_key)
+    if not body:
+        raise ValueError("Cannot write a hashed feed with no content")
+
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    hasher = hashlib.sha256()
+
+    try:
+        with open(tmp_path, "wb") as f:
+            chunks = _encode(body)
+            # The body always opens with "{"; the hash member goes right after it
+            opening = next(chunks).encode("utf-8")
+            hasher.update(opening)
+            f.write(opening[:1])
+            header = f'\n    "{hash_key}": "'.encode("utf-8")
+            f.write(header)
+            hash_offset = f.tell()
+            f.write(f'{_HASH_PLACEHOLDER}",'.encode("utf-8"))
+            f.write(opening[1:])
+
+            for chunk in chunks:
+                encoded = chunk.encode("utf-8")
+                hasher.update(encoded)
+                f.write(encoded)
+
+            hash_value = hasher.hexdigest()
+            f.seek(hash_offset)
+            f.write(hash_value.encode("ascii"))
+        if hash_value == keep_if_hash:
+            tmp_path.unlink()
+        else:
+            os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    return hash_value
+
+
+def verify_update_hash(path: Union[str, Path], hash_key: str = HASH_KEY) -> bool:
+    """Check that a feed written by write_hashed_json still matches its hash"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return data.get(hash_key) == compute_update_hash(data, hash_key)
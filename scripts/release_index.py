@@ -0,0 +1,109 @@
+"""
+Security release title index for the SOFA feed scripts
+Classifies Apple security release titles by OS type and major version
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+# OS types the index classifies titles into
+INDEXED_OS_TYPES = ("macOS", "iOS")
+
+# "macOS Sequoia 15", "macOS Sequoia 15.1" or "macOS 15", but not "10.15"
+MACOS_TITLE_PATTERN = re.compile(
+    r'(?:macOS\s+(?:Sequoia|Sonoma|Ventura|Monterey|Big Sur)?\s*)(\d+)(?:\.(\d+))?', re.IGNORECASE
+)
+IOS_TITLE_PATTERN = re.compile(r'(?:iOS|iPadOS)\s+(\d+(?:\.\d+)*)', re.IGNORECASE)
+
+# Point versions like "15.1" or "15.1.1" anywhere in the title
+POINT_VERSION_PATTERN = re.compile(r'(\d+\.\d+(?:\.\d+)?)')
+# Base releases like "macOS Sequoia 15" or "iOS 18" at the end of the title
+MACOS_BASE_PATTERN = re.compile(
+    r'(?:macOS\s+(?:Sequoia|Sonoma|Ventura|Monterey|Big Sur)?\s*)(\d+)$', re.IGNORECASE
+)
+IOS_BASE_PATTERN = re.compile(r'(?:iOS|iPadOS)\s+(\d+)$', re.IGNORECASE)
+
+# Rapid Security Response letter, e.g. the "a" in "iOS 16.5.1 (a)"
+RSR_LETTER_PATTERN = re.compile(r'\((\w)\)')
+
+
+def title_major_version(title: str, os_type: str) -> Optional[str]:
+    """Major version a release title belongs to for os_type, or None if it is not that OS"""
+    title_lower = title.lower()
+
+    if os_type == "macOS":
+        if "macos" not in title_lower:
+            return None
+        version_match = MACOS_TITLE_PATTERN.search(title)
+        return version_match.group(1) if version_match else None
+
+    if os_type == "iOS":
+        if not ("ios" in title_lower or "ipados" in title_lower):
+            return None
+        version_match = IOS_TITLE_PATTERN.search(title)
+        return version_match.group(1).split('.')[0] if version_match else None
+
+    return None
+
+
+def title_version(title: str) -> Optional[str]:
+    """Version in a release title, with base releases reported as "<major>.0" """
+    version_match = POINT_VERSION_PATTERN.search(title)
+    if version_match:
+        return version_match.group(1)
+
+    base_match = MACOS_BASE_PATTERN.search(title) or IOS_BASE_PATTERN.search(title)
+    if base_match:
+        return base_match.group(1) + ".0"
+
+    return None
+
+
+def title_release_type(title: str) -> Tuple[str, Optional[str]]:
+    """Feed ReleaseType ("OS", "RSR" or "RSR_<letter>") and the RSR letter, if any"""
+    if "Rapid Security Response" not in title:
+        return "OS", None
+    rsr_match = RSR_LETTER_PATTERN.search(title)
+    if rsr_match:
+        return f"RSR_{rsr_match.group(1)}", rsr_match.group(1)
+    return "RSR", None
+
+
+class IndexedRelease:
+    """A security release with its title parsed once"""
+
+    __slots__ = ("release", "name", "os_type", "major", "version", "release_type", "rsr_letter")
+
+    def __init__(self, release: Dict, name: str, os_type: str, major: str, version: str,
+                 release_type: str, rsr_letter: Optional[str]):
+        self.release = release
+        self.name = name
+        self.os_type = os_type
+        self.major = major
+        self.version = version
+        self.release_type = release_type
+        self.rsr_letter = rsr_letter
+
+
+def build_release_index(
+    security_releases: List[Dict], os_types: Tuple[str, ...] = INDEXED_OS_TYPES
+) -> Dict[Tuple[str, str], List[IndexedRelease]]:
+    """Index releases by (os_type, major_version) in their original order, skipping titles without a version"""
+    index: Dict[Tuple[str, str], List[IndexedRelease]] = {}
+
+    for release in security_releases:
+        name = release.get("name", "")
+        version = title_version(name)
+        if not version:
+            continue
+        release_type, rsr_letter = title_release_type(name)
+
+        for os_type in os_types:
+            major = title_major_version(name, os_type)
+            if major is None:
+                continue
+            index.setdefault((os_type, major), []).append(
+                IndexedRelease(release, name, os_type, major, version, release_type, rsr_letter)
+            )
+
+    return index
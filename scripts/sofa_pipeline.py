@@ -5,6 +5,7 @@
 # dependencies = [
 #     "rich>=13.7.0",
 #     "typer>=0.9.0",
+#     "brotli>=1.1.0",
 # ]
 # ///
 """
@@ -15,29 +16,111 @@ No complex path detection, minimal TOML parsing.
 
 __version__ = "0.2.0"
 
+import asyncio
+import gzip
+import hashlib
 import json
-import subprocess
+import os
+import re
 import sys
-from datetime import datetime
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from fnmatch import fnmatch
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import Annotated, Awaitable, Callable, List, Dict, Any, Optional, Tuple
 import typer
 
 from rich.console import Console
+from rich.markup import escape
 from rich.panel import Panel
-from rich.progress import Progress, SpinnerColumn, TextColumn
+from rich.progress import BarColumn, MofNCompleteColumn, Progress, SpinnerColumn, TextColumn, TimeElapsedColumn
 from rich.table import Table
 from rich.tree import Tree
 
+from feed_validation import FileCheck, ValidationReport, schema_for, validate_files
+
+# brotli is optional outside uv; without it only .gz siblings are written
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
 console = Console()
 app = typer.Typer(help=f"SOFA Pipeline Clean v{__version__}")
 
+# Feeds that get precompressed .gz/.br siblings in the publish stage; schemas
+# and schema_changelog.json are not served as feeds
+PUBLISHED_FEEDS = [
+    "v1/*_data_feed.json", "v1/timestamp.json",
+    "v1/rss_feed.xml", "v1/rss_feed.atom", "v1/rss_feed.json",
+    "v1/rss/*.xml", "v1/rss/*.atom", "v1/rss/*.json",
+    "v2/*_data_feed.json", "v2/dms_consumers.json", "v2/dms_consumers_lite.json",
+]
+# Serving tree: a copy of each feed with its .gz/.br siblings right next to it,
+# at the feed's path (dist/v2/macos_data_feed.json, ...json.gz, ...json.br).
+# It is untracked, so the workflows that commit v1/ and v2/ and gzip them for
+# R2 never see the siblings
+PUBLISH_DIR = Path("dist")
+PUBLISH_STATE_FILE = Path("data/cache/publish_hashes.json")
+# Read size for streamed command output; longer lines are logged in pieces
+STREAM_CHUNK_BYTES = 1024 * 1024
+# Longer output lines are cut on the console (rich wraps them very slowly); the log keeps them whole
+DISPLAY_LINE_CHARS = 500
+# Input fingerprints of each stage's last successful run
+PIPELINE_STATE_FILE = Path("data/cache/pipeline_state.json")
+# One telemetry record per pipeline run, like timeseries.ndjson
+PIPELINE_RUNS_FILE = Path("data/resources/pipeline_runs.ndjson")
+
+# Runs a command and writes its resource usage as JSON to argv[1]. asyncio
+# reaps its children itself, so the usage is collected here with wait4.
+COMMAND_PROBE = """
+import json, os, signal, subprocess, sys
+usage_path, cmd = sys.argv[1], sys.argv[2:]
+try:
+    # Own process group, so a timeout also stops anything the command started
+    child = subprocess.Popen(cmd, start_new_session=True)
+except OSError as e:
+    print(e, file=sys.stderr)
+    sys.exit(127)
+signal.signal(signal.SIGINT, lambda *_: os.killpg(child.pid, signal.SIGINT))
+signal.signal(signal.SIGTERM, lambda *_: os.killpg(child.pid, signal.SIGKILL))
+io = {}
+if hasattr(os, "waitid"):
+    # Leave the exited child unreaped so its /proc I/O counters can be read
+    os.waitid(os.P_PID, child.pid, os.WEXITED | os.WNOWAIT)
+    try:
+        with open(f"/proc/{child.pid}/io") as f:
+            io = dict(line.split(": ") for line in f.read().splitlines())
+    except OSError:
+        pass
+_, status, usage = os.wait4(child.pid, 0)
+with open(usage_path, "w") as f:
+    json.dump({
+        "cpu_seconds": round(usage.ru_utime + usage.ru_stime, 3),
+        # kilobytes everywhere but macOS
+        "peak_rss_bytes": usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024),
+        "read_bytes": int(io.get("rchar", usage.ru_inblock * 512)),
+        "write_bytes": int(io.get("wchar", usage.ru_oublock * 512)),
+    }, f)
+code = os.waitstatus_to_exitcode(status)
+sys.exit(128 - code if code < 0 else code)
+"""
+
+# Resource usage of the commands run by the current stage's task
+stage_usage: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar("stage_usage", default=None)
+
 class StageResult:
-    def __init__(self, name: str, success: bool, duration: float, message: str = ""):
+    def __init__(self, name: str, success: bool, duration: float, message: str = "", skipped: bool = False):
         self.name = name
         self.success = success
         self.duration = duration
         self.message = message
+        self.skipped = skipped
 
 def check_environment() -> bool:
     """Check that we're in the right environment"""
@@ -55,54 +138,175 @@ def check_environment() -> bool:
     
     return True
 
-def run_binary_command(cmd: List[str], stage_name: str, timeout: int = 600) -> StageResult:
-    """Run a binary command and return result"""
+# Progress lines from the binaries: counts such as "[12/340]" or "Processing 12/340 ...",
+# and per-URL timings such as "GET https://support.apple.com/... 200 (412ms)"
+PROGRESS_COUNT_PATTERN = re.compile(r'(?<![\d.])(\d+)\s*/\s*(\d+)(?![\d.])')
+URL_TIMING_PATTERN = re.compile(
+    r'(https?://\S+?)[,;)]?\s.*?(\d+(?:\.\d+)?)\s*(ms|s)\b', re.IGNORECASE
+)
+
+def parse_progress_line(line: str) -> Optional[Tuple[str, Any, Any]]:
+    """("timing", url, seconds) or ("count", done, total) for a progress line, else None"""
+    timing_match = URL_TIMING_PATTERN.search(line)
+    if timing_match:
+        url, value, unit = timing_match.groups()
+        seconds = float(value) / 1000 if unit.lower() == "ms" else float(value)
+        return "timing", url, seconds
+    count_match = PROGRESS_COUNT_PATTERN.search(line)
+    if count_match:
+        done, total = int(count_match.group(1)), int(count_match.group(2))
+        if 0 < total and done <= total:
+            return "count", done, total
+    return None
+
+class StageMonitor:
+    """Live progress of running commands, fed from their parsed output lines"""
+    def __init__(self):
+        self.progress = Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            MofNCompleteColumn(),
+            TimeElapsedColumn(),
+            console=console,
+            transient=True,
+        )
+        self.url_timings: Dict[str, List[Tuple[float, str]]] = {}
+        self.counted: set = set()
+
+    def start(self, stage_name: str) -> int:
+        return self.progress.add_task(stage_name, total=None)
+
+    def update(self, task_id: int, stage_name: str, line: str) -> bool:
+        """Update the stage's row from line; True if line was a progress line"""
+        parsed = parse_progress_line(line)
+        if parsed and parsed[0] == "count":
+            self.counted.add(task_id)
+            self.progress.update(task_id, completed=parsed[1], total=parsed[2],
+                                 description=f"{stage_name}: {line[:60]}")
+            return True
+        if parsed and parsed[0] == "timing":
+            self.url_timings.setdefault(stage_name, []).append((parsed[2], parsed[1]))
+            # Without count lines, each request is a step
+            if task_id not in self.counted:
+                self.progress.advance(task_id)
+            return True
+        self.progress.update(task_id, description=f"{stage_name}: {line[:60]}")
+        return False
+
+    def finish(self, task_id: int) -> None:
+        self.counted.discard(task_id)
+        self.progress.remove_task(task_id)
+
+    def print_slowest_urls(self, limit: int = 10) -> None:
+        for stage_name, timings in self.url_timings.items():
+            table = Table(title=f"Slowest requests ({stage_name}, {len(timings)} total, "
+                                f"{sum(t for t, _ in timings):.1f}s)")
+            table.add_column("Time", style="yellow", justify="right")
+            table.add_column("URL", style="cyan")
+            for seconds, url in sorted(timings, reverse=True)[:limit]:
+                table.add_row(f"{seconds:.2f}s", url)
+            console.print(table)
+
+stage_monitor = StageMonitor()
+
+async def run_binary_command(cmd: List[str], stage_name: str, timeout: int = 600) -> StageResult:
+    """Run a binary command, streaming its output line by line, and return result"""
     start_time = datetime.now()
+    stderr_tail: deque = deque(maxlen=10)
+    log_path = Path("logs") / f"{stage_name}.log"
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    task_id = stage_monitor.start(stage_name)
+    usage_fd, usage_file = tempfile.mkstemp(prefix=f"sofa-{stage_name}-", suffix=".json")
+    os.close(usage_fd)
+    process = None
+    
+    def show(raw_line: bytes, is_stderr: bool, log_file) -> None:
+        line = raw_line.decode("utf-8", errors="replace").rstrip()
+        if not line:
+            return
+        log_file.write(f"{'[stderr] ' if is_stderr else ''}{line}\n")
+        if len(line) > DISPLAY_LINE_CHARS:
+            line = f"{line[:DISPLAY_LINE_CHARS]}… ({len(line) - DISPLAY_LINE_CHARS:,} more characters in {log_path})"
+        if is_stderr:
+            stderr_tail.append(line)
+            console.print(f"[dim]{stage_name} │[/dim] [red]{escape(line)}[/red]")
+        elif not stage_monitor.update(task_id, stage_name, line):
+            console.print(f"[dim]{stage_name} │ {escape(line)}[/dim]")
+    
+    async def stream(reader: asyncio.StreamReader, is_stderr: bool, log_file) -> None:
+        # Split chunks into lines here rather than with readline, which fails
+        # on a line longer than its limit; such a line is logged in pieces
+        pending = b""
+        while chunk := await reader.read(STREAM_CHUNK_BYTES):
+            *lines, pending = (pending + chunk).split(b"\n")
+            for raw_line in lines:
+                show(raw_line, is_stderr, log_file)
+            if len(pending) >= STREAM_CHUNK_BYTES:
+                show(pending, is_stderr, log_file)
+                pending = b""
+        show(pending, is_stderr, log_file)
     
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
-        duration = (datetime.now() - start_time).total_seconds()
-        
-        # Show command output for transparency (last 300 chars to keep it readable)
-        if result.stdout:
-            # Clean up and show relevant output only
-            clean_output = result.stdout.strip()
-            if len(clean_output) > 300:
-                clean_output = "..." + clean_output[-300:]
-            console.print(f"[dim]stdout: {clean_output}[/dim]")
-        if result.stderr:
-            console.print(f"[red]stderr: {result.stderr[-300:]}[/red]")
+        with open(log_path, "w", encoding="utf-8", buffering=1) as log_file:
+            log_file.write(f"$ {' '.join(cmd)}\n")
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, "-c", COMMAND_PROBE, usage_file, *cmd,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+            )
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(
+                        stream(process.stdout, False, log_file),
+                        stream(process.stderr, True, log_file),
+                        process.wait(),
+                    ),
+                    timeout,
+                )
+            except asyncio.TimeoutError:
+                process.terminate()
+                await process.wait()
+                duration = (datetime.now() - start_time).total_seconds()
+                log_file.write(f"Timed out after {timeout}s\n")
+                return StageResult(stage_name, False, duration, f"Timed out after {timeout}s")
+            log_file.write(f"Exit code {process.returncode}\n")
         
-        if result.returncode == 0:
+        duration = (datetime.now() - start_time).total_seconds()
+        if process.returncode == 0:
             return StageResult(stage_name, True, duration, "Completed successfully")
         else:
-            error_msg = f"Exit code {result.returncode}"
-            if result.stderr:
-                error_msg += f": {result.stderr[:300]}"
+            error_msg = f"Exit code {process.returncode}"
+            if stderr_tail:
+                error_msg += f": {chr(10).join(stderr_tail)[:300]}"
+            error_msg += f" (full output in {log_path})"
             return StageResult(stage_name, False, duration, error_msg)
             
-    except subprocess.TimeoutExpired:
-        duration = (datetime.now() - start_time).total_seconds()
-        return StageResult(stage_name, False, duration, f"Timed out after {timeout}s")
     except Exception as e:
         duration = (datetime.now() - start_time).total_seconds()
         return StageResult(stage_name, False, duration, str(e))
+    finally:
+        # Whatever ended the run early, stop the probe; it kills the command's process group
+        if process is not None and process.returncode is None:
+            process.terminate()
+            await process.wait()
+        stage_monitor.finish(task_id)
+        usages = stage_usage.get()
+        try:
+            with open(usage_file) as f:
+                usage = json.load(f)
+            if usages is not None:
+                usages.append(usage)
+        except (OSError, json.JSONDecodeError):
+            pass  # Probe was killed before writing its usage
+        os.unlink(usage_file)
 
-def run_gather() -> StageResult:
+async def run_gather() -> StageResult:
     """Run gather stage"""
     console.rule("Gather")
+    console.print("🔄 Gathering all data sources...")
     
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[progress.description]{task.description}"),
-        console=console,
-    ) as progress:
-        task = progress.add_task("Gathering all data sources...", total=1)
-        
-        cmd = ["./bin/sofa-gather", "all", "--continue-on-error"]
-        result = run_binary_command(cmd, "gather")
-        
-        progress.advance(task)
+    cmd = ["./bin/sofa-gather", "all", "--continue-on-error"]
+    result = await run_binary_command(cmd, "gather")
     
     # Display results table
     if result.success:
@@ -126,152 +330,572 @@ def run_gather() -> StageResult:
     
     return result
 
-def run_fetch() -> StageResult:
+async def run_fetch() -> StageResult:
     """Run fetch stage"""
     console.rule("Fetch")
+    console.print("🔄 Fetching Apple security pages...", style="bold green")
     
-    with console.status("[bold green]Fetching Apple security pages..."):
-        cmd = [
-            "./bin/sofa-fetch",
-            "--kev-file", "data/resources/kev_catalog.json",
-            "--preserve-html"
-        ]
+    cmd = [
+        "./bin/sofa-fetch",
+        "--kev-file", "data/resources/kev_catalog.json",
+        "--preserve-html"
+    ]
+    
+    result = await run_binary_command(cmd, "fetch")
+    
+    if result.success:
+        # Count releases
+        releases_file = Path("data/resources/apple_security_releases.json")
+        if releases_file.exists():
+            with open(releases_file) as f:
+                data = json.load(f)
+                release_count = len(data.get("releases", []))
+                console.print(f"✅ Fetched {release_count} releases", style="green")
+    
+    return result
+
+async def run_build() -> StageResult:
+    """Build all feeds with legacy mode in a single call"""
+    console.rule("[bold blue]Build All Feeds")
+    console.print("🔧 Building all feeds (v1 + v2) with legacy mode...")
+    
+    cmd = ["./bin/sofa-build", "all", "--legacy"]
+    console.print(f"🚀 Running: {' '.join(cmd)}")
+    result = await run_binary_command(cmd, "build_all", 600)
+    
+    if result.success:
+        console.print("✅ All feeds built successfully", style="green")
         
-        result = run_binary_command(cmd, "fetch")
+        # Show build results for both versions
+        table = Table(title="Build Results")
+        table.add_column("Version", style="cyan")
+        table.add_column("Product", style="blue")
+        table.add_column("Status", style="green")
         
-        if result.success:
-            # Count releases
-            releases_file = Path("data/resources/apple_security_releases.json")
-            if releases_file.exists():
-                with open(releases_file) as f:
-                    data = json.load(f)
-                    release_count = len(data.get("releases", []))
-                    console.print(f"✅ Fetched {release_count} releases", style="green")
+        for version in ["v1", "v2"]:
+            for product in ["safari", "ios", "macos", "tvos", "watchos", "visionos"]:
+                feed_file = Path(f"{version}/{product}_data_feed.json")
+                status = "✅" if feed_file.exists() else "❌"
+                table.add_row(version, product, status)
+        
+        console.print(table)
+        
+    else:
+        console.print(f"❌ Build failed: {result.message}", style="red")
     
     return result
 
 
-def run_bulletin() -> StageResult:
+async def run_bulletin() -> StageResult:
     """Generate bulletin data"""
     console.rule("[bold magenta]Bulletin Generation")
 
-    with console.status("[bold magenta]Generating bulletin data..."):
-        cmd = [
-            "./bin/sofa-build", "bulletin",
-            "-i", "data/resources",
-            "-b", "data/resources/bulletin_data.json"
-        ]
+    console.print("🔄 Generating bulletin data...", style="bold magenta")
+    cmd = [
+        "./bin/sofa-build", "bulletin",
+        "-i", "data/resources",
+        "-b", "data/resources/bulletin_data.json"
+    ]
 
-        result = run_binary_command(cmd, "bulletin", 60)
+    result = await run_binary_command(cmd, "bulletin", 60)
 
-        if result.success and Path("data/resources/bulletin_data.json").exists():
-            size = Path("data/resources/bulletin_data.json").stat().st_size
-            console.print(f"✅ Bulletin generated ({size:,} bytes)", style="green")
+    if result.success and Path("data/resources/bulletin_data.json").exists():
+        size = Path("data/resources/bulletin_data.json").stat().st_size
+        console.print(f"✅ Bulletin generated ({size:,} bytes)", style="green")
 
-            # Show summary if possible
-            try:
-                with open("data/resources/bulletin_data.json") as f:
-                    bulletin = json.load(f)
-
-                if "latest_releases" in bulletin:
-                    table = Table(title="Latest Releases")
-                    table.add_column("OS", style="cyan")
-                    table.add_column("Version", style="yellow")
-                    table.add_column("CVEs Fixed", style="green")
-                    table.add_column("Exploited", style="red")
-
-                    for os_name, info in bulletin["latest_releases"].items():
-                        version = info.get("version", "")
-                        if version:  # Only show if we have version data
-                            cves_fixed = len(info.get("cves_fixed", []))
-                            exploited = info.get("actively_exploited_count", 0)
-
-                            table.add_row(
-                                os_name.upper(),
-                                version,
-                                str(cves_fixed),
-                                str(exploited)
-                            )
-
-                    if table.rows:  # Only show table if we have data
-                        console.print(table)
-                    else:
-                        console.print("📋 No latest release data available yet", style="yellow")
-            except:
-                pass  # Skip table if bulletin format is different
+        # Show summary if possible
+        try:
+            with open("data/resources/bulletin_data.json") as f:
+                bulletin = json.load(f)
+
+            if "latest_releases" in bulletin:
+                table = Table(title="Latest Releases")
+                table.add_column("OS", style="cyan")
+                table.add_column("Version", style="yellow")
+                table.add_column("CVEs Fixed", style="green")
+                table.add_column("Exploited", style="red")
+
+                for os_name, info in bulletin["latest_releases"].items():
+                    version = info.get("version", "")
+                    if version:  # Only show if we have version data
+                        cves_fixed = len(info.get("cves_fixed", []))
+                        exploited = info.get("actively_exploited_count", 0)
+
+                        table.add_row(
+                            os_name.upper(),
+                            version,
+                            str(cves_fixed),
+                            str(exploited)
+                        )
+
+                if table.rows:  # Only show table if we have data
+                    console.print(table)
+                else:
+                    console.print("📋 No latest release data available yet", style="yellow")
+        except:
+            pass  # Skip table if bulletin format is different
 
     # Additional step: Generate bulletin from v2 feeds to ensure latest data
     if result.success and Path("v2").exists():
         console.print("🔄 Updating bulletin with v2 feeds data...", style="cyan")
-        with console.status("[bold cyan]Updating bulletin from v2 feeds..."):
-            v2_cmd = [
-                "./bin/sofa-build", "bulletin",
-                "--feeds-dir", "."
-            ]
+        v2_cmd = [
+            "./bin/sofa-build", "bulletin",
+            "--feeds-dir", "."
+        ]
 
-            v2_result = run_binary_command(v2_cmd, "bulletin-v2", 60)
+        v2_result = await run_binary_command(v2_cmd, "bulletin-v2", 60)
 
-            if v2_result.success:
-                console.print("✅ Bulletin updated with v2 feeds data", style="green")
-            else:
-                console.print("⚠️ Failed to update bulletin with v2 feeds, using original", style="yellow")
+        if v2_result.success:
+            console.print("✅ Bulletin updated with v2 feeds data", style="green")
+        else:
+            console.print("⚠️ Failed to update bulletin with v2 feeds, using original", style="yellow")
 
     return result
 
-def run_rss() -> StageResult:
+async def run_rss() -> StageResult:
     """Generate RSS feed"""
     console.rule("[bold purple]RSS Feed Generation")
     
-    with console.status("[bold purple]Generating RSS feed..."):
-        cmd = [
-            "./scripts/generate_rss.py",
-            "--output", "v1/rss_feed.xml",
-            "--data-dir", "data/resources", 
-            "--include-xprotect",
-            "--include-beta",
-            "--verbose"
-        ]
-        
-        result = run_binary_command(cmd, "rss", 60)
-        
-        # Check for RSS feed in v1/ directory
-        rss_file = Path("v1/rss_feed.xml")
-        
-        if result.success and rss_file.exists():
-            size = rss_file.stat().st_size
-            console.print(f"✅ RSS feed generated ({size:,} bytes) in v1/", style="green")
-    
+    console.print("🔄 Generating RSS feed...", style="bold purple")
+    cmd = [
+        "./scripts/generate_rss.py",
+        "--output", "v1/rss_feed.xml",
+        "--atom-output", "v1/rss_feed.atom",
+        "--json-output", "v1/rss_feed.json",
+        "--data-dir", "data/resources", 
+        "--include-xprotect",
+        "--include-beta",
+        "--incremental",
+        "--shard-dir", "v1/rss",
+        "--shard-by-major",
+        "--verbose"
+    ]
+
+    result = await run_binary_command(cmd, "rss", 60)
+
+    # Check for RSS feed in v1/ directory
+    rss_file = Path("v1/rss_feed.xml")
+
+    if result.success and rss_file.exists():
+        size = rss_file.stat().st_size
+        console.print(f"✅ RSS feed generated ({size:,} bytes) in v1/", style="green")
+        shard_count = len(list(Path("v1/rss").glob("*.xml")))
+        if shard_count:
+            console.print(f"✅ {shard_count} platform/major RSS feeds in v1/rss/", style="green")
+
     return result
 
-def run_transform_links() -> StageResult:
+async def run_transform_links() -> StageResult:
     """Transform essential_links.toml to JSON"""
     console.rule("[bold purple]Transform Essential Links")
     
-    with console.status("[bold purple]Transforming essential_links.toml to JSON..."):
-        cmd = ["./scripts/transform_essential_links.py"]
-        result = run_binary_command(cmd, "transform_links", 30)
-        
-        # Check for generated JSON file
-        json_file = Path("data/resources/essential_links.json")
-        
-        if result.success and json_file.exists():
-            size = json_file.stat().st_size
-            console.print(f"✅ Essential links JSON generated ({size:,} bytes)", style="green")
-            
-            # Show content summary
+    console.print("🔄 Transforming essential_links.toml to JSON...", style="bold purple")
+    cmd = ["./scripts/transform_essential_links.py"]
+    result = await run_binary_command(cmd, "transform_links", 30)
+
+    # Check for generated JSON file
+    json_file = Path("data/resources/essential_links.json")
+
+    if result.success and json_file.exists():
+        size = json_file.stat().st_size
+        console.print(f"✅ Essential links JSON generated ({size:,} bytes)", style="green")
+
+        # Show content summary
+        try:
+            import json
+            with open(json_file) as f:
+                data = json.load(f)
+            platforms = [k for k in data.keys() if not k.startswith("_")]
+            general_resources = len(data.get("_general_resources", []))
+            console.print(f"   📱 Platforms: {', '.join(platforms)}", style="cyan")
+            console.print(f"   🔗 General resources: {general_resources}", style="cyan")
+        except:
+            pass  # Skip summary if JSON parsing fails
+
+    return result
+
+
+def published_feeds() -> List[Path]:
+    """Every feed file the publish stage precompresses, in a stable order"""
+    feeds = set()
+    for pattern in PUBLISHED_FEEDS:
+        feeds.update(path for path in Path(".").glob(pattern) if path.is_file())
+    return sorted(feeds)
+
+def published_copy(path: Path) -> Path:
+    """Where the publish stage serves a feed from, next to its siblings"""
+    return PUBLISH_DIR / path
+
+def compressed_sibling(path: Path, suffix: str) -> Path:
+    """Where the publish stage writes the .gz or .br copy of a feed"""
+    copy = published_copy(path)
+    return copy.with_name(f"{copy.name}.{suffix}")
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+def compress_feed(path: Path, previous_hash: Optional[str]) -> Dict[str, Any]:
+    """Copy path into the serving tree with .gz and .br siblings at maximum compression unless its content is unchanged"""
+    data = path.read_bytes()
+    content_hash = hashlib.sha256(data).hexdigest()
+    copy = published_copy(path)
+    siblings = [compressed_sibling(path, "gz")]
+    if HAS_BROTLI:
+        siblings.append(compressed_sibling(path, "br"))
+
+    if content_hash == previous_hash and all(f.exists() for f in [copy, *siblings]):
+        return {"path": str(path), "hash": content_hash, "compressed": False}
+
+    copy.parent.mkdir(parents=True, exist_ok=True)
+    _write_atomic(copy, data)
+    # mtime=0 keeps the gzip bytes identical for identical content
+    _write_atomic(siblings[0], gzip.compress(data, compresslevel=9, mtime=0))
+    if HAS_BROTLI:
+        _write_atomic(siblings[1], brotli.compress(data, quality=11))
+    return {"path": str(path), "hash": content_hash, "compressed": True}
+
+async def run_publish(max_workers: Optional[int] = None) -> StageResult:
+    """Precompress published feeds for gzip_static/brotli_static serving"""
+    console.rule("[bold cyan]Publish")
+    start_time = datetime.now()
+
+    previous_hashes: Dict[str, str] = {}
+    if PUBLISH_STATE_FILE.exists():
+        try:
+            with open(PUBLISH_STATE_FILE) as f:
+                previous_hashes = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            previous_hashes = {}
+
+    feeds = published_feeds()
+    try:
+        console.print(f"🔄 Compressing {len(feeds)} feeds...", style="bold cyan")
+
+        def compress_all() -> List[Dict[str, Any]]:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                return list(pool.map(
+                    lambda feed: compress_feed(feed, previous_hashes.get(str(feed))), feeds
+                ))
+
+        results = await asyncio.to_thread(compress_all)
+    except Exception as e:
+        duration = (datetime.now() - start_time).total_seconds()
+        return StageResult("publish", False, duration, str(e))
+
+    # Drop served files whose feed is gone, e.g. a removed RSS shard
+    served = {published_copy(feed) for feed in feeds}
+    served |= {compressed_sibling(feed, suffix) for feed in feeds for suffix in ("gz", "br")}
+    for path in PUBLISH_DIR.rglob("*"):
+        if path.is_file() and path not in served:
+            path.unlink()
+
+    PUBLISH_STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(PUBLISH_STATE_FILE, "w") as f:
+        json.dump({r["path"]: r["hash"] for r in results}, f, indent=2, sort_keys=True)
+
+    compressed = sum(1 for r in results if r["compressed"])
+    formats = ".gz/.br" if HAS_BROTLI else ".gz (brotli not installed)"
+    console.print(f"✅ {compressed} feeds recompressed, {len(results) - compressed} unchanged ({formats})", style="green")
+    duration = (datetime.now() - start_time).total_seconds()
+    return StageResult("publish", True, duration, f"{compressed} of {len(results)} feeds recompressed")
+
+def compression_note(path: Path) -> str:
+    """Size of the precompressed siblings relative to path, e.g. ", gz 11.2%, br 8.9%" """
+    size = path.stat().st_size
+    if not size:
+        return ""
+    note = ""
+    for suffix in ("gz", "br"):
+        sibling = compressed_sibling(path, suffix)
+        if sibling.exists():
+            note += f", {suffix} {sibling.stat().st_size / size:.1%}"
+    return note
+
+class Stage:
+    """A pipeline stage and the files it reads and writes"""
+    def __init__(self, name: str, run: Callable[[], Awaitable[StageResult]],
+                 inputs: List[str], outputs: List[str], tools: List[str], remote: bool = False):
+        self.name = name
+        self.run = run
+        self.inputs = inputs
+        self.outputs = outputs
+        self.tools = tools
+        self.remote = remote
+
+    def reads_from(self, other: "Stage") -> bool:
+        return any(
+            fnmatch(path, pattern) or fnmatch(pattern, path)
+            for path in self.inputs for pattern in other.outputs
+        )
+
+GATHER_OUTPUTS = [
+    "data/resources/kev_catalog.json",
+    "data/resources/gdmf_cached.json",
+    "data/resources/ipsw.json",
+    "data/resources/apple_beta_feed.json",
+    "data/resources/uma_catalog.json",
+    "data/resources/xprotect.json",
+]
+FEED_OUTPUTS = ["v1/*_data_feed.json", "v2/*_data_feed.json"]
+
+# Declaration order is the order stages run in when run one after another
+PIPELINE = [
+    Stage("gather", run_gather, ["config/gather.toml"], GATHER_OUTPUTS,
+          ["bin/sofa-gather"], remote=True),
+    Stage("fetch", run_fetch,
+          ["data/resources/kev_catalog.json", "config/fetch.toml"],
+          ["data/resources/apple_security_releases.json"],
+          ["bin/sofa-fetch"], remote=True),
+    Stage("build", run_build,
+          GATHER_OUTPUTS + ["data/resources/apple_security_releases.json",
+                            "config/build.toml", "config/model_overrides.json"],
+          FEED_OUTPUTS,
+          ["bin/sofa-build"]),
+    Stage("bulletin", run_bulletin,
+          ["data/resources/apple_security_releases.json", "data/resources/kev_catalog.json",
+           "data/resources/gdmf_cached.json", "v2/*_data_feed.json"],
+          ["data/resources/bulletin_data.json"],
+          ["bin/sofa-build"]),
+    Stage("rss", run_rss,
+          ["data/resources/bulletin_data.json", "data/resources/apple_security_releases.json",
+           "data/resources/kev_catalog.json", "data/resources/xprotect.json",
+           "data/resources/apple_beta_feed.json", "v2/*_data_feed.json",
+           "config/os_priority.toml", "web/*/*.md"],
+          ["v1/rss_feed.xml", "v1/rss_feed.atom", "v1/rss_feed.json", "v1/rss/*"],
+          ["scripts/generate_rss.py", "scripts/feed_dates.py"]),
+    Stage("transform_links", run_transform_links,
+          ["config/essential_links.toml"],
+          ["data/resources/essential_links.json"],
+          ["scripts/transform_essential_links.py"]),
+    Stage("publish", run_publish, PUBLISHED_FEEDS,
+          [f"{PUBLISH_DIR}/{pattern}{suffix}" for pattern in PUBLISHED_FEEDS for suffix in ("", ".gz", ".br")],
+          ["scripts/sofa_pipeline.py"]),
+]
+STAGES = {stage.name: stage for stage in PIPELINE}
+
+def expand_paths(patterns: List[str]) -> List[Path]:
+    """Files matching patterns; plain paths are kept even when missing"""
+    paths = set()
+    for pattern in patterns:
+        if any(char in pattern for char in "*?["):
+            paths.update(path for path in Path(".").glob(pattern) if path.is_file())
+        else:
+            paths.add(Path(pattern))
+    return sorted(paths)
+
+class PipelineState:
+    """Stage fingerprints from data/cache/pipeline_state.json"""
+    def __init__(self, path: Path = PIPELINE_STATE_FILE):
+        self.path = path
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        if path.exists():
             try:
-                import json
-                with open(json_file) as f:
+                with open(path) as f:
                     data = json.load(f)
-                platforms = [k for k in data.keys() if not k.startswith("_")]
-                general_resources = len(data.get("_general_resources", []))
-                console.print(f"   📱 Platforms: {', '.join(platforms)}", style="cyan")
-                console.print(f"   🔗 General resources: {general_resources}", style="cyan")
-            except:
-                pass  # Skip summary if JSON parsing fails
-    
-    return result
+                self.files = data.get("files", {})
+                self.stages = data.get("stages", {})
+            except (OSError, json.JSONDecodeError):
+                pass
+
+    def file_hash(self, path: Path) -> str:
+        try:
+            stat = path.stat()
+        except OSError:
+            return "missing"
+        cached = self.files.get(str(path))
+        if cached and cached["mtime_ns"] == stat.st_mtime_ns and cached["size"] == stat.st_size:
+            return cached["sha256"]
+
+        hasher = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                hasher.update(block)
+        digest = hasher.hexdigest()
+        self.files[str(path)] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": digest}
+        return digest
+
+    def fingerprint(self, stage: Stage) -> Dict[str, str]:
+        return {str(path): self.file_hash(path) for path in expand_paths(stage.inputs + stage.tools)}
+
+    def is_current(self, stage: Stage, fingerprint: Dict[str, str]) -> bool:
+        """Whether stage last succeeded with these exact inputs and the files it wrote still exist"""
+        last = self.stages.get(stage.name, {})
+        if stage.remote or last.get("fingerprint") != fingerprint:
+            return False
+        return all(Path(path).exists() for path in last.get("outputs", []))
+
+    def record(self, stage: Stage, fingerprint: Dict[str, str]) -> None:
+        self.stages[stage.name] = {
+            "fingerprint": fingerprint,
+            "outputs": [str(path) for path in expand_paths(stage.outputs) if path.exists()],
+            "completed": datetime.now().isoformat(),
+        }
+        self.save()
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        _write_atomic(self.path, json.dumps({"files": self.files, "stages": self.stages}, indent=2).encode())
+
+class StageTiming:
+    def __init__(self, stage: Stage, depends_on: List[str]):
+        self.stage = stage
+        self.depends_on = depends_on
+        self.start = 0.0
+        self.end = 0.0
+        self.result: Optional[StageResult] = None
+        self.usage: List[Dict[str, Any]] = []
+
+def stage_dependencies(selected: List[Stage]) -> Dict[str, List[str]]:
+    """Earlier selected stages each stage reads outputs from"""
+    order = sorted(selected, key=PIPELINE.index)
+    return {
+        stage.name: [other.name for other in order[:i] if stage.reads_from(other)]
+        for i, stage in enumerate(order)
+    }
+
+async def run_stages(selected: List[Stage], state: PipelineState,
+                     force: Optional[List[str]] = None) -> Dict[str, StageTiming]:
+    """Run stages as soon as the stages they depend on have finished"""
+    force = force or []
+    dependencies = stage_dependencies(selected)
+    timings = {name: StageTiming(STAGES[name], deps) for name, deps in dependencies.items()}
+    tasks: Dict[str, asyncio.Task] = {}
+    clock_start = time.monotonic()
+
+    async def run_one(timing: StageTiming) -> None:
+        await asyncio.gather(*(tasks[name] for name in timing.depends_on))
+        timing.start = time.monotonic() - clock_start
+        stage = timing.stage
+        fingerprint = state.fingerprint(stage)
+        if stage.name not in force and "all" not in force and state.is_current(stage, fingerprint):
+            console.print(f"⏭️  {stage.name}: inputs unchanged since last success, skipping", style="dim")
+            timing.result = StageResult(stage.name, True, 0.0, "Inputs unchanged", skipped=True)
+        else:
+            # Each stage runs in its own task, so this list is the stage's own
+            stage_usage.set(timing.usage)
+            try:
+                timing.result = await stage.run()
+            except Exception as e:
+                timing.result = StageResult(stage.name, False, 0.0, str(e))
+            if timing.result.success:
+                state.record(stage, fingerprint)
+        timing.end = time.monotonic() - clock_start
+
+    # Dependencies always precede their dependents, so their tasks exist first
+    for name, timing in timings.items():
+        tasks[name] = asyncio.create_task(run_one(timing))
+    await asyncio.gather(*tasks.values())
+    return timings
 
+def print_critical_path(timings: Dict[str, StageTiming], wall_time: float) -> None:
+    """Show the chain of stages that determined the pipeline's wall time"""
+    path = []
+    current = max(timings.values(), key=lambda t: t.end)
+    while current:
+        path.append(current)
+        upstream = [timings[name] for name in current.depends_on]
+        current = max(upstream, key=lambda t: t.end) if upstream else None
+    path.reverse()
+
+    table = Table(title="Critical Path")
+    table.add_column("Stage", style="cyan")
+    table.add_column("Waited for", style="dim")
+    table.add_column("Start", style="yellow", justify="right")
+    table.add_column("End", style="yellow", justify="right")
+    table.add_column("Duration", style="yellow", justify="right")
+    for timing in path:
+        table.add_row(
+            timing.stage.name,
+            ", ".join(timing.depends_on) or "-",
+            f"{timing.start:.1f}s",
+            f"{timing.end:.1f}s",
+            f"{timing.end - timing.start:.1f}s",
+        )
+    console.print(table)
+
+    stage_total = sum(t.end - t.start for t in timings.values())
+    console.print(
+        f"⏱️  Wall time {wall_time:.1f}s, critical path {sum(t.end - t.start for t in path):.1f}s, "
+        f"stage time {stage_total:.1f}s", style="cyan"
+    )
+
+def stage_record(timing: StageTiming, state: PipelineState) -> Dict[str, Any]:
+    """Telemetry for one stage: wall and CPU time, child peak RSS, I/O and outputs"""
+    result = timing.result
+    record: Dict[str, Any] = {
+        "name": timing.stage.name,
+        "status": "skipped" if result.skipped else "success" if result.success else "failed",
+        "start_seconds": round(timing.start, 3),
+        "wall_seconds": round(timing.end - timing.start, 3),
+    }
+    if timing.usage:
+        record.update({
+            "commands": len(timing.usage),
+            "cpu_seconds": round(sum(u["cpu_seconds"] for u in timing.usage), 3),
+            "peak_rss_bytes": max(u["peak_rss_bytes"] for u in timing.usage),
+            "read_bytes": sum(u["read_bytes"] for u in timing.usage),
+            "write_bytes": sum(u["write_bytes"] for u in timing.usage),
+        })
+    if result.success and not result.skipped:
+        record["outputs"] = {
+            str(path): {"size": path.stat().st_size, "sha256": state.file_hash(path)}
+            for path in expand_paths(timing.stage.outputs) if path.exists()
+        }
+    return record
+
+def append_run_record(stage: str, timings: Dict[str, StageTiming], wall_time: float,
+                      state: PipelineState, path: Path = PIPELINE_RUNS_FILE) -> None:
+    """Append this run's telemetry as one line of path"""
+    record: Dict[str, Any] = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+        "stage": stage,
+        "wall_seconds": round(wall_time, 3),
+    }
+    # Set on GitHub Actions
+    for key, env in (("commit", "GITHUB_SHA"), ("run_id", "GITHUB_RUN_ID")):
+        if os.environ.get(env):
+            record[key] = os.environ[env]
+    record["stages"] = [stage_record(timing, state) for timing in timings.values()]
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+def percentile(values: List[float], q: float) -> float:
+    """Linearly interpolated q-th percentile (0-100) of values"""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+def report_label(report: ValidationReport, extra: str = "") -> str:
+    """Tree line for a validated file, e.g. "✅ kev_catalog.json (1,234 bytes, 1,300 KEV entries, 4 ms)" """
+    check = report.check
+    if not report.exists:
+        return f"❌ {check.path.name}"
+    details = [f"{report.size:,} bytes"]
+    if report.error:
+        return f"❌ {check.path.name} ({details[0]}, invalid JSON: {escape(report.error)})"
+    if report.count is not None and check.description:
+        details.append(f"{report.count:,} {check.description}")
+    if report.violation_count:
+        details.append(f"{report.violation_count:,} schema violations")
+    elif check.schema_path:
+        details.append("schema ok")
+    details.append(f"{report.parse_seconds * 1000:.0f} ms")
+    icon = "⚠️" if report.violation_count else "✅"
+    return f"{icon} {check.path.name} ({', '.join(details)}{extra})"
+
+def add_report(parent: Tree, report: ValidationReport, extra: str = "") -> None:
+    node = parent.add(report_label(report, extra))
+    for violation in report.violations[:5]:
+        node.add(f"[red]{escape(violation)}[/red]")
+    if report.violation_count > 5:
+        node.add(f"[dim]... {report.violation_count - 5:,} more[/dim]")
 
 def verify_results() -> None:
     """Display comprehensive results verification"""
@@ -281,79 +905,74 @@ def verify_results() -> None:
     data_tree = tree.add("📂 data/")
     resources_tree = data_tree.add("📂 resources/")
     
-    # Check gathered files with validation
-    gather_files = [
-        ("kev_catalog.json", "KEV entries", ".vulnerabilities | length"),
-        ("gdmf_cached.json", "GDMF entries", ".PublicAssetSets // {} | keys | length"),
-        ("ipsw.json", "IPSW devices", "keys | length"), 
-        ("apple_beta_feed.json", "Beta releases", ".items | length"),
-        ("uma_catalog.json", "UMA entries", "keys | length"),
-        ("xprotect.json", "XProtect data", "keys | length")
+    # Gathered files and how to count their entries
+    resources = Path("data/resources")
+    resource_checks = [
+        FileCheck(resources / "kev_catalog.json", "KEV entries", lambda d: len(d["vulnerabilities"])),
+        FileCheck(resources / "gdmf_cached.json", "GDMF entries", lambda d: len(d.get("PublicAssetSets") or {})),
+        FileCheck(resources / "ipsw.json", "IPSW devices", len),
+        FileCheck(resources / "apple_beta_feed.json", "Beta releases", lambda d: len(d["items"])),
+        FileCheck(resources / "uma_catalog.json", "UMA entries", len),
+        FileCheck(resources / "xprotect.json", "XProtect data", len),
+        FileCheck(resources / "apple_security_releases.json", "releases", lambda d: len(d["releases"])),
     ]
+    resource_checks += [FileCheck(path, "records") for path in sorted(resources.glob("*.ndjson"))]
     
-    for file_name, description, jq_query in gather_files:
-        path = Path("data/resources") / file_name
-        if path.exists():
-            size = path.stat().st_size
-            
-            # Try jq validation
-            try:
-                result = subprocess.run(
-                    ["jq", "-r", jq_query, str(path)],
-                    capture_output=True, text=True, timeout=10
-                )
-                if result.returncode == 0 and result.stdout.strip().isdigit():
-                    count = int(result.stdout.strip())
-                    resources_tree.add(f"✅ {file_name} ({size:,} bytes, {count:,} {description})")
-                else:
-                    resources_tree.add(f"✅ {file_name} ({size:,} bytes)")
-            except:
-                resources_tree.add(f"✅ {file_name} ({size:,} bytes)")
-        else:
-            resources_tree.add(f"❌ {file_name}")
+    # v1/ and v2/ feeds in root (not data/feeds), plus the other published
+    # JSON feeds, e.g. v2/dms_consumers.json
+    published = published_feeds()
+    feed_checks: Dict[str, List[FileCheck]] = {}
+    for version in ["v1", "v2"]:
+        feed_files = [Path(f"{version}/{product}_data_feed.json")
+                      for product in ["safari", "ios", "macos", "tvos", "watchos", "visionos"]]
+        feed_files += [
+            path for path in published
+            if path.parent == Path(version) and path.suffix == ".json"
+            and not path.name.endswith("_data_feed.json")
+        ]
+        feed_checks[version] = [FileCheck(path, schema_path=schema_for(path)) for path in feed_files]
     
-    # Check fetch results
-    fetch_file = Path("data/resources/apple_security_releases.json")
-    if fetch_file.exists():
-        size = fetch_file.stat().st_size
-        resources_tree.add(f"✅ apple_security_releases.json ({size:,} bytes)")
-    else:
-        resources_tree.add("❌ apple_security_releases.json")
+    checks = resource_checks + feed_checks["v1"] + feed_checks["v2"]
+    reports = dict(zip((check.path for check in checks), validate_files(checks), strict=True))
     
-    # Check v1/ and v2/ directories in root (not data/feeds)
-    v1_tree = tree.add("📂 v1/")
-    v2_tree = tree.add("📂 v2/")
+    for check in resource_checks:
+        add_report(resources_tree, reports[check.path])
     
-    for version, version_tree in [("v1", v1_tree), ("v2", v2_tree)]:
-        for product in ["safari", "ios", "macos", "tvos", "watchos", "visionos"]:
-            feed_file = Path(f"{version}/{product}_data_feed.json")
-            
-            if feed_file.exists():
-                size = feed_file.stat().st_size
-                version_tree.add(f"✅ {product}_data_feed.json ({size:,} bytes)")
-            else:
-                version_tree.add(f"❌ {product}_data_feed.json")
+    for version in ["v1", "v2"]:
+        version_tree = tree.add(f"📂 {version}/")
+        for check in feed_checks[version]:
+            report = reports[check.path]
+            add_report(version_tree, report, compression_note(check.path) if report.exists else "")
         
         # Check for RSS feed in v1
         if version == "v1":
             rss_file = Path("v1/rss_feed.xml")
             if rss_file.exists():
                 size = rss_file.stat().st_size
-                version_tree.add(f"✅ rss_feed.xml ({size:,} bytes)")
+                version_tree.add(f"✅ rss_feed.xml ({size:,} bytes{compression_note(rss_file)})")
             else:
                 version_tree.add("❌ rss_feed.xml")
     
     console.print(tree)
+    
+    total_parse = sum(report.parse_seconds for report in reports.values())
+    violations = sum(report.violation_count for report in reports.values())
+    console.print(f"🔍 Validated {sum(r.exists for r in reports.values())} files in-process "
+                  f"({total_parse:.2f}s parsing, {violations:,} schema violations)",
+                  style="yellow" if violations else "cyan")
 
 @app.command()
 def run(
-    stage: str = typer.Argument("all", help="Stage to run: gather, fetch, build, rss, transform_links, all")
+    stage: str = typer.Argument("all", help="Stage to run: gather, fetch, build, rss, transform_links, publish, all"),
+    force: Annotated[Optional[List[str]], typer.Option(
+        "--force", "-f", help="Run this stage even if its inputs are unchanged (repeatable, or 'all')"
+    )] = None,
 ):
     """Run SOFA pipeline with beautiful UX and simple implementation"""
     
     console.print(Panel.fit(
         "[bold blue]SOFA Pipeline Clean[/bold blue]\n"
-        "[dim]gather → fetch → build → rss[/dim]",
+        "[dim]gather → fetch → build → rss → publish (transform_links alongside)[/dim]",
         border_style="blue"
     ))
     
@@ -388,64 +1007,31 @@ def run(
     console.print("✅ Configuration ready", style="green")
     
     # Run stages
-    results = []
-    
     if stage == "all":
-        stages = ["gather", "fetch", "build", "rss", "transform_links"]
+        stages = ["gather", "fetch", "build", "rss", "transform_links", "publish"]
     else:
         stages = [stage]
     
     for stage_name in stages:
-        if stage_name == "gather":
-            result = run_gather()
-        elif stage_name == "fetch":
-            result = run_fetch()
-        elif stage_name == "build":
-            # Here we build all feeds with legacy mode in single call
-            console.rule("[bold blue]Build All Feeds")
-            console.print("🔧 Building all feeds (v1 + v2) with legacy mode...")
-            
-            cmd = ["./bin/sofa-build", "all", "--legacy"]
-            console.print(f"🚀 Running: {' '.join(cmd)}")
-            result = run_binary_command(cmd, "build_all", 600)
-            
-            if result.success:
-                console.print("✅ All feeds built successfully", style="green")
-                
-                # Show build results for both versions
-                table = Table(title="Build Results")
-                table.add_column("Version", style="cyan")
-                table.add_column("Product", style="blue")
-                table.add_column("Status", style="green")
-                
-                for version in ["v1", "v2"]:
-                    for product in ["safari", "ios", "macos", "tvos", "watchos", "visionos"]:
-                        feed_file = Path(f"{version}/{product}_data_feed.json")
-                        status = "✅" if feed_file.exists() else "❌"
-                        table.add_row(version, product, status)
-                
-                console.print(table)
-                
-            else:
-                console.print(f"❌ Build failed: {result.message}", style="red")
-                
-            results.append(result)
-            continue
-        elif stage_name == "bulletin":
-            result = run_bulletin()
-        elif stage_name == "rss":
-            result = run_rss()
-        elif stage_name == "transform_links":
-            result = run_transform_links()
-        else:
+        if stage_name not in STAGES:
             console.print(f"❌ Unknown stage: {stage_name}", style="red")
-            continue
-            
-        results.append(result)
-        
-        if not result.success and stage != "all":
-            console.print(f"❌ Stage {stage_name} failed, stopping", style="red")
-            sys.exit(1)
+    selected = [STAGES[name] for name in stages if name in STAGES]
+    for name in force or []:
+        if name not in STAGES and name != "all":
+            console.print(f"⚠️ --force: unknown stage {name}", style="yellow")
+    
+    state = PipelineState()
+    started = time.monotonic()
+    with stage_monitor.progress:
+        timings = asyncio.run(run_stages(selected, state, force))
+    wall_time = time.monotonic() - started
+    if timings:
+        append_run_record(stage, timings, wall_time, state)
+    results = [timing.result for timing in timings.values()]
+    
+    if stage != "all" and any(not r.success for r in results):
+        console.print(f"❌ Stage {stage} failed, stopping", style="red")
+        sys.exit(1)
     
     # Verify results
     verify_results()
@@ -453,7 +1039,6 @@ def run(
     # Summary
     console.rule("[bold green]Summary")
     
-    total_duration = sum(r.duration for r in results)
     success_count = sum(1 for r in results if r.success)
     
     summary_table = Table(title="Execution Summary")
@@ -462,11 +1047,15 @@ def run(
     summary_table.add_column("Duration", style="yellow")
     
     for result in results:
-        status = "✅ Success" if result.success else "❌ Failed"
+        status = "⏭️  Skipped" if result.skipped else "✅ Success" if result.success else "❌ Failed"
         summary_table.add_row(result.name, status, f"{result.duration:.1f}s")
     
     console.print(summary_table)
     
+    if len(timings) > 1:
+        print_critical_path(timings, wall_time)
+    stage_monitor.print_slowest_urls()
+    
     # Show errors for failed stages
     failed_results = [r for r in results if not r.success]
     if failed_results:
@@ -477,9 +1066,76 @@ def run(
     
     # Final status
     if success_count == len(results):
-        console.print(f"\n✅ [bold green]Pipeline completed successfully in {total_duration:.1f}s[/bold green]")
+        console.print(f"\n✅ [bold green]Pipeline completed successfully in {wall_time:.1f}s[/bold green]")
     else:
-        console.print(f"\n⚠️ [bold yellow]Pipeline completed with {len(results) - success_count} failures in {total_duration:.1f}s[/bold yellow]")
+        console.print(f"\n⚠️ [bold yellow]Pipeline completed with {len(results) - success_count} failures in {wall_time:.1f}s[/bold yellow]")
+
+@app.command()
+def report(
+    last: int = typer.Option(30, "--last", "-n", help="Number of most recent runs to include"),
+    recent: int = typer.Option(5, "--recent", help="Latest runs compared against the window's p50"),
+    runs_path: str = typer.Option(str(PIPELINE_RUNS_FILE), "--file", help="Telemetry NDJSON file"),
+):
+    """Show p50/p95 stage timings from recorded pipeline runs"""
+    runs_file = Path(runs_path)
+    if not runs_file.exists():
+        console.print(f"❌ No telemetry in {runs_file}", style="red")
+        raise typer.Exit(1)
+    
+    runs: deque = deque(maxlen=last)
+    with open(runs_file, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                runs.append(json.loads(line))
+    if not runs:
+        console.print(f"❌ No telemetry in {runs_file}", style="red")
+        raise typer.Exit(1)
+    
+    # Skipped stages did no work, so they are left out of the trends
+    samples: Dict[str, List[Dict[str, Any]]] = {}
+    for run_record in runs:
+        for stage_record in run_record["stages"]:
+            if stage_record["status"] != "skipped":
+                samples.setdefault(stage_record["name"], []).append(stage_record)
+    
+    def mb(value: float) -> str:
+        return f"{value / (1024 * 1024):.0f} MB"
+    
+    table = Table(title=f"Stage trends over the last {len(runs)} runs "
+                        f"({runs[0]['timestamp'][:10]} to {runs[-1]['timestamp'][:10]})")
+    table.add_column("Stage", style="cyan")
+    table.add_column("Runs", justify="right")
+    table.add_column("Fail", justify="right", style="red")
+    table.add_column("Wall p50", justify="right", style="yellow")
+    table.add_column("Wall p95", justify="right", style="yellow")
+    table.add_column(f"Last {recent} p50", justify="right")
+    table.add_column("CPU p50", justify="right")
+    table.add_column("Peak RSS p95", justify="right")
+    table.add_column("Written p50", justify="right")
+    
+    for name in [stage.name for stage in PIPELINE if stage.name in samples]:
+        records = samples[name]
+        walls = [r["wall_seconds"] for r in records]
+        wall_p50 = percentile(walls, 50)
+        recent_p50 = percentile(walls[-recent:], 50)
+        change = (recent_p50 / wall_p50 - 1) * 100 if wall_p50 else 0.0
+        style = "red" if change > 25 else "green" if change < -25 else "dim"
+        measured = [r for r in records if "cpu_seconds" in r]
+        table.add_row(
+            name,
+            str(len(records)),
+            str(sum(1 for r in records if r["status"] == "failed")),
+            f"{wall_p50:.1f}s",
+            f"{percentile(walls, 95):.1f}s",
+            f"{recent_p50:.1f}s [{style}]({change:+.0f}%)[/{style}]",
+            f"{percentile([r['cpu_seconds'] for r in measured], 50):.1f}s" if measured else "-",
+            mb(percentile([r["peak_rss_bytes"] for r in measured], 95)) if measured else "-",
+            mb(percentile([r["write_bytes"] for r in measured], 50)) if measured else "-",
+        )
+    
+    console.print(table)
+    walls = [r["wall_seconds"] for r in runs]
+    console.print(f"⏱️  Pipeline wall time p50 {percentile(walls, 50):.1f}s, p95 {percentile(walls, 95):.1f}s", style="cyan")
 
 @app.command()
 def check():
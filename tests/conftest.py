@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The scripts are uv single-file scripts; their shared modules import as siblings
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
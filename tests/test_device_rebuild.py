@@ -0,0 +1,152 @@
+import json
+import os
+from pathlib import Path
+
+import device_manager
+import pytest
+from device_manager import rebuild_database
+
+# Source mtime well before any rebuild state the tests write
+OLD_MTIME_NS = 1_600_000_000 * 1_000_000_000
+
+SOURCES = {
+    "macos": {
+        "Mac16,1": {"marketingName": "MacBook Pro (14-inch, M4)", "processorFamily": "M4", "support_status": "current"},
+        "Mac15,3": {"marketingName": "MacBook Pro (14-inch, M3)", "processorFamily": "M3", "support_status": "current"},
+    },
+    "ios": {
+        "iPhone17,1": {"marketingName": "iPhone 16 Pro", "processorFamily": "A18 Pro", "support_status": "current"},
+    },
+    "tvos": {},
+    "visionos": {
+        "RealityDevice14,1": {"marketingName": "Apple Vision Pro", "processorFamily": "M2", "support_status": "current"},
+    },
+}
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """Platform sources and unified outputs in tmp_path, written by a first rebuild"""
+    monkeypatch.setattr(device_manager, "SOURCES_DIR", tmp_path / "sources")
+    monkeypatch.setattr(device_manager, "OUTPUT_DIR", tmp_path / "resources")
+    monkeypatch.setattr(device_manager, "REBUILD_STATE_FILE", tmp_path / "cache" / "device_rebuild_state.json")
+    (tmp_path / "sources").mkdir()
+    (tmp_path / "resources").mkdir()
+    for platform, devices in SOURCES.items():
+        _write_source(tmp_path, platform, devices)
+        os.utime(_source(tmp_path, platform), ns=(OLD_MTIME_NS, OLD_MTIME_NS))
+    rebuild_database()
+    return tmp_path
+
+
+def _source(root: Path, platform: str) -> Path:
+    return root / "sources" / f"{platform}_devices.json"
+
+
+def _write_source(root: Path, platform: str, devices):
+    _source(root, platform).write_text(json.dumps({"metadata": {"device_count": len(devices)}, "devices": devices}, indent=2))
+
+
+def _outputs(root: Path):
+    """Both unified outputs with generated_at blanked"""
+    unified = (root / "resources" / "all_devices_enhanced.json").read_text()
+    ndjson = (root / "resources" / "all_devices_enhanced.ndjson").read_text()
+    generated_at = json.loads(unified)["_metadata"]["generated_at"]
+    assert json.loads(ndjson.split("\n", 1)[0])["generated_at"] == generated_at
+    return [unified.replace(generated_at, ""), ndjson.replace(generated_at, "")]
+
+
+def _full_rebuild_outputs(root: Path):
+    rebuild_database(full=True)
+    return _outputs(root)
+
+
+def test_full_rebuild_matches_unified_layout(workspace):
+    unified = json.loads((workspace / "resources" / "all_devices_enhanced.json").read_text())
+    all_devices = {device_id: info for devices in SOURCES.values() for device_id, info in devices.items()}
+
+    assert (workspace / "resources" / "all_devices_enhanced.json").read_text() == json.dumps(unified, indent=2)
+    assert list(unified) == ["_metadata", *all_devices]
+    assert unified["_metadata"]["total_devices"] == 4
+    assert unified["_metadata"]["platforms_loaded"] == 4
+    ndjson = (workspace / "resources" / "all_devices_enhanced.ndjson").read_text().splitlines()
+    assert [json.loads(line)["device_id"] for line in ndjson[1:]] == list(all_devices)
+
+
+def test_incremental_rebuild_reads_only_changed_sources(workspace, monkeypatch):
+    _write_source(workspace, "ios", {
+        "iPhone17,2": {"marketingName": "iPhone 16 Pro Max", "processorFamily": "A18 Pro", "support_status": "current"},
+        **SOURCES["ios"],
+    })
+    read = []
+    read_bytes = Path.read_bytes
+
+    def recording_read_bytes(path):
+        read.append(path.name)
+        return read_bytes(path)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(Path, "read_bytes", recording_read_bytes)
+        rebuild_database()
+
+    assert read == ["ios_devices.json"]
+    assert _outputs(workspace) == _full_rebuild_outputs(workspace)
+
+
+@pytest.mark.parametrize("edit", ["empty_first", "fill_empty", "drop_platform", "add_platform"])
+def test_incremental_rebuild_matches_full_rebuild(workspace, edit):
+    if edit == "empty_first":
+        _write_source(workspace, "macos", {})
+    elif edit == "fill_empty":
+        _write_source(workspace, "tvos", {"AppleTV14,1": {"marketingName": "Apple TV 4K", "support_status": "current"}})
+    elif edit == "drop_platform":
+        _source(workspace, "ios").unlink()
+    else:
+        _write_source(workspace, "appletv", {"AppleTV11,1": {"marketingName": "Apple TV 4K (2nd)", "support_status": "current"}})
+
+    rebuild_database()
+
+    assert _outputs(workspace) == _full_rebuild_outputs(workspace)
+
+
+def test_unchanged_sources_leave_outputs_alone(workspace):
+    outputs = [path.stat().st_mtime_ns for path in sorted((workspace / "resources").iterdir())]
+    rebuild_database()
+
+    assert [path.stat().st_mtime_ns for path in sorted((workspace / "resources").iterdir())] == outputs
+
+
+def test_edited_outputs_force_a_full_rebuild(workspace):
+    expected = _outputs(workspace)
+    ndjson = workspace / "resources" / "all_devices_enhanced.ndjson"
+    ndjson.write_text(ndjson.read_text().replace("iPhone 16 Pro", "iPhone 16 Plus"))
+
+    rebuild_database()
+
+    assert _outputs(workspace) == expected
+
+
+def test_device_ids_repeated_across_platforms_keep_full_rebuild_semantics(workspace):
+    _write_source(workspace, "visionos", {"Mac16,1": {"marketingName": "Duplicate", "support_status": "vintage"}})
+
+    rebuild_database()
+
+    unified = json.loads((workspace / "resources" / "all_devices_enhanced.json").read_text())
+    assert list(unified)[1] == "Mac16,1"
+    assert unified["Mac16,1"]["marketingName"] == "Duplicate"
+    assert not device_manager.REBUILD_STATE_FILE.exists()
+
+
+def test_source_rewritten_within_the_state_timestamp_is_reread(workspace):
+    # A source whose mtime is not older than the rebuild state may have been
+    # rewritten in the same tick, keeping its size and mtime
+    source = _source(workspace, "ios")
+    future_ns = device_manager.REBUILD_STATE_FILE.stat().st_mtime_ns + 3600 * 1_000_000_000
+    os.utime(source, ns=(future_ns, future_ns))
+    rebuild_database()
+    source.write_text(source.read_text().replace("iPhone 16 Pro", "iPhone 16 Max"))
+    os.utime(source, ns=(future_ns, future_ns))
+
+    rebuild_database()
+
+    assert "iPhone 16 Max" in (workspace / "resources" / "all_devices_enhanced.json").read_text()
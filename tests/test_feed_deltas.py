@@ -0,0 +1,35 @@
+import json
+
+import feed_deltas
+from feed_deltas import apply_json_patch, archive_feed, write_feed_deltas
+from hashed_json import write_hashed_json
+
+
+def test_deltas_follow_the_feed_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(feed_deltas, "HISTORY_ROOT", tmp_path / "history")
+    v1_feed = tmp_path / "v1" / "macos_data_feed.json"
+    v2_feed = tmp_path / "v2" / "macos_data_feed.json"
+    v1_feed.parent.mkdir()
+    v2_feed.parent.mkdir()
+
+    write_hashed_json({"OSVersions": ["15.7.1"]}, v1_feed)
+    write_hashed_json({"OSVersions": ["15.7.1"], "Models": {}}, v2_feed)
+    assert archive_feed(v1_feed) and archive_feed(v2_feed)
+
+    new_hash = write_hashed_json({"OSVersions": ["15.7.2"]}, v1_feed)
+    assert archive_feed(v1_feed)
+    written = write_feed_deltas(v1_feed, 5)
+
+    # v1 history and deltas stay apart from v2's feed of the same name
+    assert [path.parent for path in written] == [tmp_path / "v1" / "deltas"]
+    assert len(list((tmp_path / "history" / "v1").glob("*.json"))) == 2
+    assert len(list((tmp_path / "history" / "v2").glob("*.json"))) == 1
+    assert not (tmp_path / "v2" / "deltas").exists()
+
+    index = json.loads((tmp_path / "v1" / "deltas" / "macos_index.json").read_text())
+    assert index["UpdateHash"] == new_hash
+    (old_hash, delta_name), = index["deltas"].items()
+    history = sorted((tmp_path / "history" / "v1").glob("*.json"))
+    old_feed = json.loads(history[0].read_text())
+    patch = json.loads((tmp_path / "v1" / "deltas" / delta_name).read_text())
+    assert apply_json_patch(old_feed, patch) == json.loads(v1_feed.read_text())
@@ -0,0 +1,69 @@
+import hashlib
+import json
+
+from hashed_json import (
+    HASH_KEY,
+    compute_update_hash,
+    read_update_hash,
+    verify_update_hash,
+    write_hashed_json,
+)
+
+FEED = {
+    "OSVersions": [
+        {"OSVersion": "Tahoe 26", "Latest": {"ProductVersion": "26.1", "Build": "25B78"}},
+        {"OSVersion": "Sequoia 15", "Latest": {"ProductVersion": "15.7.2", "Build": "24G325"}},
+    ],
+    "XProtectPayloads": {"ProductVersion": "2.0", "ReleaseDate": "2025-01-27T18:00:00Z"},
+    "Note": "Unicode stays unescaped: é, 🍎",
+}
+
+
+def _body_bytes(written: bytes) -> bytes:
+    """The written file with the leading UpdateHash member removed"""
+    header_end = written.index(b'",', written.index(HASH_KEY.encode())) + 2
+    return written[:1] + written[header_end:]
+
+
+def test_update_hash_covers_written_bytes(tmp_path):
+    path = tmp_path / "macos_data_feed.json"
+    update_hash = write_hashed_json(FEED, path)
+
+    written = path.read_bytes()
+    assert hashlib.sha256(_body_bytes(written)).hexdigest() == update_hash
+    assert _body_bytes(written) == json.dumps(FEED, indent=4, ensure_ascii=False).encode("utf-8")
+
+
+def test_update_hash_recomputes_from_parsed_file(tmp_path):
+    path = tmp_path / "ios_data_feed.json"
+    update_hash = write_hashed_json(FEED, path)
+
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert list(data)[0] == HASH_KEY
+    assert data[HASH_KEY] == update_hash == compute_update_hash(FEED) == compute_update_hash(data)
+    assert read_update_hash(path) == update_hash
+    assert verify_update_hash(path)
+
+
+def test_edited_feed_fails_verification(tmp_path):
+    path = tmp_path / "macos_data_feed.json"
+    write_hashed_json(FEED, path)
+    path.write_text(path.read_text(encoding="utf-8").replace("25B78", "25B79"), encoding="utf-8")
+    assert not verify_update_hash(path)
+
+
+def test_unchanged_hash_leaves_file_untouched(tmp_path):
+    path = tmp_path / "macos_data_feed.json"
+    update_hash = write_hashed_json(FEED, path)
+    mtime = path.stat().st_mtime_ns
+
+    assert write_hashed_json(FEED, path, keep_if_hash=update_hash) == update_hash
+    assert path.stat().st_mtime_ns == mtime
+    assert not (tmp_path / "macos_data_feed.json.tmp").exists()
+
+
+def test_update_hash_follows_key_order():
+    reordered = dict(reversed(list(FEED.items())))
+
+    assert reordered == FEED
+    assert compute_update_hash(reordered) != compute_update_hash(FEED)
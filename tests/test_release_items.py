@@ -0,0 +1,22 @@
+from generate_rss import ReleaseItemIndex, feed_item_guid
+
+BULLETIN = "https://support.apple.com/en-us/HT212601"
+
+
+def test_ios_and_ipados_sharing_a_bulletin_both_survive():
+    index = ReleaseItemIndex()
+    ios = {"name": "iOS 14.7", "version": "14.7", "date": "2021-07-19", "url": BULLETIN, "type": "os"}
+    ipados = {"name": "iPadOS 14.7", "version": "14.7", "date": "2021-07-19", "url": BULLETIN, "type": "os"}
+
+    assert index.claim(ios) is not None
+    assert index.claim(ipados) is not None
+    assert [feed_item_guid(item.release) for item in index.items.values()] == ["iOS_OS_14.7", "iPadOS_OS_14.7"]
+
+
+def test_relisted_release_is_claimed_once():
+    index = ReleaseItemIndex()
+    release = {"name": "macOS Tahoe 26.1", "version": "26.1", "date": "2025-11-03", "url": BULLETIN, "type": "os"}
+
+    assert index.claim(release) is not None
+    assert index.claim(dict(release, url=BULLETIN + "/")) is None
+    assert len(index) == 1
@@ -0,0 +1,100 @@
+import json
+import re
+from pathlib import Path
+from xml.dom import minidom
+from xml.etree.ElementTree import Element, SubElement, tostring
+
+import generate_rss
+import pytest
+from generate_rss import RSSContext, build_channel_metadata, write_data_to_rss
+
+FIXTURES = Path(__file__).parent / "fixtures"
+SOFA_FQDN = "https://sofa.macadmins.io"
+LAST_BUILD_DATE = re.compile(rb"<lastBuildDate>[^<]*</lastBuildDate>")
+
+# The SOFA pages the original writer linked for the fixture releases, as v2
+# feed entries plus the web/ pages they resolve to
+SOFA_PAGES = {
+    "macos_data_feed.json": ("OSVersions", "OSVersion", "Sequoia 15", "macos/sequoia"),
+    "ios_data_feed.json": ("OSVersions", "OSVersion", "18", "ios/ios18"),
+    "safari_data_feed.json": ("AppVersions", "AppVersion", "Safari 18", "safari/safari18"),
+}
+
+
+@pytest.fixture
+def context(tmp_path, monkeypatch):
+    """An RSSContext over empty resources and a web tree with the fixture's SOFA pages"""
+    monkeypatch.setenv("SOFA_FQDN", SOFA_FQDN)
+    monkeypatch.setattr(generate_rss, "SOFA_FQDN", SOFA_FQDN)
+    for filename, (list_key, name_key, name, page) in SOFA_PAGES.items():
+        feed = tmp_path / "v2" / filename
+        feed.parent.mkdir(parents=True, exist_ok=True)
+        feed.write_text(json.dumps({list_key: [{name_key: name}]}))
+        page_file = tmp_path / "web" / f"{page}.md"
+        page_file.parent.mkdir(parents=True, exist_ok=True)
+        page_file.write_text("")
+    return RSSContext(str(tmp_path / "resources"), str(tmp_path / "v2"), str(tmp_path / "web"))
+
+
+def _fixture_releases():
+    return json.loads((FIXTURES / "rss_releases.json").read_text(encoding="utf-8"))
+
+
+def _fixed_build_date(feed: bytes) -> bytes:
+    return LAST_BUILD_DATE.sub(b"<lastBuildDate>Mon, 03 Nov 2025 18:00:00 +0000</lastBuildDate>", feed)
+
+
+def _minidom_feed(items) -> bytes:
+    """The feed as the original writer produced it: one element tree pretty-printed by minidom"""
+    rss = Element("rss")
+    rss.set("version", "2.0")
+    channel = SubElement(rss, "channel")
+    channel.extend(build_channel_metadata())
+    channel.extend(items)
+    return minidom.parseString(tostring(rss, encoding="unicode")).toprettyxml(indent="  ", encoding="UTF-8")
+
+
+def _stream_feed(tmp_path, monkeypatch, context):
+    """Stream the fixture releases and return the written bytes plus the item elements rendered"""
+    items = []
+    render_feed_item = generate_rss.render_feed_item
+
+    def recording_render(*args, **kwargs):
+        item = render_feed_item(*args, **kwargs)
+        if item is not None:
+            items.append(item)
+        return item
+
+    monkeypatch.setattr(generate_rss, "render_feed_item", recording_render)
+    output = tmp_path / "rss_feed.xml"
+    write_data_to_rss(_fixture_releases(), output, context.data_dir, context)
+    return output.read_bytes(), items
+
+
+def test_streamed_rss_matches_minidom_output(tmp_path, monkeypatch, context):
+    streamed, items = _stream_feed(tmp_path, monkeypatch, context)
+
+    assert items
+    assert _fixed_build_date(streamed) == _fixed_build_date(_minidom_feed(items))
+
+
+def test_streamed_rss_matches_original_writer(tmp_path, monkeypatch, context):
+    # rss_feed_golden.xml is what the minidom-based write_data_to_rss that
+    # streaming replaced wrote for rss_releases.json, lastBuildDate pinned
+    streamed, _ = _stream_feed(tmp_path, monkeypatch, context)
+
+    assert _fixed_build_date(streamed) == (FIXTURES / "rss_feed_golden.xml").read_bytes()
+
+
+def test_shards_not_written_this_run_are_removed(tmp_path, context):
+    shard_dir = tmp_path / "rss"
+    shard_dir.mkdir()
+    for name in ("macos_9.xml", "macos_9.atom", "README.md"):
+        (shard_dir / name).write_text("stale")
+
+    write_data_to_rss(_fixture_releases(), tmp_path / "rss_feed.xml", context.data_dir, context,
+                      shard_dir=shard_dir, shard_by_major=True)
+
+    shards = sorted(path.name for path in shard_dir.iterdir())
+    assert "macos_15.xml" in shards and "README.md" in shards
+    assert "macos_9.xml" not in shards and "macos_9.atom" not in shards